@@ -1,25 +1,64 @@
 """API 클라이언트 관련 코드"""
 import aiohttp
-from typing import Optional, List, Dict
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Callable, Tuple
 import asyncio
+import hashlib
+import json
 import logging  # 추가
+import time
 from ktb_settings import *
+from ktb_rate_limiter import RateLimiter, parse_retry_after
+from ktb_concurrency import AdaptiveConcurrencyLimiter
+from ktb_provider_pool import ProviderPool
+from ktb_stream_sink import StreamSink
 
 
 logger = logging.getLogger(__name__)  # 추가
 
+CALL_METRICS_HISTORY = 1000  # 보관할 최근 호출 측정값 수
+
+
+@dataclass
+class CallMetrics:
+    """LLM 호출 단위 측정값"""
+    model: str
+    streamed: bool = False
+    status: Optional[int] = None
+    latency: float = 0.0                         # 전체 소요 시간 (초)
+    time_to_first_token: Optional[float] = None  # 첫 토큰까지 걸린 시간 (스트리밍)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def tokens_per_second(self) -> float:
+        """생성 구간 기준 초당 토큰 수"""
+        generation_time = self.latency - (self.time_to_first_token or 0.0)
+        if generation_time <= 0:
+            return 0.0
+        return self.completion_tokens / generation_time
+
 
 class APIClient:
     """API 요청 처리 클래스"""
 
-    def __init__(self, model: str = MODEL, temperature: float = TEMPERATURE):
+    def __init__(self, model: str = MODEL, temperature: float = TEMPERATURE,
+                 pool: ProviderPool = provider_pool,
+                 gemini_limiter: RateLimiter = gemini_rate_limiter,
+                 gemini_concurrency: AdaptiveConcurrencyLimiter = gemini_concurrency_controller):
         self.model = model
         self.temperature = temperature
+        self.provider_pool = pool
+        self.gemini_rate_limiter = gemini_limiter
+        self.gemini_concurrency = gemini_concurrency
+        self._gemini_models = {}
+        self.call_metrics = deque(maxlen=CALL_METRICS_HISTORY)
 
-    def _get_headers(self) -> dict:
+    def _get_headers(self, api_key: Optional[str] = None) -> dict:
         """헤더를 동적으로 가져오는 메서드"""
         return {
-            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+            "Authorization": f"Bearer {api_key or os.getenv('OPENAI_API_KEY')}",
             "Content-Type": "application/json"
         }
 
@@ -79,50 +118,275 @@ class APIClient:
 
         return params
 
-    async def generate_text(self, session: aiohttp.ClientSession,
-                            prompt: str, content: str, max_retries: int = MAX_RETRIES) -> Optional[str]:
-        """텍스트 생성 API 호출"""
+    def _estimate_request_tokens(self, json_data: dict) -> int:
+        """속도 제한 예약용 요청 토큰 수 추정"""
+        prompt_tokens = sum(
+            token_estimator.estimate(message["content"])
+            for message in json_data["messages"]
+        )
+        return prompt_tokens + (json_data.get("max_tokens") or EXPECTED_COMPLETION_TOKENS)
+
+    async def _call(self, session: aiohttp.ClientSession, json_data: dict,
+                    read_body: Callable, max_retries: int) -> Optional[str]:
+        """공통 호출 루프 (엔드포인트 선택, 속도 제한, 동시성 제어, 재시도, 호출 측정)"""
+        requested_model = json_data["model"]
+        usage_tracker.check_budget(self._estimate_request_tokens(json_data))
         attempt = 0
+        rate_limited = 0
+        failed_endpoints = set()
         while attempt < max_retries:
+            selected = self.provider_pool.select(requested_model, exclude=failed_endpoints)
+            if selected is None:
+                wait = self.provider_pool.wait_time(requested_model, exclude=failed_endpoints)
+                if wait is None:
+                    logger.error(f"사용 가능한 엔드포인트 없음: {requested_model}")
+                    return None
+                # 모든 서킷이 열려 있으면 차단 해제(또는 시험 요청 판정)까지 대기 후 다시 선택
+                await asyncio.sleep(max(wait, 0.05))
+                continue
+            endpoint, model = selected
+            probe = endpoint.probing  # 이 요청이 half-open 시험 요청인지
+            request_data = {**json_data, "model": model}
+            metrics = CallMetrics(model=model, streamed=bool(json_data.get("stream")))
+            status = None
             try:
-                json_data = self._prepare_request(prompt, content)
-                async with session.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    json=json_data,
-                    headers=self._get_headers()
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["choices"][0]["message"]["content"]
-                    else:
-                        error_text = await response.text()
-                        logger.error(
-                            f"API 오류: {response.status} - {error_text}")
-                        if response.status in {502, 503, 504}:
-                            # 일시적인 서버 오류일 경우 재시도
-                            attempt += 1
-                            logger.info(f"재시도 {attempt}/{max_retries}...")
-                            await asyncio.sleep(2 ** attempt)  # 지수 백오프
+                estimated_tokens = self._estimate_request_tokens(request_data)
+                await endpoint.rate_limiter.acquire(estimated_tokens)
+                await endpoint.concurrency.acquire()
+                start_time = time.perf_counter()
+                # 기본 프로바이더는 호출자가 넘긴 세션, 그 외는 프로바이더별 풀 세션 사용
+                endpoint_session = session if endpoint.provider == "openai" else http_pool.get_session(
+                    endpoint.provider)
+                try:
+                    async with endpoint_session.post(
+                        endpoint.chat_completions_url,
+                        json=request_data,
+                        headers=self._get_headers(endpoint.api_key)
+                    ) as response:
+                        status = response.status
+                        endpoint.rate_limiter.update_from_headers(response.headers)
+                        if response.status == 200:
+                            text, usage = await read_body(response, metrics, start_time)
                         else:
-                            raise Exception(
-                                f"API 오류: {response.status} - {error_text}")
+                            error_text = await response.text()
+                finally:
+                    metrics.latency = time.perf_counter() - start_time
+                    metrics.status = status
+                    endpoint.concurrency.release(metrics.latency, status)
             except Exception as e:
-                logger.error(f"API 호출 오류: {str(e)}")
+                logger.error(f"API 호출 오류 ({endpoint.name}): {str(e)}")
                 logger.error("스택 트레이스:", exc_info=True)
+                self.provider_pool.record_failure(endpoint)
+                if metrics.time_to_first_token is not None:
+                    # 스트리밍 도중 실패한 경우 이미 출력된 내용이 있으므로 재시도하지 않음
+                    return None
+                failed_endpoints.add(endpoint.name)
+                attempt += 1
+                continue
+            except BaseException:
+                # 취소 등으로 성공/실패 판정 없이 끝난 시험 요청은 half-open 상태 해제
+                if probe:
+                    self.provider_pool.release_probe(endpoint)
+                raise
+
+            if status == 200:
+                self.provider_pool.record_success(endpoint, metrics.latency)
+                if usage:
+                    metrics.prompt_tokens = usage.get("prompt_tokens", 0)
+                    metrics.completion_tokens = usage.get(
+                        "completion_tokens", metrics.completion_tokens)
+                    endpoint.rate_limiter.record_usage(
+                        estimated_tokens, usage["total_tokens"])
+                self._record_call(metrics)
+                return text
+            elif status == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                # 해당 엔드포인트만 보류하고 다른 키/엔드포인트로 재시도
+                rate_limited += 1
+                self.provider_pool.release_probe(endpoint)
+                retry_after = parse_retry_after(response.headers)
+                endpoint.rate_limiter.block_for(
+                    retry_after if retry_after is not None else 2 ** rate_limited)
+                logger.info(
+                    f"Rate limit 재시도 {rate_limited}/{MAX_RATE_LIMIT_RETRIES} ({endpoint.name})...")
+            elif status in {401, 403, 500, 502, 503, 504}:
+                # 일시적인 서버 오류 또는 키 오류: 엔드포인트 실패 기록 후 다른 엔드포인트로 재시도
+                logger.error(f"API 오류 ({endpoint.name}): {status} - {error_text}")
+                self.provider_pool.record_failure(endpoint)
+                failed_endpoints.add(endpoint.name)
+                attempt += 1
+                logger.info(f"재시도 {attempt}/{max_retries}...")
+                if not self.provider_pool.has_available(requested_model, exclude=failed_endpoints):
+                    await asyncio.sleep(2 ** attempt)  # 대체 엔드포인트가 없으면 지수 백오프
+                    failed_endpoints.clear()
+            else:
+                self.provider_pool.release_probe(endpoint)
+                logger.error(f"API 오류 ({endpoint.name}): {status} - {error_text}")
+                return None
+        return None
+
+    def _record_call(self, metrics: CallMetrics):
+        """호출 측정값 기록"""
+        self.call_metrics.append(metrics)
+        usage_tracker.record(
+            metrics.model, metrics.prompt_tokens, metrics.completion_tokens, metrics.latency)
+        ttft = f"{metrics.time_to_first_token:.2f}s" if metrics.time_to_first_token is not None else "-"
+        logger.info(
+            f"LLM 호출 완료: {metrics.model} latency={metrics.latency:.2f}s "
+            f"ttft={ttft} tokens/s={metrics.tokens_per_second:.1f}")
+
+    async def generate_text(self, session: aiohttp.ClientSession,
+                            prompt: str, content: str, max_retries: int = MAX_RETRIES,
+                            model: Optional[str] = None) -> Optional[str]:
+        """텍스트 생성 API 호출 (model 지정 시 해당 모델을 제공하는 엔드포인트로 전송)"""
+        async def read_json(response, metrics, start_time):
+            data = await response.json()
+            return data["choices"][0]["message"]["content"], data.get("usage")
+
+        json_data = self._prepare_request(prompt, content)
+        if model:
+            json_data["model"] = model
+        return await self._call(session, json_data, read_json, max_retries)
+
+    async def complete(self, session: aiohttp.ClientSession, messages: List[Dict[str, str]],
+                       model: Optional[str] = None, temperature: Optional[float] = None,
+                       max_retries: int = MAX_RETRIES, **params) -> Tuple[Optional[str], Optional[dict]]:
+        """메시지 목록으로 채팅 완성 API 호출 (텍스트와 usage 반환)
+
+        params는 _get_json_data의 선택 인자(stop, seed, tools, logprobs, top_logprobs, max_tokens)
+        """
+        usage_holder = {}
+
+        async def read_json(response, metrics, start_time):
+            data = await response.json()
+            usage_holder["usage"] = data.get("usage")
+            return data["choices"][0]["message"]["content"], data.get("usage")
+
+        json_data = self._get_json_data(messages=messages, **params)
+        if model:
+            json_data["model"] = model
+        if temperature is not None:
+            json_data["temperature"] = temperature
+        text = await self._call(session, json_data, read_json, max_retries)
+        return text, usage_holder.get("usage")
+
+    async def stream_text(self, session: aiohttp.ClientSession, prompt: str, content: str,
+                          sink: Optional[StreamSink] = None,
+                          max_retries: int = MAX_RETRIES) -> Optional[str]:
+        """스트리밍 텍스트 생성 API 호출
+
+        server-sent event의 delta를 도착하는 대로 sink에 기록하고 전체 텍스트를 반환한다.
+        실패 시 sink에 기록된 부분 결과는 abort로 정리한다.
+        """
+        async def read_events(response, metrics, start_time):
+            parts = []
+            usage = None
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                event = json.loads(payload)
+                usage = event.get("usage") or usage
+                for choice in event.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if not delta:
+                        continue
+                    if metrics.time_to_first_token is None:
+                        metrics.time_to_first_token = time.perf_counter() - start_time
+                    metrics.completion_tokens += 1  # usage가 없을 때의 근사치 (delta당 1토큰)
+                    parts.append(delta)
+                    if sink is not None:
+                        await sink.write(delta)
+            return "".join(parts), usage
+
+        json_data = self._prepare_request(prompt, content)
+        json_data["stream"] = True
+        json_data["stream_options"] = {"include_usage": True}
+        try:
+            result = await self._call(session, json_data, read_events, max_retries)
+        except BaseException:
+            if sink is not None:
+                await sink.abort()
+            raise
+        if sink is not None:
+            if result is None:
+                await sink.abort()
+            else:
+                await sink.close()
+        return result
+
+    def _get_gemini_model(self, prompt: str):
+        """프롬프트별 Gemini 모델 재사용 (system instruction은 모델 생성 시 한 번만 전달)"""
+        key = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        model = self._gemini_models.get(key)
+        if model is None:
+            model = get_gemini_client(prompt)
+            self._gemini_models[key] = model
+        return model
+
+    async def generate_gemini_text(self, prompt: str, content: str,
+                                   max_retries: int = MAX_RETRIES) -> Optional[str]:
+        """Gemini 텍스트 생성 (네이티브 비동기 호출, 속도 제한/동시성 제어/측정 공유)"""
+        model = self._get_gemini_model(prompt)
+        estimated_tokens = (token_estimator.estimate(prompt) + token_estimator.estimate(content)
+                            + EXPECTED_COMPLETION_TOKENS)
+        usage_tracker.check_budget(estimated_tokens)
+        attempt = 0
+        rate_limited = 0
+        while attempt < max_retries:
+            await self.gemini_rate_limiter.acquire(estimated_tokens)
+            await self.gemini_concurrency.acquire()
+            metrics = CallMetrics(model=MODEL)
+            start_time = time.perf_counter()
+            status = None
+            try:
+                response = await model.generate_content_async(content)
+                status = 200
+            except Exception as e:
+                # google.api_core 예외는 HTTP 상태 코드를 code 속성으로 제공
+                code = getattr(e, "code", None)
+                status = code if isinstance(code, int) else None
+                error = e
+            finally:
+                metrics.latency = time.perf_counter() - start_time
+                metrics.status = status
+                self.gemini_concurrency.release(metrics.latency, status)
+
+            if status == 200:
+                usage = getattr(response, "usage_metadata", None)
+                if usage:
+                    metrics.prompt_tokens = usage.prompt_token_count
+                    metrics.completion_tokens = usage.candidates_token_count
+                    self.gemini_rate_limiter.record_usage(
+                        estimated_tokens, usage.total_token_count)
+                self._record_call(metrics)
+                try:
+                    return response.text
+                except ValueError as e:
+                    # 안전 필터 등으로 후보 텍스트가 없는 경우
+                    logger.error(f"Gemini 응답 없음: {str(e)}")
+                    return None
+            elif status == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                rate_limited += 1
+                self.gemini_rate_limiter.block_for(2 ** rate_limited)
+                logger.info(
+                    f"Gemini rate limit 재시도 {rate_limited}/{MAX_RATE_LIMIT_RETRIES}...")
+            elif status in {500, 502, 503, 504}:
+                attempt += 1
+                logger.info(f"Gemini 재시도 {attempt}/{max_retries}...")
+                await asyncio.sleep(2 ** attempt)  # 지수 백오프
+            else:
+                logger.error(f"Gemini API 호출 오류: {str(error)}")
                 return None
         return None
 
-    async def process_chunks(self, chunks: List[str], prompt: str,
-                             batch_size: int = 50) -> List[str]:
-        """청크 배치 처리"""
-        results = []
-        async with aiohttp.ClientSession() as session:
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                batch_results = await asyncio.gather(*[
-                    self.generate_text(session, prompt, chunk)
-                    for chunk in batch
-                ])
-                results.extend([r for r in batch_results if r is not None])
-                await asyncio.sleep(40)  # Rate limit 회피
-        return results
+    async def process_chunks(self, chunks: List[str], prompt: str) -> List[str]:
+        """청크 일괄 처리 (동시 요청 수와 호출 속도는 공유 제어기가 조절)"""
+        session = http_pool.get_session("openai")
+        results = await asyncio.gather(*[
+            self.generate_text(session, prompt, chunk)
+            for chunk in chunks
+        ])
+        return [r for r in results if r is not None]
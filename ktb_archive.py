@@ -0,0 +1,128 @@
+"""문서 ZIP 스트리밍 업로드 관련 코드"""
+import asyncio
+import logging
+import zipfile
+from typing import Optional, Union
+
+from ktb_stream_sink import S3_MIN_PART_SIZE, S3MultipartSink
+
+logger = logging.getLogger(__name__)
+
+
+class _PartBuffer:
+    """ZipFile이 기록한 바이트를 업로더로 넘기기 전까지 모아 두는 쓰기 전용 스트림
+
+    tell/seek이 없으므로 ZipFile은 데이터 디스크립터 방식으로 순차 기록한다.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.written = 0
+
+    def write(self, data: bytes) -> int:
+        self.data.extend(data)
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self.data = bytes(self.data), bytearray()
+        return data
+
+
+class S3ZipStreamWriter:
+    """항목이 추가되는 대로 압축하여 S3 멀티파트 업로드로 바로 전송하는 ZIP 작성기
+
+    압축은 이벤트 루프 밖의 스레드에서 항목 순서대로 수행하고, 압축된
+    바이트는 S3MultipartSink로 넘겨 파트 단위로 병렬 업로드한다. 업로드가
+    max_concurrency개를 넘으면 압축을 잠시 멈춰 메모리 사용량을 제한하며,
+    전체 크기가 한 파트보다 작으면 put_object 한 번으로 올린다. 임시 파일은
+    만들지 않는다.
+
+    사용 예:
+        async with S3ZipStreamWriter(s3, bucket, key) as archive:
+            archive.add("Controller/UserController.md", doc)
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, compresslevel: int = 6,
+                 part_size: int = S3_MIN_PART_SIZE, max_concurrency: int = 4):
+        self.key = key
+        self.compression = zipfile.ZIP_DEFLATED if compresslevel > 0 else zipfile.ZIP_STORED
+        self.compresslevel = min(compresslevel, 9) if compresslevel > 0 else None
+        self._upload = S3MultipartSink(s3_client, bucket, key, part_size=part_size,
+                                       max_concurrency=max_concurrency, content_type="application/zip")
+        self._buffer = _PartBuffer()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._runner: Optional[asyncio.Task] = None
+        self.stats = {"entries": 0, "bytes_in": 0}
+
+    async def __aenter__(self) -> "S3ZipStreamWriter":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
+
+    def start(self):
+        if self._runner is None:
+            self._zip = zipfile.ZipFile(self._buffer, "w", compression=self.compression,
+                                        compresslevel=self.compresslevel)
+            self._runner = asyncio.create_task(self._run())
+
+    def add(self, arcname: str, data: Union[str, bytes]):
+        """메모리의 내용을 항목으로 추가 (압축과 업로드는 백그라운드에서 진행)"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._queue.put_nowait((arcname, data, None))
+
+    def add_file(self, path: str, arcname: str):
+        """디스크의 파일을 항목으로 추가 (읽기도 백그라운드 스레드에서 수행)"""
+        self._queue.put_nowait((arcname, None, path))
+
+    def _write_entry(self, arcname: str, data: Optional[bytes], path: Optional[str]):
+        if path is not None:
+            self._zip.write(path, arcname)
+            self.stats["bytes_in"] += self._zip.getinfo(arcname).file_size
+        else:
+            self._zip.writestr(arcname, data)
+            self.stats["bytes_in"] += len(data)
+        self.stats["entries"] += 1
+
+    async def _run(self):
+        while (entry := await self._queue.get()) is not None:
+            try:
+                await asyncio.to_thread(self._write_entry, *entry)
+            except (OSError, ValueError) as e:
+                logger.error(f"압축 항목 추가 실패 ({entry[0]}): {str(e)}")
+            await self._upload.write_bytes(self._buffer.take())
+        # 중앙 디렉토리 기록
+        await asyncio.to_thread(self._zip.close)
+        await self._upload.write_bytes(self._buffer.take())
+
+    async def close(self) -> int:
+        """남은 항목을 압축하고 업로드를 완료 (업로드한 아카이브 크기 반환)"""
+        self.start()
+        self._queue.put_nowait(None)
+        try:
+            await self._runner
+        except BaseException:
+            await self.abort()
+            raise
+        await self._upload.close()
+        print(f"ZIP 업로드 완료 ({self.key}): 항목 {self.stats['entries']}개, "
+              f"{self.stats['bytes_in']} -> {self._buffer.written} bytes, 파트 {self._upload.stats['parts']}개")
+        return self._buffer.written
+
+    async def abort(self):
+        """진행 중인 압축/업로드를 중단하고 멀티파트 업로드 정리"""
+        if self._runner is not None:
+            if not self._runner.done():
+                self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+        await self._upload.abort()
@@ -0,0 +1,152 @@
+"""생성 문서 보관 관련 코드"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from ktb_stream_sink import StreamSink
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """생성 문서를 메모리에 보관하고 바이트 한도를 넘으면 오래된 문서부터 디스크로 내보내는 저장소
+
+    문서 이름은 directory 기준 상대 경로(예: Controller/UserController.md)이며,
+    이름 중복은 메모리에서 예약하여 피하므로 파일 존재 여부를 확인하지 않는다.
+    요약/압축/임베딩은 저장소에서 바로 읽고, 디스크에는 메모리 한도를 넘었을 때와
+    flush를 호출했을 때만 같은 상대 경로로 기록한다.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._spilled: Set[str] = set()
+        self._reserved: Set[str] = set()
+        self._created_dirs: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self.memory_bytes = 0
+        self.stats = {"documents": 0, "spilled": 0, "peak_bytes": 0}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def reserve(self, name: str) -> str:
+        """사용 중이 아닌 이름 예약 (중복 시 _1, _2 ... 접미사)"""
+        base_name, extension = os.path.splitext(name)
+        counter = 1
+        while name in self._reserved:
+            name = f"{base_name}_{counter}{extension}"
+            counter += 1
+        self._reserved.add(name)
+        return name
+
+    def release(self, name: str):
+        """저장하지 않은 예약 이름 해제"""
+        if name not in self._sizes:
+            self._reserved.discard(name)
+
+    def names(self) -> List[str]:
+        return list(self._sizes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    async def put(self, name: str, content: str):
+        """문서 저장 (메모리 한도를 넘으면 오래된 문서부터 디스크로 내보냄)"""
+        self._reserved.add(name)
+        if name in self._memory:
+            self.memory_bytes -= self._sizes[name]
+        else:
+            self.stats["documents"] += 1
+        self._spilled.discard(name)
+        self._memory[name] = content
+        self._sizes[name] = len(content.encode("utf-8"))
+        self.memory_bytes += self._sizes[name]
+        self.stats["peak_bytes"] = max(self.stats["peak_bytes"], self.memory_bytes)
+        if self.memory_bytes > self.max_bytes:
+            await self._spill()
+
+    async def _spill(self):
+        async with self._lock:
+            while self.memory_bytes > self.max_bytes and self._memory:
+                name, content = next(iter(self._memory.items()))
+                await asyncio.to_thread(self._write, name, content)
+                # 기록하는 동안 같은 이름이 다시 저장되었으면 메모리 내용 유지
+                if self._memory.get(name) is content:
+                    del self._memory[name]
+                    self.memory_bytes -= self._sizes[name]
+                    self._spilled.add(name)
+                    self.stats["spilled"] += 1
+
+    def _write(self, name: str, content: str):
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        if directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _read(self, name: str) -> str:
+        with open(self.path(name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    async def get(self, name: str) -> Optional[str]:
+        content = self._memory.get(name)
+        if content is not None:
+            return content
+        if name in self._spilled:
+            return await asyncio.to_thread(self._read, name)
+        return None
+
+    async def items(self) -> AsyncIterator[Tuple[str, str]]:
+        """(이름, 문서)를 저장 순서대로 반환 (디스크로 내보낸 문서는 하나씩 읽음)"""
+        for name in self.names():
+            content = await self.get(name)
+            if content is not None:
+                yield name, content
+
+    def resident(self) -> Dict[str, str]:
+        """메모리에 있는 문서 {디스크 경로: 문서} (디스크로 내보낸 문서는 경로에서 읽으면 됨)"""
+        return {self.path(name): content for name, content in self._memory.items()}
+
+    async def flush(self):
+        """메모리의 문서를 모두 디스크에 기록 (디렉토리 구조가 필요한 호출자용)"""
+        async with self._lock:
+            for name, content in list(self._memory.items()):
+                await asyncio.to_thread(self._write, name, content)
+                # 기록하는 동안 같은 이름이 다시 저장되었으면 새 내용은 메모리에 유지
+                if self._memory.get(name) is content:
+                    del self._memory[name]
+                    self.memory_bytes -= self._sizes[name]
+                    self._spilled.add(name)
+
+
+class ArtifactSink(StreamSink):
+    """스트리밍 토큰을 모았다가 완료 시 저장소에 문서로 저장"""
+
+    def __init__(self, store: ArtifactStore, name: str):
+        self.store = store
+        self.name = name
+        self._parts: List[str] = []
+
+    async def write(self, text: str):
+        self._parts.append(text)
+
+    async def close(self):
+        if self._parts:
+            await self.store.put(self.name, "".join(self._parts))
+            self._parts = []
+        else:
+            self.store.release(self.name)
+
+    async def abort(self):
+        self._parts = []
+        self.store.release(self.name)
@@ -0,0 +1,409 @@
+"""청크 분할 및 파서 마이크로 벤치마크
+
+사용 예시:
+    python ktb_benchmark.py                      # 합성 저장소로 측정 후 기준선과 비교
+    python ktb_benchmark.py --repo ./fixture     # 픽스처 저장소로 측정
+    python ktb_benchmark.py --save-baseline      # 현재 결과를 기준선으로 저장
+
+기준선(benchmark_baseline.json)은 측정한 장비에 따라 달라지므로 저장소에 포함하지
+않는다(.gitignore). 비교할 변경 전 커밋에서 --save-baseline으로 먼저 만든 뒤 같은
+장비에서 변경 후 커밋을 실행하면 기준선 대비 증감(Δ)이 표시된다.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+from token_chunker import TokenChunker
+from ktb_api_client import APIClient
+from ktb_document_processor import DocumentProcessor
+from ktb_utils import FileUtils
+from ktb_settings import source_analyzer, tokenizer
+from ktb_func import check_service_annotation, remove_markdown_blocks
+
+DEFAULT_BASELINE_PATH = "benchmark_baseline.json"
+CHUNKER_CONFIGS = [(512, 128), (2048, 256), (8191, 2000)]
+
+
+@dataclass
+class BenchmarkResult:
+    """벤치마크 측정 결과"""
+    name: str
+    iterations: int
+    mean_seconds: float
+    min_seconds: float
+    throughput: float        # 초당 처리량
+    unit: str                # 처리량 단위 (MB/s, files/s 등)
+    peak_memory_kb: float
+
+
+"""**SYNTHETIC REPOSITORY**"""
+
+JAVA_CONTROLLER = '''/*
+ * Copyright (c) {year} Example Corp.
+ * Licensed under the Apache License, Version 2.0
+ */
+package com.acme.{module}.controller;
+
+import com.acme.{module}.dto.{name}Request;
+import com.acme.{module}.dto.{name}Response;
+import com.acme.{module}.service.{name}Service;
+import org.springframework.http.ResponseEntity;
+import org.springframework.web.bind.annotation.*;
+
+@RestController
+@RequestMapping("/api/{lower}")
+public class {name}Controller {{
+    private final {name}Service {lower}Service;
+
+    public {name}Controller({name}Service {lower}Service) {{
+        this.{lower}Service = {lower}Service;
+    }}
+
+    // {name} 단건 조회
+    @GetMapping("/{{id}}")
+    public ResponseEntity<{name}Response> find(@PathVariable Long id) {{
+        return ResponseEntity.ok({lower}Service.find(id));
+    }}
+
+    @PostMapping
+    public ResponseEntity<Void> create(@RequestBody {name}Request request) {{
+        {lower}Service.create(request);
+        return ResponseEntity.noContent().build();
+    }}
+}}
+'''
+
+JAVA_DTO = '''package com.acme.{module}.dto;
+
+import java.time.LocalDateTime;
+
+public class {name}Response {{
+    private Long id;
+    private String name;
+    private LocalDateTime createdAt;
+
+    public Long getId() {{ return id; }}
+    public void setId(Long id) {{ this.id = id; }}
+    public String getName() {{ return name; }}
+    public void setName(String name) {{ this.name = name; }}
+    public LocalDateTime getCreatedAt() {{ return createdAt; }}
+    public void setCreatedAt(LocalDateTime createdAt) {{ this.createdAt = createdAt; }}
+}}
+'''
+
+PYTHON_MODULE = '''"""{name} module"""
+import os
+from typing import List, Optional
+from {module}.base import (
+    BaseService,
+    ServiceError,
+)
+
+
+class {name}Service(BaseService):
+    """{name} service"""
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def find(self, item_id: int) -> Optional[dict]:
+        # 캐시 우선 조회
+        return self.repository.get(item_id)
+
+    def find_all(self, limit: int = 100) -> List[dict]:
+        return [item for item in self.repository.list()[:limit]]
+'''
+
+JS_MODULE = '''import {{ request }} from './http';
+import {{
+  formatDate,
+  formatNumber,
+}} from './format';
+const config = require('./config');
+
+export class {name}Client {{
+  constructor(baseUrl) {{
+    this.baseUrl = baseUrl || config.baseUrl;
+  }}
+
+  async find(id) {{
+    // 단건 조회
+    return request(`${{this.baseUrl}}/{lower}/${{id}}`);
+  }}
+}}
+
+export function format{name}(item) {{
+  return `${{item.name}} (${{formatDate(item.createdAt)}}, ${{formatNumber(item.count)}})`;
+}}
+'''
+
+CPP_MODULE = '''#include <string>
+#include <vector>
+#include "{lower}.h"
+
+namespace example {{
+
+int {lower}_count = 0;
+
+class {name}Repository {{
+public:
+    std::vector<std::string> findAll() const {{
+        return items_;
+    }}
+private:
+    std::vector<std::string> items_;
+}};
+
+}}  // namespace example
+'''
+
+CS_MODULE = '''using System;
+using System.Collections.Generic;
+
+namespace Example.{name}
+{{
+    public class {name}Service
+    {{
+        private readonly List<string> _items = new List<string>();
+
+        public IEnumerable<string> FindAll()
+        {{
+            return _items;
+        }}
+    }}
+}}
+'''
+
+MARKDOWN_DOC = '''```markdown
+# {name} API
+
+## Overview
+{name}Controller handles requests under `/api/{lower}`.
+
+```
+```mermaid
+sequenceDiagram
+    Client->>{name}Controller: GET /api/{lower}/{{id}}
+    {name}Controller->>{name}Service: find(id)
+```
+```
+'''
+
+
+def create_synthetic_repo(root: str, n_files: int = 200, seed: int = 0) -> str:
+    """언어별 합성 소스 파일로 구성된 저장소 생성"""
+    rng = random.Random(seed)
+    templates = [
+        ("backend/{module}/src/main/java/com/acme/{module}/controller/{name}Controller.java", JAVA_CONTROLLER),
+        ("backend/{module}/src/main/java/com/acme/{module}/dto/{name}Response.java", JAVA_DTO),
+        ("ai/{module}/{lower}_service.py", PYTHON_MODULE),
+        ("frontend/src/{module}/{lower}Client.js", JS_MODULE),
+        ("frontend/src/{module}/{lower}Client.ts", JS_MODULE),
+        ("native/{module}/{lower}_repository.cpp", CPP_MODULE),
+        ("dotnet/{module}/{name}Service.cs", CS_MODULE),
+    ]
+    for i in range(n_files):
+        path_template, content_template = templates[i % len(templates)]
+        values = {
+            "module": f"module{i % 7}",
+            "name": f"Item{i}",
+            "lower": f"item{i}",
+            "year": 2020 + rng.randint(0, 4),
+        }
+        path = os.path.join(root, path_template.format(**values))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content_template.format(**values))
+    return root
+
+
+"""**MEASUREMENT**"""
+
+
+def _measure(name: str, fn: Callable[[], None], work: float, unit: str, repeat: int) -> BenchmarkResult:
+    """실행 시간과 최대 메모리 측정 (메모리 추적은 시간 측정과 분리)"""
+    fn()  # 워밍업
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = sum(timings) / len(timings)
+    return BenchmarkResult(
+        name=name,
+        iterations=repeat,
+        mean_seconds=mean,
+        min_seconds=min(timings),
+        throughput=work / mean if mean > 0 else 0.0,
+        unit=unit,
+        peak_memory_kb=peak / 1024,
+    )
+
+
+def _read_all(files: List[str]) -> Dict[str, str]:
+    contents = {}
+    for file in files:
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                contents[file] = f.read()
+        except Exception:
+            continue
+    return contents
+
+
+def run_benchmarks(repo_dir: str, repeat: int = 5, only: Optional[str] = None) -> List[BenchmarkResult]:
+    """전체 벤치마크 실행"""
+    processor = DocumentProcessor(APIClient())
+    results = []
+
+    def selected(name: str) -> bool:
+        return only is None or only in name
+
+    # TokenChunker.chunk
+    source_files = FileUtils.find_files(repo_dir, tuple(processor.source_extensions))
+    sources = _read_all(source_files)
+    corpus = "\n".join(sources.values())
+    corpus_mb = len(corpus.encode("utf-8")) / (1024 * 1024)
+    for chunk_size, overlap in CHUNKER_CONFIGS:
+        name = f"token_chunker.chunk[size={chunk_size},overlap={overlap}]"
+        if selected(name):
+            chunker = TokenChunker(tokenizer=tokenizer, chunk_size=chunk_size, chunk_overlap=overlap)
+            results.append(_measure(name, lambda: chunker.chunk(corpus), corpus_mb, "MB/s", repeat))
+
+    # DocumentProcessor._parse_*_file
+    # 분석기는 내용 해시로 캐시하므로 반복마다 캐시를 비워 실제 파싱 시간을 측정
+    def parse_all(parser, typed):
+        source_analyzer.clear()
+        return [parser(content) for content in typed]
+
+    for ext, file_type in processor.source_extensions.items():
+        name = f"parser.{processor.parsers[file_type].__name__}"
+        typed = [content for path, content in sources.items() if path.endswith(ext)]
+        if typed and selected(name):
+            parser = processor.parsers[file_type]
+            results.append(_measure(
+                name, lambda: parse_all(parser, typed), len(typed), "files/s", repeat))
+
+    # _build_optimized_context
+    name = "document_processor._build_optimized_context"
+    if selected(name):
+        package_map = asyncio.run(processor.get_optimized_source_files(repo_dir))
+        file_count = sum(len(files) for files in package_map.values())
+        results.append(_measure(
+            name, lambda: processor._build_optimized_context(package_map), file_count, "files/s", repeat))
+
+    # check_service_annotation
+    name = "func.check_service_annotation"
+    java_files = FileUtils.find_files(repo_dir, (".java",))
+    if java_files and selected(name):
+        def classify():
+            with contextlib.redirect_stdout(io.StringIO()):
+                check_service_annotation(java_files)
+        results.append(_measure(name, classify, len(java_files), "files/s", repeat))
+
+    # remove_markdown_blocks
+    name = "func.remove_markdown_blocks"
+    if selected(name):
+        docs = [MARKDOWN_DOC.format(name=f"Item{i}", lower=f"item{i}") for i in range(1000)]
+        docs_mb = sum(len(doc.encode("utf-8")) for doc in docs) / (1024 * 1024)
+        results.append(_measure(
+            name, lambda: [remove_markdown_blocks(doc) for doc in docs], docs_mb, "MB/s", repeat))
+
+    return results
+
+
+"""**BASELINE**"""
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: List[BenchmarkResult], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({r.name: asdict(r) for r in results}, f, indent=2, ensure_ascii=False)
+    print(f"기준선 저장 완료: {path}")
+
+
+def report(results: List[BenchmarkResult], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """결과 출력 및 기준선 대비 회귀 목록 반환"""
+    regressions = []
+    print(f"{'benchmark':<58} {'mean(ms)':>10} {'throughput':>16} {'peak(KB)':>10} {'Δtime':>8} {'Δmem':>8}")
+    for r in results:
+        base = baseline.get(r.name)
+        time_delta = mem_delta = ""
+        if base:
+            time_pct = (r.mean_seconds - base["mean_seconds"]) / base["mean_seconds"] * 100
+            mem_pct = ((r.peak_memory_kb - base["peak_memory_kb"]) / base["peak_memory_kb"] * 100
+                       if base["peak_memory_kb"] else 0.0)
+            time_delta, mem_delta = f"{time_pct:+.1f}%", f"{mem_pct:+.1f}%"
+            if time_pct > threshold or mem_pct > threshold:
+                regressions.append(r.name)
+        print(f"{r.name:<58} {r.mean_seconds * 1000:>10.2f} "
+              f"{r.throughput:>10.1f} {r.unit:<5} {r.peak_memory_kb:>10.1f} {time_delta:>8} {mem_delta:>8}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="청크 분할 및 파서 마이크로 벤치마크")
+    parser.add_argument("--repo", help="픽스처 저장소 경로 (미지정 시 합성 저장소 사용)")
+    parser.add_argument("--files", type=int, default=200, help="합성 저장소 파일 수")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 측정 횟수")
+    parser.add_argument("--only", help="이름에 해당 문자열이 포함된 벤치마크만 실행")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준선 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="현재 결과를 기준선으로 저장")
+    parser.add_argument("--threshold", type=float, default=10.0, help="회귀 판단 기준 (%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="회귀 발견 시 종료 코드 1 반환")
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    try:
+        if args.repo:
+            repo_dir = args.repo
+        else:
+            temp_dir = tempfile.mkdtemp(prefix="dododocs_bench_")
+            repo_dir = create_synthetic_repo(temp_dir, args.files)
+            # 제외 디렉토리 이름이 경로에 섞이면 해당 언어가 측정에서 빠지므로 모두 읽히는지 확인
+            read, _ = DocumentProcessor(APIClient())._read_source_files(repo_dir)
+            assert len(read) == args.files, f"합성 저장소 파일 {args.files}개 중 {len(read)}개만 읽힘"
+
+        results = run_benchmarks(repo_dir, args.repeat, args.only)
+        baseline = load_baseline(args.baseline)
+        if not baseline and not args.save_baseline:
+            print(f"기준선 없음 ({args.baseline}): 변경 전 커밋에서 --save-baseline으로 먼저 생성하세요.")
+        regressions = report(results, baseline, args.threshold)
+
+        if args.save_baseline:
+            save_baseline(results, args.baseline)
+        if regressions:
+            print(f"회귀 발견 ({args.threshold}% 초과): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                return 1
+        return 0
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
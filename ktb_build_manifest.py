@@ -0,0 +1,416 @@
+"""빌드/설정 파일 구조화 요약 관련 코드"""
+import fnmatch
+import json
+import logging
+import os
+import re
+import tomllib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_LIST_ITEMS = 30
+MAX_RAW_LINES = 60
+MAX_COMMAND_LENGTH = 160
+PLACEHOLDER_PATTERN = re.compile(r'\$\{([A-Z][A-Z0-9_]*)')
+GRADLE_DEPENDENCY_PATTERN = re.compile(
+    r'^\s*(\w+)\s*\(?\s*(?:platform\s*\(\s*)?[\'"]([^\'"\s]+:[^\'"\s]+)[\'"]', re.MULTILINE)
+GRADLE_PLUGIN_PATTERN = re.compile(
+    r'\bid\s*\(?\s*[\'"]([\w.\-]+)[\'"]\)?(?:\s+version\s*\(?\s*[\'"]([^\'"]+)[\'"])?'
+    r'|\bkotlin\s*\(\s*[\'"]([\w.\-]+)[\'"]\s*\)|apply\s+plugin\s*:\s*[\'"]([\w.\-]+)[\'"]')
+GRADLE_JAVA_PATTERN = re.compile(
+    r'(?:sourceCompatibility|targetCompatibility|jvmTarget)\s*=\s*[\'"]?(?:JavaVersion\.VERSION_)?([\d._]+)'
+    r'|JavaLanguageVersion\.of\s*\(\s*(\d+)|jvmToolchain\s*\(\s*(\d+)')
+GRADLE_TEST_CONFIGURATIONS = ('test', 'androidTest')
+MAKE_TARGET_PATTERN = re.compile(r'^([A-Za-z0-9_./\-]+(?:\s+[A-Za-z0-9_./\-]+)*)\s*:(?!=)(.*)$')
+
+
+@dataclass
+class BuildManifest:
+    """빌드/설정 파일 하나에서 뽑은 실행 관련 정보"""
+    path: str
+    kind: str
+    name: Optional[str] = None
+    runtimes: List[str] = field(default_factory=list)
+    plugins: List[str] = field(default_factory=list)
+    dependencies: List[str] = field(default_factory=list)
+    dev_dependencies: List[str] = field(default_factory=list)
+    modules: List[str] = field(default_factory=list)
+    scripts: Dict[str, str] = field(default_factory=dict)
+    commands: List[str] = field(default_factory=list)
+    ports: List[str] = field(default_factory=list)
+    services: List[str] = field(default_factory=list)
+    env: List[str] = field(default_factory=list)    # 환경 변수 이름 (값은 비밀일 수 있어 제외)
+    raw: str = ""
+
+    def add(self, attribute: str, *values: Optional[str]):
+        items = getattr(self, attribute)
+        for value in values:
+            value = (value or "").strip()
+            if value and value not in items:
+                items.append(value)
+
+    def render(self) -> str:
+        lines = [f"[{self.kind}] {self.path}"]
+        if self.name:
+            lines.append(f"  project: {self.name}")
+        for label, items in (("runtime", self.runtimes), ("plugins", self.plugins),
+                             ("modules", self.modules), ("dependencies", self.dependencies),
+                             ("dev dependencies", self.dev_dependencies), ("commands", self.commands),
+                             ("ports", self.ports), ("env", self.env)):
+            if items:
+                lines.append(f"  {label}: {_join(items)}")
+        if self.scripts:
+            lines.append("  scripts:")
+            for name, command in list(self.scripts.items())[:MAX_LIST_ITEMS]:
+                lines.append(f"    {name}: {command}" if command else f"    {name}")
+        if self.services:
+            lines.append("  services:")
+            lines.extend(f"    {service}" for service in self.services[:MAX_LIST_ITEMS])
+        if self.raw:
+            lines.append("  content:")
+            lines.extend("    " + line for line in self.raw.splitlines())
+        return "\n".join(lines)
+
+
+def _join(items: Sequence[str]) -> str:
+    text = ", ".join(items[:MAX_LIST_ITEMS])
+    if len(items) > MAX_LIST_ITEMS:
+        text += f" ... (+{len(items) - MAX_LIST_ITEMS})"
+    return text
+
+
+def _shorten(command: str) -> str:
+    command = " ".join(command.split())
+    return command if len(command) <= MAX_COMMAND_LENGTH else command[:MAX_COMMAND_LENGTH] + "..."
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+
+def _yaml_entries(content: str) -> List[Tuple[Tuple[str, ...], str]]:
+    """들여쓰기 기반 간이 YAML 읽기 ((키 경로, 값) 목록, 목록 항목은 부모 키 경로의 값)"""
+    entries: List[Tuple[Tuple[str, ...], str]] = []
+    stack: List[Tuple[int, str]] = []
+    for raw in content.splitlines():
+        line = re.sub(r'\s+#.*$', '', raw).rstrip()
+        stripped = line.lstrip()
+        if not stripped or stripped.startswith(('#', '---', '...')):
+            continue
+        indent = len(line) - len(stripped)
+        if stripped.startswith('- ') or stripped == '-':
+            while stack and stack[-1][0] > indent:
+                stack.pop()
+            entries.append((tuple(key for _, key in stack), _unquote(stripped[1:])))
+            continue
+        key, separator, value = stripped.partition(':')
+        if not separator:
+            continue
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        stack.append((indent, _unquote(key)))
+        path = tuple(key for _, key in stack)
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            entries.extend((path, _unquote(item)) for item in value[1:-1].split(',') if item.strip())
+        elif value and value not in ('|', '>', '|-', '>-'):
+            entries.append((path, _unquote(value)))
+    return entries
+
+
+def _parse_maven(manifest: BuildManifest, content: str):
+    root = ET.fromstring(content)
+    namespace = root.tag[1:].split('}')[0] if root.tag.startswith('{') else ""
+
+    def tag(name: str) -> str:
+        return "/".join(f"{{{namespace}}}{part}" if namespace else part for part in name.split("/"))
+
+    def text(element, name: str) -> str:
+        found = element.find(tag(name))
+        return (found.text or "").strip() if found is not None else ""
+
+    group = text(root, "groupId") or text(root, "parent/groupId")
+    artifact = text(root, "artifactId")
+    version = text(root, "version") or text(root, "parent/version")
+    packaging = text(root, "packaging")
+    manifest.name = ":".join(part for part in (group, artifact, version) if part) + (
+        f" ({packaging})" if packaging else "")
+
+    parent = text(root, "parent/artifactId")
+    if parent:
+        manifest.add("runtimes", f"{parent} {text(root, 'parent/version')}")
+    properties = root.find(tag("properties"))
+    if properties is not None:
+        for prop in properties:
+            name = prop.tag.split('}')[-1]
+            if name in ("java.version", "maven.compiler.release", "maven.compiler.source",
+                        "kotlin.version", "node.version", "spring-boot.version"):
+                manifest.add("runtimes", f"{name} {(prop.text or '').strip()}")
+    for dependency in root.findall(tag("dependencies/dependency")):
+        version = text(dependency, "version")
+        coordinate = f"{text(dependency, 'groupId')}:{text(dependency, 'artifactId')}"
+        if version and not version.startswith("${"):
+            coordinate += f":{version}"
+        target = "dev_dependencies" if text(dependency, "scope") == "test" else "dependencies"
+        manifest.add(target, coordinate)
+    for plugin in root.findall(tag("build/plugins/plugin")):
+        manifest.add("plugins", text(plugin, "artifactId"))
+    for module in root.findall(tag("modules/module")):
+        manifest.add("modules", module.text)
+
+
+def _parse_gradle(manifest: BuildManifest, content: str):
+    for match in GRADLE_PLUGIN_PATTERN.finditer(content):
+        plugin_id, version, kotlin, applied = match.groups()
+        if plugin_id:
+            manifest.add("plugins", f"{plugin_id} {version}" if version else plugin_id)
+        manifest.add("plugins", f"kotlin-{kotlin}" if kotlin else None, applied)
+    for match in GRADLE_JAVA_PATTERN.finditer(content):
+        manifest.add("runtimes", "java " + next(group for group in match.groups() if group).replace('_', '.'))
+    for configuration, coordinate in GRADLE_DEPENDENCY_PATTERN.findall(content):
+        if configuration in ("id", "classpath", "version"):
+            continue
+        is_test = configuration.startswith(GRADLE_TEST_CONFIGURATIONS)
+        manifest.add("dev_dependencies" if is_test else "dependencies", coordinate)
+    group = re.search(r'^\s*group\s*=\s*[\'"]([^\'"]+)', content, re.MULTILINE)
+    version = re.search(r'^\s*version\s*=\s*[\'"]([^\'"]+)', content, re.MULTILINE)
+    if group or version:
+        manifest.name = ":".join(match.group(1) for match in (group, version) if match)
+    main_class = re.search(r'mainClass(?:Name)?\s*(?:=|\.set\s*\()\s*[\'"]([^\'"]+)', content)
+    if main_class:
+        manifest.add("commands", f"mainClass {main_class.group(1)}")
+
+
+def _parse_gradle_settings(manifest: BuildManifest, content: str):
+    name = re.search(r'rootProject\.name\s*=\s*[\'"]([^\'"]+)', content)
+    if name:
+        manifest.name = name.group(1)
+    for include in re.findall(r'^\s*include\s*\(?([^)\n]+)', content, re.MULTILINE):
+        manifest.add("modules", *re.findall(r'[\'"]([^\'"]+)[\'"]', include))
+
+
+def _parse_npm(manifest: BuildManifest, content: str):
+    package = json.loads(content)
+    manifest.name = " ".join(str(package[key]) for key in ("name", "version") if package.get(key)) or None
+    for runtime, version in (package.get("engines") or {}).items():
+        manifest.add("runtimes", f"{runtime} {version}")
+    manifest.add("runtimes", package.get("packageManager"))
+    for name, version in (package.get("dependencies") or {}).items():
+        manifest.add("dependencies", f"{name}@{version}")
+    for name, version in (package.get("devDependencies") or {}).items():
+        manifest.add("dev_dependencies", f"{name}@{version}")
+    for name, command in (package.get("scripts") or {}).items():
+        manifest.scripts[name] = _shorten(str(command))
+    workspaces = package.get("workspaces") or []
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get("packages", [])
+    manifest.add("modules", *workspaces)
+    if package.get("main"):
+        manifest.add("commands", f"main {package['main']}")
+    bins = package.get("bin")
+    if isinstance(bins, dict):
+        manifest.add("commands", *(f"bin {name}: {path}" for name, path in bins.items()))
+    elif bins:
+        manifest.add("commands", f"bin {bins}")
+
+
+def _parse_pyproject(manifest: BuildManifest, content: str):
+    data = tomllib.loads(content)
+    project = data.get("project", {})
+    poetry = data.get("tool", {}).get("poetry", {})
+    name = project.get("name") or poetry.get("name")
+    version = project.get("version") or poetry.get("version")
+    manifest.name = " ".join(part for part in (name, version) if part) or None
+    manifest.add("runtimes", f"python {project['requires-python']}" if project.get("requires-python") else None)
+    manifest.add("dependencies", *project.get("dependencies", []))
+    for group, dependencies in project.get("optional-dependencies", {}).items():
+        manifest.add("dev_dependencies", *(f"[{group}] {dependency}" for dependency in dependencies))
+    for name, target in {**project.get("scripts", {}), **poetry.get("scripts", {})}.items():
+        manifest.scripts[name] = str(target)
+
+    def poetry_dependencies(table: dict) -> List[str]:
+        return [f"{name} {spec if isinstance(spec, str) else spec.get('version', '')}".strip()
+                for name, spec in table.items() if name != "python"]
+
+    if "python" in poetry.get("dependencies", {}):
+        manifest.add("runtimes", f"python {poetry['dependencies']['python']}")
+    manifest.add("dependencies", *poetry_dependencies(poetry.get("dependencies", {})))
+    manifest.add("dev_dependencies", *poetry_dependencies(poetry.get("dev-dependencies", {})))
+    for group in poetry.get("group", {}).values():
+        manifest.add("dev_dependencies", *poetry_dependencies(group.get("dependencies", {})))
+    manifest.add("plugins", data.get("build-system", {}).get("build-backend"))
+
+
+def _parse_requirements(manifest: BuildManifest, content: str):
+    target = "dev_dependencies" if re.search(r'dev|test|lint', manifest.path, re.IGNORECASE) else "dependencies"
+    for line in content.splitlines():
+        line = re.sub(r'(^|\s)#.*$', '', line).strip()
+        if line.startswith(('-r ', '--requirement', '-c ')):
+            manifest.add("modules", line.split(None, 1)[-1])
+        elif line and not line.startswith('--'):
+            manifest.add(target, line)
+
+
+def _parse_dockerfile(manifest: BuildManifest, content: str):
+    content = re.sub(r'\\\s*\n', ' ', content)
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        instruction, _, argument = line.partition(' ')
+        instruction, argument = instruction.upper(), argument.strip()
+        if instruction == 'FROM':
+            image = re.sub(r'^--platform=\S+\s+', '', argument)
+            manifest.add("runtimes", re.split(r'\s+as\s+', image, flags=re.IGNORECASE)[0])
+        elif instruction == 'EXPOSE':
+            manifest.add("ports", *argument.split())
+        elif instruction in ('RUN', 'CMD', 'ENTRYPOINT'):
+            manifest.add("commands", f"{instruction} {_shorten(argument)}")
+        elif instruction == 'ENV':
+            # ENV KEY=value KEY2=value2 또는 ENV KEY value
+            if '=' in argument.split(' ', 1)[0]:
+                manifest.add("env", *re.findall(r'(?:^|\s)([A-Za-z_]\w*)=', argument))
+            else:
+                manifest.add("env", argument.split(' ', 1)[0])
+        elif instruction == 'ARG':
+            manifest.add("env", argument.split('=')[0])
+
+
+def _parse_compose(manifest: BuildManifest, content: str):
+    services: Dict[str, Dict[str, List[str]]] = {}
+    for path, value in _yaml_entries(content):
+        if len(path) < 3 or path[0] != 'services':
+            continue
+        service, key = services.setdefault(path[1], {}), path[2]
+        if key == 'environment':
+            manifest.add("env", path[3] if len(path) > 3 else value.split('=')[0])
+            continue
+        if key == 'depends_on' and len(path) > 3:
+            value = path[3]  # depends_on: {db: {condition: ...}}
+        elif key == 'build' and len(path) > 3 and path[3] != 'context':
+            continue
+        elif key not in ('image', 'build', 'ports', 'expose', 'depends_on', 'command', 'env_file'):
+            continue
+        values = service.setdefault(key, [])
+        if value not in values:
+            values.append(value)
+        if key in ('ports', 'expose'):
+            manifest.add("ports", value)
+    for name, fields in services.items():
+        details = ", ".join(f"{key} {' '.join(values)}" for key, values in fields.items())
+        manifest.add("services", f"{name}: {details}" if details else name)
+        if 'image' in fields:
+            manifest.add("runtimes", *fields['image'])
+    manifest.add("env", *PLACEHOLDER_PATTERN.findall(content))
+
+
+def _parse_makefile(manifest: BuildManifest, content: str):
+    lines = content.splitlines()
+    for index, line in enumerate(lines):
+        match = MAKE_TARGET_PATTERN.match(line)
+        if not match or line.startswith('\t'):
+            continue
+        targets, prerequisites = match.groups()
+        recipe = next((candidate.strip() for candidate in lines[index + 1:index + 4]
+                       if candidate.startswith('\t') and candidate.strip()), "")
+        for target in targets.split():
+            if target.startswith('.') or '%' in target:
+                continue
+            manifest.scripts[target] = _shorten(recipe or prerequisites.strip())
+
+
+def _parse_spring_config(manifest: BuildManifest, content: str):
+    if manifest.path.endswith('.properties'):
+        entries = [(key.strip(), value.strip()) for key, _, value in
+                   (line.partition('=') for line in content.splitlines()
+                    if line.strip() and not line.lstrip().startswith(('#', '!')))]
+    else:
+        entries = [(".".join(path), value) for path, value in _yaml_entries(content)]
+    for key, value in entries:
+        if key == 'server.port':
+            manifest.add("ports", value)
+        elif key == 'spring.application.name':
+            manifest.name = value
+        elif key == 'spring.profiles.active':
+            manifest.add("runtimes", f"profile {value}")
+        elif key.endswith('datasource.url') or key.endswith('mongodb.uri') or key.endswith('redis.host'):
+            kind = re.match(r'(?:jdbc:)?(\w+)', value)
+            manifest.add("services", f"{key}: {kind.group(1) if kind else value}")
+    manifest.add("env", *PLACEHOLDER_PATTERN.findall(content))
+
+
+def _parse_dotenv(manifest: BuildManifest, content: str):
+    manifest.add("env", *re.findall(r'^\s*(?:export\s+)?([A-Za-z_]\w*)\s*=', content, re.MULTILINE))
+
+
+# (파일명 패턴, 종류, 파서) - 처음 일치한 항목 사용
+MANIFEST_PARSERS: Sequence[Tuple[Tuple[str, ...], str, Callable[[BuildManifest, str], None]]] = (
+    (("pom.xml",), "maven", _parse_maven),
+    (("build.gradle", "build.gradle.kts"), "gradle", _parse_gradle),
+    (("settings.gradle", "settings.gradle.kts"), "gradle settings", _parse_gradle_settings),
+    (("package.json",), "npm", _parse_npm),
+    (("pyproject.toml",), "python", _parse_pyproject),
+    (("requirements*.txt",), "pip", _parse_requirements),
+    (("docker-compose*.yml", "docker-compose*.yaml", "compose.yml", "compose.yaml"), "docker compose", _parse_compose),
+    (("Dockerfile", "Dockerfile.*", "*.Dockerfile", "*.dockerfile"), "docker", _parse_dockerfile),
+    (("Makefile", "makefile", "GNUmakefile"), "make", _parse_makefile),
+    (("application*.properties", "application*.yml", "application*.yaml"), "spring config", _parse_spring_config),
+    ((".env", ".env.*"), "env", _parse_dotenv),
+)
+
+
+class BuildManifestExtractor:
+    """빌드/설정 파일을 의존성, 스크립트, 포트, 런타임 중심의 짧은 요약으로 변환
+
+    pom.xml, build.gradle, package.json, pyproject.toml, requirements.txt,
+    Dockerfile, docker-compose.yml, Makefile 등은 구조를 해석하여 필요한
+    항목만 남기고, 파서가 없는 파일은 앞부분만 원문으로 포함한다.
+    """
+
+    @staticmethod
+    def parser_for(filename: str) -> Tuple[str, Optional[Callable[[BuildManifest, str], None]]]:
+        for patterns, kind, parser in MANIFEST_PARSERS:
+            if any(fnmatch.fnmatchcase(filename, pattern) for pattern in patterns):
+                return kind, parser
+        return os.path.splitext(filename)[1].lstrip('.') or filename, None
+
+    def extract(self, file_path: str, root: str) -> Optional[BuildManifest]:
+        rel_path = os.path.relpath(file_path, root)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"빌드 파일 읽기 오류 ({rel_path}): {str(e)}")
+            return None
+
+        kind, parser = self.parser_for(os.path.basename(file_path))
+        manifest = BuildManifest(path=rel_path, kind=kind)
+        if parser is None:
+            manifest.raw = self._head(content)
+            return manifest
+        try:
+            parser(manifest, content)
+        except Exception as e:
+            # 형식이 깨진 파일은 원문 앞부분으로 대체
+            logger.warning(f"빌드 파일 해석 실패 ({rel_path}): {str(e)}")
+            manifest = BuildManifest(path=rel_path, kind=kind, raw=self._head(content))
+        return manifest
+
+    @staticmethod
+    def _head(content: str) -> str:
+        lines = [line.rstrip() for line in content.splitlines() if line.strip()]
+        if len(lines) > MAX_RAW_LINES:
+            lines = lines[:MAX_RAW_LINES] + [f"... ({len(lines) - MAX_RAW_LINES} more lines)"]
+        return "\n".join(lines)
+
+    def summarize(self, build_files: Sequence[str], root: str) -> str:
+        """빌드 파일 목록의 요약 (루트에 가까운 파일부터)"""
+        ordered = sorted(build_files, key=lambda path: (os.path.relpath(path, root).count(os.sep), path))
+        manifests = [manifest for manifest in (self.extract(path, root) for path in ordered) if manifest]
+        return "\n\n".join(manifest.render() for manifest in manifests)
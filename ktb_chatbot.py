@@ -1,12 +1,14 @@
 from ktb_prompts import *
 from ktb_settings import *
 from ktb_func import *
+from ktb_usage import JobUsage
 
+import asyncio
 import os
+import time
 from typing import List, Dict, Optional, Any, Generator, Union
 from pathlib import Path
 import logging
-import tiktoken
 import aiofiles
 
 """**FUNCTION FOR CHAT**"""
@@ -15,79 +17,71 @@ logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 
-def search_file(repo_path, filename):
-    repo_path = Path(repo_path)
-
-    # 경로 안의 모든 파일과 폴더를 탐색
-    for file_path in repo_path.rglob(filename):
-        return file_path  # 첫 번째로 찾은 파일 반환
-
-    return None  # 파일이 없으면 None 반환
-
-
-async def process_file(file_path: Path, vector_store, file_metadata, chunk_id_counter: int) -> int:
-    """파일을 처리하고 벡터 스토어에 추가"""
+async def process_file(file_path: Path, vector_store, file_metadata, chunk_id_counter: int,
+                       doc: Optional[str] = None) -> int:
+    """파일을 처리하고 벡터 스토어에 추가 (doc이 주어지면 파일을 다시 읽지 않음)"""
     try:
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
-            doc = await file.read()
-            if doc.strip():
-                if file_path.suffix == '.md':
-                    chunks = embedding_chunker.chunk(doc)
-                    if chunks:
-                        chunk_contents = [
-                            chunk.text.replace('\n', ' ').strip()
-                            for chunk in chunks if chunk.text.strip()
-                        ]
-                        if chunk_contents:
-                            chunk_ids = [
-                                f"{file_path}_{i}"
-                                for i in range(chunk_id_counter, chunk_id_counter + len(chunk_contents))
-                            ]
-                            chunk_metadatas = [
-                                file_metadata for _ in range(len(chunk_contents))]
-                            vector_store.add(
-                                documents=chunk_contents,
-                                metadatas=chunk_metadatas,
-                                ids=chunk_ids
-                            )
-                            # print(f"Successfully processed file: {
-                            #       file_metadata["filename"]} - Added {len(chunks)} chunks")
-                            return len(chunk_contents)
-                else:
-                    if len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(doc)) <= 8191:
-                        # print(f"file: {file_metadata["filename"]} len: {
-                        #       len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(doc))}")
-                        vector_store.upsert(
-                            documents=[doc.replace('\n', ' ').strip()],
-                            metadatas=[file_metadata],
-                            ids=[f"{file_path}"]
-                        )
-                        # print(f"Successfully processed file: {
-                        #       file_metadata["filename"]}")
-                        return 1
-                    else:
-                        # print(f"will chunk file: {file_metadata["filename"]} len: {
-                        #       len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(doc))}")
-                        max_chunk_size = 8192
-                        overlap_size = 100
-                        chunks = [
-                            doc[i:i + max_chunk_size]
-                            for i in range(0, len(doc), max_chunk_size - overlap_size)
-                        ]
+        if doc is None:
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
+                doc = await file.read()
+        if doc.strip():
+            if file_path.suffix == '.md':
+                chunks = embedding_chunker.chunk(doc)
+                if chunks:
+                    chunk_contents = [
+                        chunk.text.replace('\n', ' ').strip()
+                        for chunk in chunks if chunk.text.strip()
+                    ]
+                    if chunk_contents:
                         chunk_ids = [
                             f"{file_path}_{i}"
-                            for i in range(chunk_id_counter, chunk_id_counter + len(chunks))
+                            for i in range(chunk_id_counter, chunk_id_counter + len(chunk_contents))
                         ]
                         chunk_metadatas = [
-                            file_metadata for _ in range(len(chunks))]
-                        vector_store.upsert(
-                            documents=chunks,
+                            file_metadata for _ in range(len(chunk_contents))]
+                        vector_store.add(
+                            documents=chunk_contents,
                             metadatas=chunk_metadatas,
                             ids=chunk_ids
                         )
-                        print(f"Successfully processed file: {
-                              file_metadata["filename"]} - Added {len(chunks)} chunks")
-                        return len(chunks)
+                        # print(f"Successfully processed file: {
+                        #       file_metadata["filename"]} - Added {len(chunks)} chunks")
+                        return len(chunk_contents)
+            else:
+                if token_estimator.fits(doc, 8191, token_estimator.file_type_of(file_path.name), EMBEDDING_MODEL):
+                    # print(f"file: {file_metadata["filename"]} len: {
+                    #       len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(doc))}")
+                    vector_store.upsert(
+                        documents=[doc.replace('\n', ' ').strip()],
+                        metadatas=[file_metadata],
+                        ids=[f"{file_path}"]
+                    )
+                    # print(f"Successfully processed file: {
+                    #       file_metadata["filename"]}")
+                    return 1
+                else:
+                    # print(f"will chunk file: {file_metadata["filename"]} len: {
+                    #       len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(doc))}")
+                    max_chunk_size = 8192
+                    overlap_size = 100
+                    chunks = [
+                        doc[i:i + max_chunk_size]
+                        for i in range(0, len(doc), max_chunk_size - overlap_size)
+                    ]
+                    chunk_ids = [
+                        f"{file_path}_{i}"
+                        for i in range(chunk_id_counter, chunk_id_counter + len(chunks))
+                    ]
+                    chunk_metadatas = [
+                        file_metadata for _ in range(len(chunks))]
+                    vector_store.upsert(
+                        documents=chunks,
+                        metadatas=chunk_metadatas,
+                        ids=chunk_ids
+                    )
+                    print(f"Successfully processed file: {
+                          file_metadata["filename"]} - Added {len(chunks)} chunks")
+                    return len(chunks)
     except UnicodeDecodeError as e:
         logger.error(f"Unicode decode error in file {file_path}: {str(e)}")
     except Exception as e:
@@ -95,8 +89,22 @@ async def process_file(file_path: Path, vector_store, file_metadata, chunk_id_co
     return 0
 
 
-async def add_data_to_db(db_name: str, path: str, file_type: List[str]) -> int:
-    """DB에 데이터를 추가"""
+def _read_sources(file_paths: List[Path]) -> Dict[Path, str]:
+    """임베딩할 파일 내용 읽기 (읽을 수 없는 파일은 제외)"""
+    sources = {}
+    for file_path in file_paths:
+        try:
+            sources[file_path] = file_path.read_text(encoding='utf-8')
+        except UnicodeDecodeError as e:
+            logger.error(f"Unicode decode error in file {file_path}: {str(e)}")
+        except OSError as e:
+            logger.error(f"Error reading file {file_path}: {str(e)}")
+    return sources
+
+
+async def add_data_to_db(db_name: str, path: str, file_type: List[str],
+                         documents: Optional[Dict[str, str]] = None) -> int:
+    """DB에 데이터를 추가 (documents: 디스크에 없는 생성 문서 {경로: 내용})"""
     try:
         vector_store = chroma_client.get_or_create_collection(
             name=db_name,
@@ -106,22 +114,41 @@ async def add_data_to_db(db_name: str, path: str, file_type: List[str]) -> int:
         repo_path = Path(path)
         total_files_processed = 0
         chunk_id_counter = 0
-        for root, dirs, files in os.walk(repo_path):
-            for filename in files:
-                if filename == '.DS_Store':
-                    continue
-                if any(filename.endswith(ft) or filename == ft for ft in file_type):
-                    file_path = search_file(repo_path, filename)
-                    if file_path and file_path.exists() and file_path.is_file():
-                        file_metadata = {
-                            "filename": filename,
-                            "path": str(file_path),
-                            "repository": db_name
-                        }
-                        chunks_added = await process_file(file_path, vector_store, file_metadata, chunk_id_counter)
-                        chunk_id_counter += chunks_added
-                        if chunks_added > 0:
-                            total_files_processed += 1
+        file_paths = [
+            Path(root) / filename
+            for root, dirs, files in os.walk(repo_path)
+            for filename in sorted(files)
+            if filename != '.DS_Store' and any(filename.endswith(ft) or filename == ft for ft in file_type)
+        ]
+        sources = await asyncio.to_thread(_read_sources, file_paths)
+        for file_path, doc in (documents or {}).items():
+            if any(file_path.endswith(ft) for ft in file_type):
+                sources[Path(file_path)] = doc
+        sources = dict(sorted(
+            sources.items(), key=lambda source: (len(source[0].parts), str(source[0]))))  # 얕은 경로를 대표로
+
+        # 동일·유사 파일은 대표 하나만 임베딩하고 나머지 경로는 메타데이터에 기록
+        aliases = {}
+        if DEDUP_FILES and sources:
+            result = await asyncio.to_thread(duplicate_detector.deduplicate, list(sources.items()))
+            if result.removed:
+                print(f"{db_name} 중복 제거: {result}")
+            sources = {file_path: sources[file_path] for file_path in result.representatives}
+            aliases = result.aliases
+
+        for file_path, doc in sources.items():
+            file_metadata = {
+                "filename": file_path.name,
+                "path": str(file_path),
+                "repository": db_name
+            }
+            if aliases.get(file_path):
+                file_metadata["aliases"] = ", ".join(
+                    str(alias.relative_to(repo_path)) for alias in aliases[file_path])
+            chunks_added = await process_file(file_path, vector_store, file_metadata, chunk_id_counter, doc)
+            chunk_id_counter += chunks_added
+            if chunks_added > 0:
+                total_files_processed += 1
         if total_files_processed == 0:
             logger.error("No valid files were processed")
             return 0
@@ -209,12 +236,15 @@ User Query / Instruct: {query}
         full_prompt.append({"role": "user", "content": user_prompt})
 
         client_gpt = get_openai_client()
+        start_time = time.perf_counter()
         response = client_gpt.chat.completions.create(
             model=GPT_MODEL,
             messages=full_prompt,
             temperature=0.32,
             stream=False  # 항상 스트리밍 비활성화
         )
+        usage_tracker.record_openai_usage(
+            GPT_MODEL, response.usage, time.perf_counter() - start_time, stage="answer")
 
         return response.choices[0].message.content
 
@@ -223,8 +253,12 @@ User Query / Instruct: {query}
         raise
 
 
-def stream_response(query: str, db_list: List[Any], chat_history: Optional[List[dict]] = None, augmented_query: Optional[str] = None) -> Generator:
-    """Generate a streaming response."""
+def stream_response(query: str, db_list: List[Any], chat_history: Optional[List[dict]] = None, augmented_query: Optional[str] = None, usage_job: Optional[JobUsage] = None) -> Generator:
+    """Generate a streaming response.
+
+    제너레이터 본문은 응답 전송 시점에 다른 컨텍스트에서 실행될 수 있으므로
+    사용량을 기록할 작업(usage_job)을 호출 시점에 받는다.
+    """
     try:
         if augmented_query:
             retrieved_docs_source = db_search(augmented_query, db_list[0])
@@ -250,16 +284,23 @@ User Query / Instruct: {query}
         full_prompt.append({"role": "user", "content": user_prompt})
 
         client_gpt = get_openai_client()
+        start_time = time.perf_counter()
         response = client_gpt.chat.completions.create(
             model=GPT_MODEL,
             messages=full_prompt,
             temperature=0.52,
-            stream=True  # 항상 스트리밍 활성화
+            stream=True,  # 항상 스트리밍 활성화
+            stream_options={"include_usage": True}
         )
 
+        usage = None
         for chunk in response:
-            if chunk.choices[0].delta.content is not None:
+            usage = chunk.usage or usage
+            # 마지막 usage 청크는 choices가 비어 있음
+            if chunk.choices and chunk.choices[0].delta.content is not None:
                 yield chunk.choices[0].delta.content
+        usage_tracker.record_openai_usage(
+            GPT_MODEL, usage, time.perf_counter() - start_time, job=usage_job, stage="answer")
 
     except Exception as e:
         logger.error(f"Error generating streaming response: {str(e)}")
@@ -300,16 +341,17 @@ def codebase_chat(query: str, repo_url: str, chat_history: List[dict] = None, st
         if chat_history:
             total_content = ''.join([msg['content']
                                     for msg in chat_history]) + query
-            total_tokens = len(tiktoken.encoding_for_model(
-                GPT_MODEL).encode(total_content))
-            last_message = chat_history[-1] if total_tokens > MAX_TOKEN_LENGTH else chat_history
+            within_limit = token_estimator.fits(
+                total_content, MAX_TOKEN_LENGTH, 'text', GPT_MODEL)
+            last_message = chat_history if within_limit else chat_history[-1]
         else:
             last_message = None
 
         augmented_query = query_augmentation(query, last_message)
 
         if stream:
-            return stream_response(query, db_list, last_message, augmented_query)
+            return stream_response(query, db_list, last_message, augmented_query,
+                                   usage_job=usage_tracker.current_job())
         else:
             return generate_response(query, db_list, last_message, augmented_query, stream)
 
@@ -344,12 +386,15 @@ def query_augmentation(query: str, chat_history: Optional[List[dict]] = None) ->
             previous_query}\nPrevious Response: {previous_response}\nQuery: {query}"}
     ]
     client_gpt = get_openai_client()
+    start_time = time.perf_counter()
     augmented_query = client_gpt.chat.completions.create(
         model=GPT_MODEL,
         messages=messages,
         temperature=0.52,
         max_tokens=150,
     )
+    usage_tracker.record_openai_usage(
+        GPT_MODEL, augmented_query.usage, time.perf_counter() - start_time, stage="augmentation")
 
     return augmented_query.choices[0].message.content
 
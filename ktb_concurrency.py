@@ -0,0 +1,137 @@
+"""LLM 호출 동시성 제어 관련 코드"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = {429}
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 방식으로 동시 요청 수(window)를 조절하는 제어기
+
+    응답 지연과 오류율이 양호하면 window를 가산적으로 늘리고(+1/window per 응답),
+    429/5xx 응답이나 지연 급증 시 곱셈적으로 줄인다. 대기 중인 요청은
+    각자의 이벤트 루프에서 깨우므로 여러 루프/스레드에서 공유할 수 있다.
+    """
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 100,
+                 increase: float = 1.0, decrease_factor: float = 0.5,
+                 latency_tolerance: float = 2.0, name: str = "llm"):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._baseline_latency: Optional[float] = None  # 느린 EWMA (정상 지연 기준)
+        self._recent_latency: Optional[float] = None    # 빠른 EWMA (최근 지연)
+        self._last_decrease = 0.0
+        self.stats = {"success": 0, "throttled": 0, "server_error": 0, "decreases": 0}
+
+    @property
+    def window(self) -> int:
+        """현재 허용 동시 요청 수"""
+        return max(self.min_limit, int(self._limit))
+
+    def snapshot(self) -> dict:
+        """현재 상태 조회"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "window": self.window,
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "baseline_latency": self._baseline_latency,
+                "recent_latency": self._recent_latency,
+                **self.stats,
+            }
+
+    async def acquire(self):
+        """슬롯 확보 (window가 가득 찼으면 대기)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.window and not self._waiters:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            # 슬롯을 받은 직후(재개 전) 취소된 경우 받은 슬롯 반환
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self, latency: Optional[float] = None, status: Optional[int] = None):
+        """슬롯 반환 및 응답 결과에 따른 window 조정
+
+        Args:
+            latency: 요청 소요 시간 (초)
+            status: HTTP 상태 코드 (None이면 window 조정 없이 반환만)
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if status is not None:
+                self._adjust(latency, status)
+            self._wake()
+
+    def _adjust(self, latency: Optional[float], status: int):
+        now = time.monotonic()
+        if status in THROTTLE_STATUSES or status in SERVER_ERROR_STATUSES:
+            self.stats["throttled" if status in THROTTLE_STATUSES else "server_error"] += 1
+            self._decrease(self.decrease_factor, now)
+            return
+        if status >= 400:
+            return
+
+        self.stats["success"] += 1
+        if latency is not None:
+            self._recent_latency = latency if self._recent_latency is None else 0.7 * self._recent_latency + 0.3 * latency
+            self._baseline_latency = latency if self._baseline_latency is None else 0.95 * self._baseline_latency + 0.05 * latency
+            if self._recent_latency > self._baseline_latency * self.latency_tolerance:
+                self._decrease(0.9, now)
+                return
+        self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+
+    def _decrease(self, factor: float, now: float):
+        # 같은 window에서 발생한 연속 실패로 과도하게 줄어들지 않도록 최근 지연만큼 쿨다운
+        cooldown = self._recent_latency or 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self.stats["decreases"] += 1
+        logger.info(f"[{self.name}] 동시 요청 수 감소: {self.window}")
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.window:
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                # 대기자의 이벤트 루프가 이미 종료된 경우
+                self.in_flight -= 1
+
+    def _grant(self, future: asyncio.Future):
+        if future.cancelled():
+            # 깨우는 사이 취소된 경우 슬롯 반환
+            self.release()
+        else:
+            future.set_result(None)
@@ -0,0 +1,316 @@
+"""LLM 컨텍스트 압축 관련 코드"""
+import ast
+import io
+import logging
+import re
+import tokenize
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 압축 단계 (뒤 단계는 앞 단계 결과에 누적 적용)
+LEVELS = ("none", "comments", "whitespace", "boilerplate", "skeleton", "outline")
+
+C_LIKE_TYPES = {'java', 'js', 'ts', 'cpp', 'c', 'cs', 'go', 'kt', 'scala', 'swift', 'rs', 'php'}
+LICENSE_PATTERN = re.compile(r'copyright|licen[cs]e|spdx-license-identifier|all rights reserved', re.IGNORECASE)
+# import/package 문 (컨텍스트의 PACKAGE/IMPORTS 항목과 중복되는 한 줄짜리 문장만)
+IMPORT_LINE_PATTERNS = {
+    'java': re.compile(r'^[ \t]*(?:package|import)\s+(?:static\s+)?[\w.*]+\s*;[ \t]*\n?', re.MULTILINE),
+    'py': re.compile(r'^(?:import\s+[\w., ]+|from\s+[\w.]+\s+import\s+[\w., *]+)[ \t]*\n?', re.MULTILINE),
+    'js': re.compile(r'^[ \t]*import\s+[^;\n]*?from\s+[\'"][^\'"]+[\'"];?[ \t]*\n?', re.MULTILINE),
+    'ts': re.compile(r'^[ \t]*import\s+[^;\n]*?from\s+[\'"][^\'"]+[\'"];?[ \t]*\n?', re.MULTILINE),
+    'cs': re.compile(r'^[ \t]*using\s+[\w.]+\s*;[ \t]*\n?', re.MULTILINE),
+    'cpp': re.compile(r'^[ \t]*#\s*include\s*[<"][^>"]+[>"][ \t]*\n?', re.MULTILINE),
+}
+# 필드 하나를 읽거나 쓰기만 하는 getter/setter (앞의 문서 주석/어노테이션 포함)
+ACCESSOR_PATTERN = re.compile(
+    r'^[ \t]*(?:/\*\*(?:[^*]|\*(?!/))*\*/\s*)?(?:@\w+\s*)*'
+    r'(?:(?:public|protected|private|internal|static|final|override|virtual|inline)\s+)*'
+    r'(?:[\w<>\[\],.?]+[ \t]+)?(?:get|is|set)[A-Z]\w*\s*\([^)]*\)\s*(?::\s*[\w<>\[\]|]+\s*)?(?:const\s*)?'
+    r'\{\s*(?:return\s+(?:this(?:->|\.))?\w+\s*;|(?:this(?:->|\.))?\w+\s*=\s*\w+\s*;)\s*\}[ \t]*\n?',
+    re.MULTILINE)
+# 여는 중괄호 앞 선언부가 함수/메서드 본문인지 판단 (클래스/네임스페이스/초기화 블록은 유지)
+FUNCTION_HEADER_PATTERN = re.compile(
+    r'(?:\)\s*(?:const|noexcept|override|final|async|throws\s+[\w.,\s]+|:\s*[^{};=]+?)?\s*(?:\w+\s*)?|=>\s*|->\s*)$')
+CONTROL_HEADER_PATTERN = re.compile(r'\b(?:if|for|foreach|while|switch|catch|using|lock|synchronized)\s*\([^{};]*\)\s*$')
+
+
+def split_segments(text: str, file_type: str) -> List[Tuple[str, str]]:
+    """C 계열 소스를 (종류, 텍스트) 조각으로 분리
+
+    종류는 code, string, comment, doc(/** */, C# ///) 중 하나이다.
+    문자열/문자 리터럴, Java 텍스트 블록, C# verbatim 문자열,
+    JS 템플릿 문자열과 정규식 리터럴 안의 주석 기호는 주석으로 보지 않는다.
+    """
+    segments: List[Tuple[str, str]] = []
+    js = file_type in ('js', 'ts')
+    n = len(text)
+    i = start = 0
+    last_code = ''  # 정규식 리터럴 판별용 직전 코드 문자
+
+    def emit(kind: str, begin: int, end: int):
+        if begin < end:
+            segments.append((kind, text[begin:end]))
+
+    while i < n:
+        c = text[i]
+        end = -1
+        kind = ''
+        if c == '/' and text.startswith('//', i):
+            end = text.find('\n', i)
+            end = n if end < 0 else end
+            kind = 'doc' if file_type == 'cs' and text.startswith('///', i) else 'comment'
+        elif c == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            kind = 'doc' if text.startswith('/**', i) and not text.startswith('/**/', i) else 'comment'
+        elif c == '"' and file_type == 'java' and text.startswith('"""', i):
+            end = text.find('"""', i + 3)
+            end = n if end < 0 else end + 3
+            kind = 'string'
+        elif c in '"\'' or (js and c == '`'):
+            verbatim = file_type == 'cs' and i > 0 and text[i - 1] == '@'
+            j = i + 1
+            while j < n:
+                if text[j] == '\\' and not verbatim:
+                    j += 2
+                    continue
+                if text[j] == c:
+                    if verbatim and text.startswith(c * 2, j):
+                        j += 2
+                        continue
+                    break
+                if text[j] == '\n' and c != '`' and not verbatim:
+                    break  # 닫히지 않은 리터럴은 줄 끝에서 종료
+                j += 1
+            end = min(j + 1, n)
+            kind = 'string'
+        elif js and c == '/' and (not last_code or last_code in '(,=:[!&|?{};'):
+            j = i + 1
+            in_class = False
+            while j < n and text[j] != '\n':
+                if text[j] == '\\':
+                    j += 2
+                    continue
+                if text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                elif text[j] == '/' and not in_class:
+                    break
+                j += 1
+            if j < n and text[j] == '/':
+                end = j + 1
+                kind = 'string'
+
+        if end < 0:
+            if not c.isspace():
+                last_code = c
+            i += 1
+            continue
+        emit('code', start, i)
+        emit(kind, i, end)
+        if kind == 'string':
+            last_code = 'a'
+        i = start = end
+    emit('code', start, n)
+    return segments
+
+
+def _strip_c_comments(text: str, file_type: str) -> str:
+    """일반 주석과 라이선스 헤더 제거 (문서 주석은 유지)"""
+    segments = split_segments(text, file_type)
+    output = []
+    leading = True
+    for kind, value in segments:
+        if leading and kind in ('comment', 'doc') and LICENSE_PATTERN.search(value):
+            continue
+        if kind == 'comment':
+            continue
+        if kind != 'code' or value.strip():
+            leading = False
+        output.append(value)
+    return "".join(output)
+
+
+def _strip_python_comments(text: str) -> str:
+    """# 주석 제거 (docstring은 유지)"""
+    lines = text.splitlines(keepends=True)
+    try:
+        comments = [
+            token.start for token in tokenize.generate_tokens(io.StringIO(text).readline)
+            if token.type == tokenize.COMMENT
+        ]
+    except (tokenize.TokenError, SyntaxError) as e:
+        logger.debug(f"Python 토큰화 실패, 줄 단위로 주석 제거: {str(e)}")
+        return "".join(line for line in lines if not line.lstrip().startswith('#'))
+    for row, col in comments:
+        line = lines[row - 1]
+        newline = '\n' if line.endswith('\n') else ''
+        lines[row - 1] = line[:col].rstrip() + newline
+    return "".join(lines)
+
+
+def _collapse_whitespace(text: str) -> str:
+    """줄 끝 공백과 빈 줄 제거"""
+    return "\n".join(line.rstrip() for line in text.splitlines() if line.strip())
+
+
+def _strip_boilerplate(text: str, file_type: str) -> str:
+    """컨텍스트에 이미 있는 import/package 문과 단순 getter/setter 제거"""
+    pattern = IMPORT_LINE_PATTERNS.get(file_type)
+    if pattern:
+        text = pattern.sub('', text)
+    if file_type in C_LIKE_TYPES:
+        text = ACCESSOR_PATTERN.sub('', text)
+    return text
+
+
+def _python_skeleton(text: str) -> str:
+    """함수 본문을 ...로 바꾸고 시그니처/docstring/클래스 구조만 유지"""
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return "\n".join(
+            line for line in text.splitlines()
+            if re.match(r'\s*(?:async\s+def|def|class|@)\b', line))
+
+    replacements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                visit(node.body)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                statements = node.body
+                if (statements and isinstance(statements[0], ast.Expr)
+                        and isinstance(statements[0].value, ast.Constant)
+                        and isinstance(statements[0].value.value, str)):
+                    statements = statements[1:]  # docstring 유지
+                if statements and statements[0].lineno > node.lineno:
+                    replacements.append((statements[0].lineno, node.end_lineno, statements[0].col_offset))
+
+    visit(tree.body)
+    lines = text.splitlines()
+    for first, last, indent in sorted(replacements, reverse=True):
+        lines[first - 1:last] = [" " * indent + "..."]
+    return "\n".join(lines)
+
+
+def _c_skeleton(text: str, file_type: str) -> str:
+    """함수/메서드 본문을 { ... }로 바꾸고 선언부와 문서 주석만 유지"""
+    output: List[str] = []
+    header: List[str] = []  # 마지막 ; { } 이후의 선언부
+    depth = 0  # 건너뛰는 본문 안의 중괄호 깊이
+    for kind, value in split_segments(text, file_type):
+        if kind != 'code':
+            if not depth:
+                output.append(value)
+                header.append(value)
+            continue
+        start = header_start = 0
+        for index, char in enumerate(value):
+            if depth:
+                if char == '{':
+                    depth += 1
+                elif char == '}':
+                    depth -= 1
+                    if not depth:
+                        start = header_start = index + 1
+                        header = []
+                continue
+            if char in ';}':
+                header = []
+                header_start = index + 1
+            elif char == '{':
+                declaration = ("".join(header) + value[header_start:index]).strip()
+                header = []
+                header_start = index + 1
+                if (FUNCTION_HEADER_PATTERN.search(declaration)
+                        and not CONTROL_HEADER_PATTERN.search(declaration)):
+                    output.append(value[start:index] + "{ ... }")
+                    depth = 1
+        if not depth:
+            output.append(value[start:])
+            header.append(value[header_start:])
+    return "".join(output)
+
+
+@dataclass
+class CompressionReport:
+    """단계별 전체 컨텍스트 토큰 수"""
+    tokens: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def level(self) -> str:
+        return next(reversed(self.tokens), "none")
+
+    def saved(self) -> Dict[str, int]:
+        """단계별 절감 토큰 수 (직전 단계 대비)"""
+        saved = {}
+        previous = None
+        for level, tokens in self.tokens.items():
+            if previous is not None:
+                saved[level] = previous - tokens
+            previous = tokens
+        return saved
+
+    def __str__(self) -> str:
+        if not self.tokens:
+            return "압축 없음"
+        first = next(iter(self.tokens.values()))
+        last = self.tokens[self.level]
+        detail = ", ".join(f"{level} -{tokens}" for level, tokens in self.saved().items())
+        return f"{first} -> {last} tokens ({self.level}; {detail or '압축 없음'})"
+
+
+class ContextCompressor:
+    """소스 코드 컨텍스트 압축기
+
+    단계는 comments(주석/라이선스 제거) -> whitespace(공백 정리)
+    -> boilerplate(중복 import, getter/setter 제거) -> skeleton(시그니처와
+    docstring만 유지) -> outline(구조 분석 결과의 심볼 목록) 순으로 누적 적용한다.
+    """
+
+    def __init__(self, token_counter: Optional[Callable[[str], int]] = None):
+        self.token_counter = token_counter or (lambda text: len(text) // 4)
+
+    @staticmethod
+    def levels_until(max_level: str) -> Tuple[str, ...]:
+        if max_level not in LEVELS:
+            raise ValueError(f"알 수 없는 압축 단계: {max_level}")
+        return LEVELS[:LEVELS.index(max_level) + 1]
+
+    def apply(self, content: str, file_type: str, level: str, outline=None) -> str:
+        """한 단계만 적용 (이전 단계까지 적용된 내용을 입력으로 받음)
+
+        outline 단계는 SourceOutline이 있을 때만 적용한다.
+        """
+        try:
+            if level == "comments":
+                if file_type == 'py':
+                    return _strip_python_comments(content)
+                if file_type in C_LIKE_TYPES:
+                    return _strip_c_comments(content, file_type)
+            elif level == "whitespace":
+                return _collapse_whitespace(content)
+            elif level == "boilerplate":
+                return _strip_boilerplate(content, file_type)
+            elif level == "skeleton":
+                if file_type == 'py':
+                    return _python_skeleton(content)
+                if file_type in C_LIKE_TYPES:
+                    return _c_skeleton(content, file_type)
+            elif level == "outline":
+                if outline is not None and outline.symbols:
+                    return outline.render()
+        except Exception as e:
+            logger.error(f"컨텍스트 압축 오류 ({level}, {file_type}): {str(e)}")
+        return content
+
+    def compress(self, content: str, file_type: str, level: str, outline=None) -> str:
+        """level까지의 모든 단계를 누적 적용"""
+        for step in self.levels_until(level)[1:]:
+            content = self.apply(content, file_type, step, outline)
+        return content
@@ -0,0 +1,216 @@
+"""import 그래프 기반 컨텍스트 선택 관련 코드"""
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JS_EXTENSIONS = ('', '.ts', '.tsx', '.js', '.jsx', '.mjs', '/index.ts', '/index.tsx', '/index.js')
+# 파일 역할별 가중치 (경로/파일명 패턴, 가중치) - 처음 일치한 항목 적용
+ROLE_WEIGHTS: Sequence[Tuple[re.Pattern, float]] = (
+    (re.compile(r'(?:^|/)(?:tests?|__tests__|spec)/|(?:test|spec|tests)\.\w+$|(?:^|/)test_\w+\.py$', re.IGNORECASE), 0.3),
+    (re.compile(r'generated|migrations?/|\.d\.ts$|\.min\.js$', re.IGNORECASE), 0.3),
+    (re.compile(r'(?:dto|vo|request|response|exception|error|constants?|utils?|helpers?|mapper)s?\.\w+$|/(?:dto|vo|exceptions?|utils?)/', re.IGNORECASE), 0.5),
+    (re.compile(r'(?:^|/)(?:main|app|server|index|program|manage|cli|__main__)\.\w+$|application\.\w+$', re.IGNORECASE), 3.0),
+    (re.compile(r'(?:controller|router|routes?|api|handler|endpoint|resource|service|usecase|facade)s?\.\w+$|/(?:controllers?|routes?|api|handlers?|services?)/', re.IGNORECASE), 1.5),
+    (re.compile(r'(?:model|entity|domain|repository|schema|store)s?\.\w+$|/(?:models?|entity|entities|domain|repositor(?:y|ies))/', re.IGNORECASE), 1.2),
+)
+ENTRY_POINT_PATTERN = re.compile(
+    r'if\s+__name__\s*==\s*[\'"]__main__[\'"]|public\s+static\s+void\s+main\s*\(|\bint\s+main\s*\('
+    r'|static\s+(?:async\s+)?\w+\s+Main\s*\(|@SpringBootApplication|\.listen\s*\(|createApp\s*\(|FastAPI\s*\(|Flask\s*\(')
+ENTRY_POINT_WEIGHT = 3.0
+
+
+class ContextRanker:
+    """소스 파일 import 그래프의 PageRank와 파일 역할로 중요도를 계산
+
+    파일 객체는 SourceFileInfo처럼 path, package, class_name, file_type,
+    outline(SourceOutline, 없으면 imports 사용), content 속성을 가진다.
+    import하는 파일에서 import되는 파일로 간선을 두므로 여러 곳에서 쓰는
+    핵심 도메인 클래스의 점수가 높아지고, 아무도 import하지 않는 진입점은
+    역할 가중치로 보정한다.
+    """
+
+    def __init__(self, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-6):
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+
+    @staticmethod
+    def _modules(info) -> List[str]:
+        outline = getattr(info, 'outline', None)
+        if outline is not None:
+            return outline.modules
+        return sorted(info.imports)
+
+    def build_graph(self, files: Sequence, root: Optional[str] = None) -> Dict[str, Set[str]]:
+        """파일 경로 -> import하는 저장소 내부 파일 경로 집합"""
+        paths = [info.path for info in files if info.path]
+        if not paths:
+            return {}
+        root = root or os.path.commonpath(paths)
+        if os.path.isfile(root):
+            root = os.path.dirname(root)
+
+        # FQCN(Java/C#), 점 모듈 경로(Python), 파일 경로(JS/C++) 색인
+        qualified: Dict[str, List[str]] = defaultdict(list)
+        packages: Dict[str, List[str]] = defaultdict(list)
+        dotted: Dict[str, List[str]] = defaultdict(list)
+        by_path = {os.path.normpath(path): path for path in paths}
+        for info in files:
+            if not info.path:
+                continue
+            stem = os.path.splitext(os.path.basename(info.path))[0]
+            if info.package:
+                packages[info.package].append(info.path)
+                for name in {stem, info.class_name}:
+                    if name:
+                        qualified[f"{info.package}.{name}"].append(info.path)
+            if info.file_type == 'py':
+                parts = os.path.splitext(os.path.relpath(info.path, root))[0].split(os.sep)
+                if parts[-1] == '__init__':
+                    parts = parts[:-1]
+                for index in range(len(parts)):  # src/ 등 상위 디렉토리 없이 import하는 경우 대비
+                    dotted[".".join(parts[index:])].append(info.path)
+
+        graph: Dict[str, Set[str]] = {path: set() for path in paths}
+        for info in files:
+            if not info.path:
+                continue
+            for module in self._modules(info):
+                for target in self._resolve(info, module, root, qualified, packages, dotted, by_path):
+                    if target != info.path:
+                        graph[info.path].add(target)
+        return graph
+
+    @staticmethod
+    def _resolve(info, module: str, root: str, qualified, packages, dotted, by_path) -> List[str]:
+        if info.file_type in ('java', 'cs', 'kt', 'scala'):
+            if module in packages:  # 와일드카드/네임스페이스 import
+                return packages[module]
+            name = module
+            while name:
+                if name in qualified:
+                    return qualified[name]
+                if '.' not in name:
+                    break
+                name = name.rsplit('.', 1)[0]  # 중첩 클래스, static import
+            return []
+
+        if info.file_type == 'py':
+            if module.startswith('.'):
+                level = len(module) - len(module.lstrip('.'))
+                base = os.path.relpath(os.path.dirname(info.path), root).split(os.sep)
+                base = [part for part in base if part != '.']
+                base = base[:len(base) - (level - 1)] if level > 1 else base
+                module = ".".join(base + [module.lstrip('.')]).strip('.')
+            name = module
+            while name:
+                if name in dotted:
+                    return dotted[name]
+                if '.' not in name:
+                    break
+                name = name.rsplit('.', 1)[0]  # from 모듈 import 함수/클래스
+            return []
+
+        if info.file_type in ('js', 'ts'):
+            if not module.startswith('.'):
+                return []  # 외부 패키지
+            base = os.path.normpath(os.path.join(os.path.dirname(info.path), module))
+            for extension in JS_EXTENSIONS:
+                target = by_path.get(os.path.normpath(base + extension))
+                if target:
+                    return [target]
+            return []
+
+        if info.file_type in ('cpp', 'c'):
+            local = by_path.get(os.path.normpath(os.path.join(os.path.dirname(info.path), module)))
+            if local:
+                return [local]
+            suffix = os.sep + os.path.normpath(module)
+            return [path for normalized, path in by_path.items() if normalized.endswith(suffix)][:1]
+        return []
+
+    def pagerank(self, graph: Dict[str, Set[str]]) -> Dict[str, float]:
+        nodes = list(graph)
+        if not nodes:
+            return {}
+        count = len(nodes)
+        rank = {node: 1.0 / count for node in nodes}
+        incoming: Dict[str, List[str]] = defaultdict(list)
+        for node, targets in graph.items():
+            for target in targets:
+                incoming[target].append(node)
+        for _ in range(self.iterations):
+            dangling = sum(rank[node] for node in nodes if not graph[node])
+            base = (1.0 - self.damping) / count + self.damping * dangling / count
+            updated = {
+                node: base + self.damping * sum(rank[source] / len(graph[source]) for source in incoming[node])
+                for node in nodes
+            }
+            delta = sum(abs(updated[node] - rank[node]) for node in nodes)
+            rank = updated
+            if delta < self.tolerance:
+                break
+        return rank
+
+    @staticmethod
+    def role_weight(info) -> float:
+        path = (info.path or "").replace(os.sep, '/')
+        weight = 1.0
+        for pattern, role_weight in ROLE_WEIGHTS:
+            if pattern.search(path):
+                weight = role_weight
+                break
+        if weight >= 1.0 and ENTRY_POINT_PATTERN.search(info.content or ""):
+            weight = max(weight, ENTRY_POINT_WEIGHT)
+        return weight
+
+    def rank(self, files: Sequence, root: Optional[str] = None) -> List[Tuple[object, float]]:
+        """(파일, 점수) 목록을 중요도 내림차순으로 반환"""
+        graph = self.build_graph(files, root)
+        scores = self.pagerank(graph)
+        count = max(len(scores), 1)
+        ranked = [
+            # PageRank는 평균 1이 되도록 정규화한 뒤 역할 가중치 적용
+            (info, scores.get(info.path, 1.0 / count) * count * self.role_weight(info))
+            for info in files
+        ]
+        ranked.sort(key=lambda pair: (-pair[1], pair[0].path))
+        edges = sum(len(targets) for targets in graph.values())
+        logger.info(f"import 그래프: 파일 {len(graph)}개, 간선 {edges}개")
+        return ranked
+
+
+def pack_by_rank(costs: Sequence[Sequence[int]], budget: int) -> List[Optional[int]]:
+    """중요도 순으로 정렬된 항목의 표현 수준을 토큰 예산 안에서 선택
+
+    Args:
+        costs: 항목별 표현 비용 목록 (가장 작은 표현부터 원문까지 오름차순)
+        budget: 전체 토큰 예산
+
+    Returns:
+        항목별 선택한 표현 인덱스 (예산이 부족해 제외한 항목은 None)
+    """
+    choice: List[Optional[int]] = [0 if options else None for options in costs]
+    total = sum(options[0] for options in costs if options)
+    # 가장 작은 표현으로도 넘치면 중요도가 낮은 항목부터 제외
+    for index in range(len(costs) - 1, -1, -1):
+        if total <= budget:
+            break
+        if choice[index] is not None:
+            total -= costs[index][0]
+            choice[index] = None
+    # 중요도 순으로 가능한 가장 자세한 표현으로 올림
+    for index, options in enumerate(costs):
+        if choice[index] is None:
+            continue
+        current = options[choice[index]]
+        for level in range(len(options) - 1, choice[index], -1):
+            if total - current + options[level] <= budget:
+                total += options[level] - current
+                choice[index] = level
+                break
+    return choice
@@ -0,0 +1,138 @@
+"""중복/유사 파일 탐지 관련 코드"""
+import hashlib
+import logging
+import re
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+SIGNATURE_BATCH = 4096
+
+
+@dataclass
+class DedupResult:
+    """중복 제거 결과 (대표 항목과 대표별 중복 항목)"""
+    representatives: List[str] = field(default_factory=list)   # 남길 항목 키 (입력 순서 유지)
+    aliases: Dict[str, List[str]] = field(default_factory=dict)  # 대표 키 -> 중복 항목 키 목록
+    exact: int = 0
+    near: int = 0
+
+    @property
+    def removed(self) -> int:
+        return self.exact + self.near
+
+    def __str__(self) -> str:
+        return (f"항목 {len(self.representatives) + self.removed}개 -> {len(self.representatives)}개 "
+                f"(동일 {self.exact}개, 유사 {self.near}개 제외)")
+
+
+class DuplicateDetector:
+    """내용 해시와 MinHash/LSH로 동일·유사 파일을 묶어 대표 하나만 남김
+
+    공백을 정규화한 내용이 같으면 동일 파일로 보고, 나머지는 토큰
+    shingle의 MinHash 서명을 band 단위로 버킷에 넣어 후보 쌍만 비교한다.
+    추정 Jaccard 유사도가 threshold 이상이면 같은 묶음으로 합치며,
+    묶음의 대표는 입력 순서상 가장 앞선 항목이다.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 5, min_shingles: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm은 bands의 배수여야 합니다.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles  # 이보다 짧은 파일은 동일 여부만 검사
+        rng = np.random.default_rng(seed)
+        # 32비트 shingle 해시와 곱해도 uint64를 넘지 않도록 a < 2^31
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256(" ".join(content.split()).encode("utf-8")).hexdigest()
+
+    def signature(self, content: str) -> Optional[np.ndarray]:
+        """MinHash 서명 (shingle 수가 min_shingles 미만이면 None)"""
+        tokens = SHINGLE_TOKEN_PATTERN.findall(content)
+        size = self.shingle_size
+        shingles = {" ".join(tokens[index:index + size]) for index in range(len(tokens) - size + 1)}
+        if len(shingles) < self.min_shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), SIGNATURE_BATCH):
+            batch = hashes[start:start + SIGNATURE_BATCH, None]
+            np.minimum(signature, ((batch * self._a + self._b) % MERSENNE_PRIME).min(axis=0), out=signature)
+        return signature
+
+    def similarity(self, first: np.ndarray, second: np.ndarray) -> float:
+        return float(np.count_nonzero(first == second)) / self.num_perm
+
+    def deduplicate(self, items: Sequence[Tuple[str, str]]) -> DedupResult:
+        """(키, 내용) 목록에서 중복을 묶어 대표 키와 별칭 반환"""
+        parent = list(range(len(items)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        def union(first: int, second: int):
+            first, second = find(first), find(second)
+            if first != second:
+                parent[max(first, second)] = min(first, second)
+
+        exact = 0
+        seen: Dict[str, int] = {}
+        unique: List[int] = []
+        for index, (_, content) in enumerate(items):
+            digest = self.content_hash(content)
+            if digest in seen:
+                union(seen[digest], index)
+                exact += 1
+            else:
+                seen[digest] = index
+                unique.append(index)
+
+        signatures = {index: self.signature(items[index][1]) for index in unique}
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        for index, signature in signatures.items():
+            if signature is None:
+                continue
+            for band in range(self.bands):
+                buckets[(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())].append(index)
+
+        checked = set()
+        for members in buckets.values():
+            for position, first in enumerate(members):
+                for second in members[position + 1:]:
+                    if (first, second) in checked:
+                        continue
+                    checked.add((first, second))
+                    if find(first) != find(second) and \
+                            self.similarity(signatures[first], signatures[second]) >= self.threshold:
+                        union(first, second)
+
+        result = DedupResult(exact=exact)
+        for index, (key, _) in enumerate(items):
+            root = find(index)
+            if root == index:
+                result.representatives.append(key)
+            else:
+                result.aliases.setdefault(items[root][0], []).append(key)
+        result.near = len(items) - len(result.representatives) - exact
+        if result.removed:
+            logger.info(f"중복 제거: {result}")
+        return result
@@ -1,18 +1,29 @@
 """문서 처리 관련 코드"""
-from dataclasses import dataclass, field
-from typing import List, Any, Optional, Set, Dict, Tuple
+from dataclasses import dataclass, field, replace
+from typing import List, Any, Optional, Set, Dict, Tuple, Callable
 import asyncio
+import hashlib
 import logging
-from concurrent.futures import ThreadPoolExecutor
-import multiprocessing
 import aiohttp
 import re
 import os
 import time
 import aiofiles
+import fnmatch
+from urllib.parse import urlparse
 
 from ktb_utils import TextProcessor
 from ktb_api_client import APIClient
+from ktb_archive import S3ZipStreamWriter
+from ktb_artifact_store import ArtifactSink, ArtifactStore
+from ktb_build_manifest import BuildManifestExtractor
+from ktb_context_compressor import LEVELS, CompressionReport, ContextCompressor
+from ktb_context_ranker import ContextRanker, pack_by_rank
+from ktb_source_analyzer import SourceOutline
+from ktb_stream_sink import MarkerSplitSink, ReplaceFilterSink
+from ktb_symbol_index import JavaSymbolIndex
+from ktb_tree_reduce import TreeReducer
+from ktb_usage import TokenBudgetExceeded
 from ktb_prompts import *
 from ktb_settings import *
 from ktb_func import *
@@ -28,6 +39,9 @@ class SourceFileInfo:
     class_name: str = ""              # 클래스/함수명
     content: str = ""                # 파일 전체 내용
     file_type: str = ""             # 파일 타입 (java, py, js 등)
+    path: str = ""                  # 파일 경로
+    outline: Optional[SourceOutline] = None  # 심볼/시그니처/줄 범위 요약
+    aliases: List[str] = field(default_factory=list)  # 내용이 같거나 거의 같아 생략한 파일 경로
 
     def __post_init__(self):
         """데이터 유효성 검증 및 기본값 설정"""
@@ -51,6 +65,7 @@ class SourceFileInfo:
             f"  class_name: {self.class_name}\n"
             f"  file_type: {self.file_type}\n"
             f"  imports: {len(self.imports)} items\n"
+            f"  symbols: {len(self.outline.symbols) if self.outline else 0} items\n"
             f"  content: {len(self.content)} chars\n"
             f")"
         )
@@ -78,131 +93,92 @@ class DocumentProcessor:
             'cpp': self._parse_cpp_file,
             'cs': self._parse_cs_file
         }
+        self.compressor = ContextCompressor(self.text_processor.estimate_tokens)
+        self.context_ranker = ContextRanker()
+        self.manifest_extractor = BuildManifestExtractor()
+        # 청크 요약 계층 병합 (중간 노드 캐시는 요청 간 공유)
+        self.readme_reducer = TreeReducer(
+            self._merge_summaries,
+            token_counter=self.text_processor.estimate_tokens,
+            fan_in=README_REDUCE_FAN_IN,
+            node_budget=README_REDUCE_TOKEN_BUDGET,
+        )
 
-    def _parse_source_file(self, content: str, file_type: str) -> SourceFileInfo:
+    def _parse_source_file(self, content: str, file_type: str, path: str = "") -> SourceFileInfo:
         """소스 파일 파싱"""
         if file_type in self.parsers:
-            return self.parsers[file_type](content)
-        return self._parse_generic_file(content, file_type)
-
-    def _parse_java_file(self, content: str) -> SourceFileInfo:
-        """Java 파일 파싱"""
-        imports = set(re.findall(r'^import\s+[\w.*]+;', content, re.MULTILINE))
-        package_match = re.search(
-            r'^package\s+([\w.]+);', content, re.MULTILINE)
-        class_match = re.search(r'(?:class|interface|enum)\s+(\w+)', content)
-
-        package = package_match.group(1) if package_match else None
-        class_name = class_match.group(1) if class_match else ""
+            return self.parsers[file_type](content, path)
+        return self._parse_generic_file(content, file_type, path)
 
+    def _parse_with_analyzer(self, content: str, file_type: str, path: str = "") -> SourceFileInfo:
+        """구조 분석기(ast/렉서) 결과로 SourceFileInfo 생성"""
+        outline = source_analyzer.analyze(content, file_type)
         return SourceFileInfo(
-            package=package,
-            imports=imports,
-            class_name=class_name,
+            package=outline.package,
+            imports=set(outline.imports),
+            class_name=outline.primary_symbol(path),
             content=content,
-            file_type='java'
+            file_type=file_type,
+            path=path,
+            outline=outline,
         )
 
-    def _parse_python_file(self, content: str) -> SourceFileInfo:
-        """Python 파일 파싱"""
-        imports = set(re.findall(
-            r'^(?:from\s+[\w.]+\s+)?import\s+[\w.*,\s]+', content, re.MULTILINE))
-        class_match = re.search(r'(?:class|def)\s+(\w+)', content)
-        class_name = class_match.group(1) if class_match else ""
+    def _parse_java_file(self, content: str, path: str = "") -> SourceFileInfo:
+        """Java 파일 파싱"""
+        return self._parse_with_analyzer(content, 'java', path)
 
-        return SourceFileInfo(
-            package=None,
-            imports=imports,
-            class_name=class_name,
-            content=content,
-            file_type='py'
-        )
+    def _parse_python_file(self, content: str, path: str = "") -> SourceFileInfo:
+        """Python 파일 파싱"""
+        return self._parse_with_analyzer(content, 'py', path)
 
-    def _parse_javascript_file(self, content: str) -> SourceFileInfo:
+    def _parse_javascript_file(self, content: str, path: str = "") -> SourceFileInfo:
         """JavaScript 파일 파싱"""
-        imports = set(re.findall(
-            r'^(?:import|require)\s+.*?;?$', content, re.MULTILINE))
-        class_match = re.search(r'(?:class|function)\s+(\w+)', content)
-        class_name = class_match.group(1) if class_match else ""
+        return self._parse_with_analyzer(content, 'js', path)
 
-        return SourceFileInfo(
-            package=None,
-            imports=imports,
-            class_name=class_name,
-            content=content,
-            file_type='js'
-        )
-
-    def _parse_typescript_file(self, content: str) -> SourceFileInfo:
+    def _parse_typescript_file(self, content: str, path: str = "") -> SourceFileInfo:
         """TypeScript 파일 파싱"""
-        imports = set(re.findall(
-            r'^(?:import|require)\s+.*?;?$', content, re.MULTILINE))
-        class_match = re.search(
-            r'(?:class|interface|function)\s+(\w+)', content)
-        class_name = class_match.group(1) if class_match else ""
+        return self._parse_with_analyzer(content, 'ts', path)
 
-        return SourceFileInfo(
-            package=None,
-            imports=imports,
-            class_name=class_name,
-            content=content,
-            file_type='ts'
-        )
-
-    def _parse_cpp_file(self, content: str) -> SourceFileInfo:
+    def _parse_cpp_file(self, content: str, path: str = "") -> SourceFileInfo:
         """C++ 파일 파싱"""
-        imports = set(re.findall(r'#include\s+[<"].*?[>"]', content))
-        class_match = re.search(
-            r'(?:class|struct|void|int|bool|char|float|double)\s+(\w+)', content)
-        class_name = class_match.group(1) if class_match else ""
-
-        return SourceFileInfo(
-            package=None,
-            imports=imports,
-            class_name=class_name,
-            content=content,
-            file_type='cpp'
-        )
+        return self._parse_with_analyzer(content, 'cpp', path)
 
-    def _parse_cs_file(self, content: str) -> SourceFileInfo:
+    def _parse_cs_file(self, content: str, path: str = "") -> SourceFileInfo:
         """C# 파일 파싱"""
-        imports = set(re.findall(
-            r'^using\s+([\w\.]+);', content, re.MULTILINE))
-        class_match = re.search(r'(?:class|interface|struct)\s+(\w+)', content)
-        class_name = class_match.group(1) if class_match else ""
-
-        return SourceFileInfo(
-            package=None,
-            imports=imports,
-            class_name=class_name,
-            content=content,
-            file_type='cs'
-        )
+        return self._parse_with_analyzer(content, 'cs', path)
 
-    def _parse_generic_file(self, content: str, file_type: str) -> SourceFileInfo:
+    def _parse_generic_file(self, content: str, file_type: str, path: str = "") -> SourceFileInfo:
         """기본 파서"""
         return SourceFileInfo(
             package=None,
             imports=set(),
             class_name="",
             content=content,
-            file_type=file_type
+            file_type=file_type,
+            path=path
         )
 
     async def process_readme(self, repo_url: str, clone_dir: str, user_name: str, repo_name: str, korean: bool, blocks: List[str]) -> List[Any]:
         """모든 문서 처리 태스크 실행"""
         tasks = []
         start_time = time.perf_counter()
+        # 섹션 캐시 키 (README와 Usage가 공유)
+        repo_hash = await asyncio.to_thread(
+            readme_cache.repo_hash, clone_dir, EXCLUDE_DIRS, repo_url)
         # README 생성 태스크
         readme_task = asyncio.create_task(
-            self._generate_readme(repo_url, clone_dir, korean, blocks),
+            usage_tracker.run_stage(
+                "readme", self._generate_readme(repo_url, clone_dir, korean, blocks, repo_hash)),
             name="readme_generation"
         )
         tasks.append(readme_task)
-        if "START_BLOCK" in blocks:
+        # 섹션 단위 생성에서는 START_BLOCK이 빌드 파일 요약을 컨텍스트로 이미 생성되므로
+        # 같은 섹션을 다시 만드는 Usage 호출과 병합은 전체 README 생성 방식에서만 수행
+        if "START_BLOCK" in blocks and not PARALLEL_README_SECTIONS:
             # Usage 생성 태스크
             usage_task = asyncio.create_task(
-                self._generate_usage(repo_url, clone_dir, korean),
+                usage_tracker.run_stage(
+                    "usage", self._generate_usage(repo_url, clone_dir, korean, repo_hash)),
                 name="usage_generation"
             )
             tasks.append(usage_task)
@@ -228,8 +204,28 @@ class DocumentProcessor:
             raise
 
     async def get_optimized_source_files(self, repo_dir: str) -> Dict[str, List[SourceFileInfo]]:
-        """모든 소스 파일 최적화하여 저장"""
-        package_map = {}
+        """모든 소스 파일 최적화하여 저장 (동일·유사 파일은 대표 하나만)
+
+        파일 읽기, 중복 제거, 구조 분석은 저장소 크기에 비례하므로 이벤트 루프 밖에서 수행한다.
+        """
+        sources, file_types = await asyncio.to_thread(self._read_source_files, repo_dir)
+
+        # 생성 코드/복사본 등 동일·유사 파일은 대표 하나만 남기고 경로를 별칭으로 기록
+        aliases = {}
+        if DEDUP_FILES and sources:
+            sources.sort(key=lambda source: (source[0].count(os.sep), source[0]))  # 얕은 경로를 대표로
+            result = await asyncio.to_thread(duplicate_detector.deduplicate, sources)
+            if result.removed:
+                print(f"소스 파일 중복 제거: {result}")
+            kept = set(result.representatives)
+            sources = [(path, content) for path, content in sources if path in kept]
+            aliases = result.aliases
+
+        return await asyncio.to_thread(
+            self._parse_source_files, repo_dir, sources, file_types, aliases)
+
+    def _read_source_files(self, repo_dir: str) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+        """소스 파일 (경로, 내용) 목록과 경로별 파일 타입"""
         source_extensions = {
             '.java': 'java',
             '.py': 'py',
@@ -240,6 +236,8 @@ class DocumentProcessor:
             # 필요한 확장자 추가
         }
 
+        sources = []
+        file_types = {}
         for root, _, files in os.walk(repo_dir):
             if any(excl in root for excl in EXCLUDE_DIRS):
                 continue
@@ -252,32 +250,51 @@ class DocumentProcessor:
                 file_path = os.path.join(root, file)
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        file_info = self._parse_source_file(
-                            content,
-                            source_extensions[ext]
-                        )
-
-                        # 패키지/모듈별로 분류
-                        key = file_info.package or os.path.dirname(file_path)
-                        if key not in package_map:
-                            package_map[key] = []
-                        package_map[key].append(file_info)
-
+                        sources.append((file_path, f.read()))
+                    file_types[file_path] = source_extensions[ext]
                 except Exception as e:
-                    print(f"파일 파싱 오류 ({file_path}): {str(e)}")
+                    print(f"파일 읽기 오류 ({file_path}): {str(e)}")
+        return sources, file_types
+
+    def _parse_source_files(self, repo_dir: str, sources: List[Tuple[str, str]], file_types: Dict[str, str],
+                            aliases: Dict[str, List[str]]) -> Dict[str, List[SourceFileInfo]]:
+        """소스 파일 구조 분석 후 패키지/모듈별로 분류"""
+        package_map = {}
+        for file_path, content in sources:
+            try:
+                file_info = self._parse_source_file(
+                    content,
+                    file_types[file_path],
+                    file_path
+                )
+                file_info.aliases = [
+                    os.path.relpath(alias, repo_dir) for alias in aliases.get(file_path, [])]
+
+                # 패키지/모듈별로 분류
+                key = file_info.package or os.path.dirname(file_path)
+                if key not in package_map:
+                    package_map[key] = []
+                package_map[key].append(file_info)
+
+            except Exception as e:
+                print(f"파일 파싱 오류 ({file_path}): {str(e)}")
 
         return package_map
 
-    async def _generate_readme(self, repo_url: str, clone_dir: str, korean: bool, blocks: List[str]) -> Optional[str]:
+    async def _generate_readme(self, repo_url: str, clone_dir: str, korean: bool, blocks: List[str],
+                               repo_hash: Optional[str] = None) -> Optional[str]:
         """README 생성"""
+        if PARALLEL_README_SECTIONS:
+            return await self._generate_readme_sections(repo_url, clone_dir, korean, blocks, repo_hash)
         readme_template = generate_readme_prompt(blocks, korean)
         try:
             source_files = await self.get_optimized_source_files(clone_dir)
             if not source_files:
                 logger.error("소스 파일을 찾을 수 없습니다.")
                 return None
-            optimized_context = self._build_optimized_context(source_files)
+            # 압축/순위 계산은 저장소 전체를 다루므로 이벤트 루프 밖에서 수행
+            optimized_context = await asyncio.to_thread(
+                self._build_compressed_context, source_files, GPT_MAX_TOKENS)
             chunks = self.text_processor.split_text(
                 optimized_context, max_tokens=GPT_MAX_TOKENS)  # 청크 크기 제한
             # 청크 단위로 처리하고 결과 병합
@@ -291,68 +308,198 @@ class DocumentProcessor:
             print(f"README generation failed: {str(e)}")
             return None
 
-    def _get_build_files(self, repo_dir: str) -> List[str]:
-        """빌드 파일 목록 가져오기"""
-        build_files = []
+    async def _generate_readme_sections(self, repo_url: str, clone_dir: str, korean: bool,
+                                        blocks: List[str], repo_hash: Optional[str] = None) -> Optional[str]:
+        """README 블록별 병렬 생성 후 요청한 순서로 조립 (캐시에 있는 섹션은 재사용)"""
+        blocks = [block for block in dict.fromkeys(blocks) if block in README_BLOCKS]
+        if not blocks:
+            return None
+        try:
+            start_time = time.perf_counter()
+            sections = await self._load_cached_sections(repo_hash, blocks, korean)
+            pending = [block for block in blocks if block not in sections]
+            if pending:
+                kinds = {kind for block in pending
+                         for kind in README_SECTION_CONTEXTS.get(block, ("source",))}
+                contexts = await self._build_section_contexts(repo_url, clone_dir, korean, pending, kinds)
+                results = await asyncio.gather(*[
+                    self._generate_section(
+                        block, contexts, README_SECTION_CONTEXTS.get(block, ("source",)), repo_url, korean)
+                    for block in pending
+                ])
+                generated = {block: section for block, section in zip(pending, results) if section}
+                sections.update(generated)
+                if repo_hash:
+                    await asyncio.gather(*[
+                        asyncio.to_thread(
+                            readme_cache.put, repo_hash, block, self._language(korean),
+                            self._section_prompt_version(block, korean), section)
+                        for block, section in generated.items()
+                    ])
+            print(f"README 섹션 캐시 재사용 {len(blocks) - len(pending)}개, 생성 {len(pending)}개")
+            if not sections:
+                return None
+            missing = [block for block in blocks if block not in sections]
+            if missing:
+                logger.error(f"README 섹션 생성 실패: {missing}")
+            readme = assemble_readme(
+                self._project_name(repo_url), [block for block in blocks if block in sections], sections)
+            end_time = time.perf_counter()
+            print(f"README 섹션 {len(sections)}개 생성 완료 처리 시간: {end_time - start_time} 초")
+            return readme
 
-        for root, _, files in os.walk(repo_dir):
-            # 제외할 디렉토리 체크
-            if any(excl in root for excl in EXCLUDE_DIRS):
-                continue
+        except TokenBudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"README generation failed: {str(e)}")
+            return None
 
-            # node_modules 디렉토리 체크
-            if "node_modules" in root:
-                continue
+    async def _load_cached_sections(self, repo_hash: Optional[str], blocks: List[str],
+                                    korean: bool) -> Dict[str, str]:
+        """캐시에 있는 README 섹션"""
+        if not repo_hash:
+            return {}
+        results = await asyncio.gather(*[
+            asyncio.to_thread(
+                readme_cache.get, repo_hash, block, self._language(korean),
+                self._section_prompt_version(block, korean))
+            for block in blocks
+        ])
+        return {block: section for block, section in zip(blocks, results) if section}
+
+    @staticmethod
+    def _language(korean: bool) -> str:
+        return "Korean" if korean else "English"
+
+    @staticmethod
+    def _section_prompt_version(block: str, korean: bool) -> str:
+        """캐시용 프롬프트 버전 (수동 버전 + 섹션 프롬프트/컨텍스트 구성/모델/컨텍스트 설정 해시)"""
+        if block == "USAGE":
+            prompt = generate_readme_prompt(["START_BLOCK"], korean)
+            kinds, model = ("build",), USAGE_MODEL
+        else:
+            kinds, model = README_SECTION_CONTEXTS.get(block, ("source",)), GPT_MODEL
+            prompt = generate_readme_section_prompt(block, korean) + repr(kinds)
+        settings = [model, GPT_MAX_TOKENS]
+        if "source" in kinds:
+            # 소스 컨텍스트 구성이 바뀌면 같은 저장소라도 섹션 내용이 달라짐
+            settings += [CONTEXT_COMPRESSION_MIN_LEVEL, CONTEXT_COMPRESSION_MAX_LEVEL, CONTEXT_RANKING,
+                         DEDUP_FILES, DEDUP_SIMILARITY_THRESHOLD]
+        prompt += repr(settings)
+        return f"{README_PROMPT_VERSION}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}"
+
+    async def _build_section_contexts(self, repo_url: str, clone_dir: str, korean: bool,
+                                      blocks: List[str], kinds: Set[str]) -> Dict[str, str]:
+        """섹션 생성에 필요한 컨텍스트 조각을 동시에 준비 (소스 코드는 한 번만 요약)"""
+        builders = {
+            "source": lambda: self._build_source_digest(repo_url, clone_dir, korean, blocks),
+            "tree": lambda: asyncio.to_thread(self._build_directory_tree, clone_dir),
+            "build": lambda: asyncio.to_thread(self._build_section_build_context, clone_dir),
+        }
+        kinds = sorted(kind for kind in kinds if kind in builders)
+        results = await asyncio.gather(*[builders[kind]() for kind in kinds])
+        return dict(zip(kinds, results))
+
+    async def _build_source_digest(self, repo_url: str, clone_dir: str, korean: bool,
+                                   blocks: List[str]) -> str:
+        """소스 코드 컨텍스트 (한 청크를 넘으면 청크 요약을 계층 병합한 결과)"""
+        source_files = await self.get_optimized_source_files(clone_dir)
+        if not source_files:
+            logger.error("소스 파일을 찾을 수 없습니다.")
+            return ""
+        # 압축/순위 계산은 저장소 전체를 다루므로 이벤트 루프 밖에서 수행
+        optimized_context = await asyncio.to_thread(
+            self._build_compressed_context, source_files, GPT_MAX_TOKENS)
+        chunks = self.text_processor.split_text(
+            optimized_context, max_tokens=GPT_MAX_TOKENS)
+        if len(chunks) <= 1:
+            return chunks[0].text if chunks else ""
+        summaries = await self._summarize_chunks(
+            chunks, repo_url, generate_readme_prompt(blocks, korean))
+        summaries = await self.readme_reducer.reduce(
+            summaries, README_REDUCE_TOKEN_BUDGET, namespace=README_MERGE_PROMPT)
+        return "\n\n".join(summaries)
+
+    def _build_section_build_context(self, clone_dir: str) -> str:
+        """빌드 파일 컨텍스트 (한도를 넘으면 파일 목록만)"""
+        build_files = self._get_build_files(clone_dir)
+        context = self.manifest_extractor.summarize(build_files, clone_dir)
+        if self.text_processor.fits_in(context, README_REDUCE_TOKEN_BUDGET):
+            return context
+        return "BUILD FILES:\n" + "\n".join(
+            os.path.relpath(path, clone_dir) for path in build_files)
+
+    def _build_directory_tree(self, clone_dir: str, max_depth: int = 4, max_entries: int = 500) -> str:
+        """디렉토리 구조 (제외 디렉토리 생략, 깊이/항목 수 제한)"""
+        lines = [os.path.basename(os.path.normpath(clone_dir)) + "/"]
+        for root, dirs, files in os.walk(clone_dir):
+            dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS)
+            depth = os.path.relpath(root, clone_dir).count(os.sep) + 1 if root != clone_dir else 0
+            if depth >= max_depth:
+                dirs[:] = []
+            indent = "  " * (depth + 1)
+            if root != clone_dir:
+                lines.append("  " * depth + os.path.basename(root) + "/")
+            lines.extend(indent + file for file in sorted(files))
+            if len(lines) >= max_entries:
+                lines = lines[:max_entries] + ["..."]
+                break
+        return "\n".join(lines)
+
+    async def _generate_section(self, block: str, contexts: Dict[str, str], kinds: Tuple[str, ...],
+                                repo_url: str, korean: bool) -> Optional[str]:
+        """README 섹션 하나 생성 (제목 줄은 템플릿과 같게 맞춤)"""
+        labels = {"source": "SOURCE CODE", "tree": "DIRECTORY STRUCTURE", "build": "BUILD FILES"}
+        context = "\n\n".join(
+            f"[{labels[kind]}]\n{contexts[kind]}" for kind in kinds if contexts.get(kind))
+        if not context:
+            return None
+        section = await self._process_single_context(
+            context, repo_url, generate_readme_section_prompt(block, korean), model=GPT_MODEL)
+        if not section:
+            return None
+        section = remove_markdown_blocks(section).strip()
+        heading = readme_section_heading(block)
+        if not section.startswith(heading):
+            lines = section.split("\n")
+            if lines[0].startswith("#"):
+                lines = lines[1:]
+            section = heading + "\n" + "\n".join(lines).strip()
+        return section
+
+    @staticmethod
+    def _project_name(repo_url: str) -> str:
+        """저장소 URL의 저장소 이름 (github.com/<user>/<repo>/...)"""
+        parts = urlparse(repo_url).path.strip("/").split("/")
+        name = parts[1] if len(parts) > 1 else parts[0]
+        return name[:-4] if name.endswith(".git") else name or "Project Name"
 
-            for file in files:
-                file_path = os.path.join(root, file)
+    def _get_build_files(self, repo_dir: str) -> List[str]:
+        """빌드 파일 목록 가져오기 (파일명 전체를 BUILD_FILE_NAMES 패턴과 비교)"""
+        build_files = []
 
-                # 일반 빌드 파일 체크
-                if file.endswith(tuple(BUILD_FILE_NAMES)) or any(name in file for name in BUILD_FILE_NAMES):
-                    # print(f"빌드 파일 발견: {file}")
-                    build_files.append(file_path)
+        for root, dirs, files in os.walk(repo_dir):
+            # 제외할 디렉토리는 하위 탐색 생략
+            dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS)
+
+            for file in sorted(files):
+                if any(fnmatch.fnmatchcase(file, pattern) for pattern in BUILD_FILE_NAMES):
+                    build_files.append(os.path.join(root, file))
 
         if not build_files:
             print(f"빌드 파일을 찾을 수 없습니다: {repo_dir}")
 
         return build_files
 
-    def _build_files_context(self, build_files: List[str], clone_dir: str) -> str:
-        """빌드 파일들의 컨텍스트 구성"""
-        context_parts = []
-        for file_path in build_files:
-            try:
-                rel_path = os.path.relpath(file_path, clone_dir)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    context_parts.append(
-                        f"FILE_PATH: {rel_path}\nFILE_CONTENT: {
-                            content}\nFILE_END\n\n"
-                    )
-            except Exception as e:
-                print(f"파일 읽기 오류 ({rel_path}): {str(e)}")
-                continue
-        return "".join(context_parts)
-
     async def _process_chunks(self, chunks: List[str], repo_url: str, prompt: str, korean: bool) -> Optional[str]:
         """청크 비동기 처리"""
-        if MODEL.startswith("gemini"):
-            # 세마포어 없이 비동기적으로 청크 처리
-            tasks = [
-                self.process_chunk(chunk.text, repo_url, prompt)
-                for chunk in chunks
-            ]
-            chunk_summaries = await asyncio.gather(*tasks)
-            chunk_summaries = [s for s in chunk_summaries if s]  # None 값 필터링
-        else:
-            async with aiohttp.ClientSession() as session:
-                chunk_summaries = await self.summarize_chunks_batched(
-                    chunks, prompt, session
-                )
+        chunk_summaries = await self._summarize_chunks(chunks, repo_url, prompt)
         if not chunk_summaries:
             return None
 
         start_time = time.perf_counter()
+        chunk_summaries = await self.readme_reducer.reduce(
+            chunk_summaries, README_REDUCE_TOKEN_BUDGET, namespace=README_MERGE_PROMPT)
         messages = [{"role": "system", "content": prompt}]
         for summary in chunk_summaries:
             messages.append({"role": "user", "content": summary})
@@ -366,11 +513,32 @@ class DocumentProcessor:
                 "role": "user",
                 "content": f"Create a readme based on the previous information. git repository url : {repo_url}"
             })
-        doc_response, _ = self._get_completion(messages)
+        doc_response, _ = await self._get_completion(messages)
         end_time = time.perf_counter()
         print(f"README 생성 완료 처리 시간: {end_time - start_time} 초")
         return doc_response
 
+    async def _summarize_chunks(self, chunks: List[str], repo_url: str, prompt: str) -> List[str]:
+        """청크별 부분 요약"""
+        if MODEL.startswith("gemini"):
+            # 동시 요청 수는 api_client의 Gemini 동시성 제어기가 조절
+            tasks = [
+                self.process_chunk(chunk.text, repo_url, prompt)
+                for chunk in chunks
+            ]
+            chunk_summaries = await asyncio.gather(*tasks)
+            return [s for s in chunk_summaries if s]  # None 값 필터링
+        return await self.summarize_chunks_batched(
+            chunks, prompt, http_pool.get_session("openai")
+        )
+
+    async def _merge_summaries(self, summaries: List[str]) -> Optional[str]:
+        """부분 요약 병합 (계층 병합의 노드 하나)"""
+        messages = [{"role": "system", "content": README_MERGE_PROMPT}]
+        messages.extend({"role": "user", "content": summary} for summary in summaries)
+        merged, _ = await self._get_completion(messages)
+        return merged or None
+
     async def _process_single_context(self, context: str, repo_url: str, prompt: str, model: str) -> Optional[str]:
         """단일 컨텍스트 처리"""
         messages = [
@@ -378,29 +546,39 @@ class DocumentProcessor:
             {"role": "user", "content": context +
                 f"\n\ngit repo url : {repo_url}"},
         ]
-        doc_response, _ = self._get_completion(messages, model=model)
+        doc_response, _ = await self._get_completion(messages, model=model)
         return doc_response
 
-    async def _generate_usage(self, repo_url: str, clone_dir: str, korean: bool) -> Optional[str]:
+    async def _generate_usage(self, repo_url: str, clone_dir: str, korean: bool,
+                              repo_hash: Optional[str] = None) -> Optional[str]:
         """Usage 생성"""
+        cached = await self._load_cached_sections(repo_hash, ["USAGE"], korean)
+        if cached:
+            print("USAGE 캐시 재사용")
+            return cached["USAGE"]
         usage_template = generate_readme_prompt(
             ["START_BLOCK"], korean)
         start_time = time.perf_counter()
         try:
             build_files = self._get_build_files(clone_dir)
-            context = self._build_files_context(build_files, clone_dir)
+            context = await asyncio.to_thread(
+                self.manifest_extractor.summarize, build_files, clone_dir)
 
-            token_count = self.text_processor.count_tokens(context)
+            token_count = self.text_processor.estimate_tokens(context)
             print(f"Total build files: {
-                  len(build_files)}, tokens: {token_count}")
+                  len(build_files)}, estimated tokens: {token_count}")
 
-            if token_count > GPT_MAX_TOKENS:
+            if not self.text_processor.fits_in(context, GPT_MAX_TOKENS):
                 chunks = self.text_processor.split_text(context)
                 print(f"Split into {len(chunks)} chunks - USAGE")
                 result = await self._process_chunks(chunks, repo_url, usage_template, korean)
             else:
-                result = await self._process_single_context(context, repo_url, usage_template, model="gpt-4o")
+                result = await self._process_single_context(context, repo_url, usage_template, model=USAGE_MODEL)
 
+            if result and repo_hash:
+                await asyncio.to_thread(
+                    readme_cache.put, repo_hash, "USAGE", self._language(korean),
+                    self._section_prompt_version("USAGE", korean), result)
             end_time = time.perf_counter()
             print(f"USAGE 생성 완료 처리 시간: {end_time - start_time} 초")
             return result
@@ -409,70 +587,48 @@ class DocumentProcessor:
             logger.error(f"Usage generation failed: {str(e)}")
             return None
 
+    def _reserve_doc_name(self, category: str, filename: str, store: ArtifactStore) -> str:
+        """문서 이름 예약 (중복 파일명은 저장소에서 접미사로 회피)"""
+        return store.reserve(f"{category}/{self._extract_filename(filename).replace('.java', '.md')}")
+
     async def _save_docs_async(self, category: str, filename: str, summary: str,
-                               output_directory: str, io_pool: ThreadPoolExecutor):
-        """비동기로 파일 저장"""
+                               store: ArtifactStore) -> Optional[str]:
+        """문서를 저장소에 저장 (문서 이름 반환)"""
         if not summary:
-            return
-
-        category_dir = os.path.join(output_directory, category)
-        os.makedirs(category_dir, exist_ok=True)
-
-        output_file_name = os.path.join(
-            category_dir,
-            self._extract_filename(filename).replace('.java', '.md')
-        )
-
-        # 파일명이 중복될 경우 처리
-        base_name, extension = os.path.splitext(output_file_name)
-        counter = 1
-        while os.path.exists(output_file_name):
-            output_file_name = f"{base_name}_{counter}{extension}"
-            counter += 1
-
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            io_pool,
-            lambda: open(output_file_name, "w",
-                         encoding="utf-8").write(remove_markdown_blocks(summary))
-        )
+            return None
 
-    def _get_code_contents(self, files: List[str]) -> List[str]:
+        name = self._reserve_doc_name(category, filename, store)
+        await store.put(name, remove_markdown_blocks(summary))
+        return name
+
+    def _build_symbol_index(self, files: List[str], repo_dir: Optional[str] = None) -> JavaSymbolIndex:
+        """저장소 루트(미지정 시 파일들의 공통 상위 경로) 기준 Java 심볼 인덱스 생성"""
+        if repo_dir is None:
+            repo_dir = os.path.commonpath(files) if files else "."
+            if os.path.isfile(repo_dir):
+                repo_dir = os.path.dirname(repo_dir)
+        return JavaSymbolIndex.build(
+            repo_dir, token_counter=lambda text: token_estimator.estimate(text, 'java'))
+
+    def _get_code_content(self, file: str, index: JavaSymbolIndex) -> str:
+        """파일 내용과 import된 클래스 내용 결합"""
+        content = index.read(file)
+        if content is None:
+            return ""
+
+        total_code = ''
+        for class_name, class_content in index.collect_dependencies(
+                file, IMPORT_RESOLUTION_DEPTH, IMPORT_TOKEN_BUDGET):
+            total_code += f"Content of {class_name} :\n{class_content}\n\n"
+
+        total_code += f"code :\n{content}"
+        return total_code
+
+    def _get_code_contents(self, files: List[str], index: Optional[JavaSymbolIndex] = None) -> List[str]:
         """파일 내용 읽기 및 import된 클래스 내용 결합"""
-        contents = []
-        for file in files:
-            total_code = ''
-            path = self.get_path(file)
-
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except Exception as e:
-                logger.error(f"파일 읽기 오류 ({file}): {str(e)}")
-                contents.append("")
-                continue
-
-            imported_classes = self.extract_imported_classes(content)
-
-            for class_name in imported_classes:
-                class_path = class_name.replace('.', '/') + '.java'
-                full_path = os.path.join(path, class_path)
-
-                if os.path.exists(full_path):
-                    try:
-                        class_content = self.read_file_content(full_path)
-                        total_code += f"Content of {
-                            class_name} :\n{class_content}\n\n"
-                        # print(f" + Content of {class_name}")
-                    except Exception as e:
-                        logger.error(f"클래스 파일 읽기 오류 ({full_path}): {str(e)}")
-                else:
-                    logger.warning(f"클래스 파일을 찾을 수 없습니다: {full_path}")
-
-            total_code += f"code :\n{content}"
-            contents.append(total_code)
-
-        return contents
+        if index is None:
+            index = self._build_symbol_index(files)
+        return [self._get_code_content(file, index) for file in files]
 
     def _extract_filename(self, filepath: str) -> str:
         """파일 경로에서 파일명 추출"""
@@ -497,6 +653,7 @@ class DocumentProcessor:
                 unique_imports = cls.imports - common_imports
                 class_context = [
                     f"\nCLASS: {cls.class_name}",
+                    f"SAME AS: {', '.join(cls.aliases)}" if cls.aliases else "",
                     "UNIQUE IMPORTS:" if unique_imports else "",
                     "\n".join(sorted(unique_imports)),
                     cls.content
@@ -505,7 +662,73 @@ class DocumentProcessor:
 
         return "\n".join(context_parts)
 
-    def _get_completion(
+    def _build_compressed_context(self, package_map: Dict[str, List[SourceFileInfo]],
+                                  max_tokens: int) -> str:
+        """컨텍스트가 max_tokens 안에 들어갈 때까지 압축 단계를 높여 생성"""
+        levels = self.compressor.levels_until(CONTEXT_COMPRESSION_MAX_LEVEL)
+        min_index = min(LEVELS.index(CONTEXT_COMPRESSION_MIN_LEVEL), len(levels) - 1)
+        report = CompressionReport()
+        context = ""
+        for index, level in enumerate(levels):
+            if CONTEXT_RANKING and level in ("skeleton", "outline") and index >= min_index and index:
+                # 손실 압축은 파일 전체에 일괄 적용하지 않고 중요도 순으로 선택 적용
+                context = self._build_ranked_context(package_map, max_tokens, report)
+                break
+            if index:
+                package_map = {
+                    package: [
+                        replace(info, content=self.compressor.apply(
+                            info.content, info.file_type, level, info.outline))
+                        for info in infos
+                    ]
+                    for package, infos in package_map.items()
+                }
+            if 0 < index < min_index:
+                continue  # 압축 전(none) 토큰 수는 절감량 기준으로 항상 기록
+            context = self._build_optimized_context(package_map)
+            report.tokens[level] = self.text_processor.estimate_tokens(context)
+            if index >= min_index and self.text_processor.fits_in(context, max_tokens):
+                break
+        print(f"컨텍스트 압축: {report}")
+        return context
+
+    def _build_ranked_context(self, package_map: Dict[str, List[SourceFileInfo]], max_tokens: int,
+                              report: CompressionReport) -> str:
+        """import 그래프 중요도 순으로 원문 -> 스켈레톤 -> 아웃라인을 골라 예산 안에서 구성"""
+        ranked = self.context_ranker.rank([info for infos in package_map.values() for info in infos])
+        variants = []
+        costs = []
+        for info, _ in ranked:
+            skeleton = self.compressor.apply(info.content, info.file_type, "skeleton")
+            outline = self.compressor.apply(skeleton, info.file_type, "outline", info.outline)
+            options = list(dict.fromkeys([outline, skeleton, info.content]))  # 작은 표현부터
+            overhead = self.text_processor.estimate_tokens("\n".join(info.imports)) + 8
+            variants.append(options)
+            costs.append([self.text_processor.estimate_tokens(text) + overhead for text in options])
+
+        choice = pack_by_rank(costs, max_tokens)
+        selected = {
+            id(info): replace(info, content=options[level])
+            for (info, _), options, level in zip(ranked, variants, choice)
+            if level is not None
+        }
+        packed = {
+            package: [selected[id(info)] for info in infos if id(info) in selected]
+            for package, infos in package_map.items()
+        }
+        context = self._build_optimized_context({package: infos for package, infos in packed.items() if infos})
+        report.tokens["ranked"] = self.text_processor.estimate_tokens(context)
+
+        full = sum(1 for options, level in zip(variants, choice) if level is not None and level == len(options) - 1)
+        omitted = choice.count(None)
+        print(f"컨텍스트 선택: 파일 {len(choice)}개 중 원문 {full}개, "
+              f"요약 {len(choice) - full - omitted}개, 제외 {omitted}개")
+        if ranked:
+            print("중요 파일: " + ", ".join(
+                os.path.basename(info.path) for info, _ in ranked[:5]))
+        return context
+
+    async def _get_completion(
         self,  # self 매개변수 추가
         messages: List[Dict],
         model: Optional[str] = GPT_MODEL,
@@ -517,14 +740,7 @@ class DocumentProcessor:
         max_tokens: Optional[int] = None,
         stream: Optional[bool] = False,
     ) -> Tuple[str, Any]:
-        params = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature
-        }
-        if tools:
-            params["tools"] = tools
-
+        """채팅 완성 (api_client의 커넥션 풀/재시도/속도 제한/측정 공유, 이벤트 루프 비차단)"""
         try:
             # if MODEL.startswith("claude"):
             #     params["max_tokens"] = max_tokens
@@ -535,16 +751,25 @@ class DocumentProcessor:
             #     return completion.content[0].text, None  # 텍스트만 반환
 
             # else:
-            params["model"] = model
-            params["stop"] = stop
-            params["logprobs"] = logprobs
-            params["top_logprobs"] = top_logprobs
-            params["seed"] = SEED
             print("model: ", model)
-            client_gpt = get_openai_client()
-            completion = client_gpt.chat.completions.create(**params)
-            return completion.choices[0].message.content, None  # 텍스트만 반환
+            content, usage = await self.api_client.complete(
+                http_pool.get_session("openai"),
+                messages,
+                model=model,
+                temperature=temperature,
+                stop=stop,
+                seed=SEED,
+                tools=tools,
+                logprobs=logprobs,
+                top_logprobs=top_logprobs,
+                max_tokens=max_tokens,
+            )
+            if content is None:
+                return "", None
+            return content, usage
 
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Completion 생성 오류: {str(e)}")
             return "", None
@@ -602,194 +827,197 @@ class DocumentProcessor:
 
     async def process_chunk(self, chunk: str, repo_url: str, prompt: str) -> Optional[str]:
         """단일 청크 처리"""
-        try:
-            start_time = time.perf_counter()
-
-            model = get_gemini_client(prompt)
-            chat = model.start_chat(
-                history=[
-                    {"role": "user", "parts": prompt}
-                ]
-            )
-
-            # 비동기적으로 메시지 전송
-            response = await asyncio.to_thread(
-                chat.send_message,
-                f"git repository url : {repo_url}\n\n" + chunk
-            )
-            end_time = time.perf_counter()
+        start_time = time.perf_counter()
+        content = f"git repository url : {repo_url}\n\n" + chunk
+        result = None
+        if GEMINI_NATIVE_SDK:
+            result = await self.api_client.generate_gemini_text(prompt, content)
+        if result is None:
+            # 기본 Gemini 키 실패 시 프로바이더 풀(Gemini OpenAI 호환 엔드포인트/추가 키, 동등 모델)로 재시도
+            result = await self.api_client.generate_text(
+                http_pool.get_session("openai"), prompt, content, model=MODEL)
+        end_time = time.perf_counter()
+        if result is not None:
             print(f"### 파트 요약 완료 처리 시간: {end_time - start_time} 초")
-            return response.text
-
-        except Exception as e:
-            print(f"청크 처리 중 오류: {str(e)}")
-            return None
+        return result
 
-    async def generate_docs(self, directory_path: dict[str, list], output_directory: str, korean: bool):
-        """문서만 생성"""
+    async def _stream_doc(self, session, prompt: str, category: str, filename: str,
+                          content: str, store: ArtifactStore) -> Tuple[str, Optional[str]]:
+        """문서를 스트리밍으로 생성하며 저장소에 기록 (문서 이름과 응답 반환)"""
+        name = self._reserve_doc_name(category, filename, store)
+        sink = ReplaceFilterSink(ArtifactSink(store, name), MARKDOWN_BLOCK_REPLACEMENTS)
+        if SINGLE_PASS_DOCS:
+            # 요약 구분자 이후 내용은 문서에 기록하지 않음
+            sink = MarkerSplitSink(sink, SUMMARY_MARKER)
+        return name, await self.api_client.stream_text(session, prompt, content, sink)
+
+    async def _generate_doc(self, session, prompt: str, category: str, filename: str, content: str,
+                            store: ArtifactStore,
+                            on_doc: Optional[Callable[[str, str, str, Optional[str]], None]] = None) -> Optional[str]:
+        """문서 1건 생성 후 즉시 저장하고 on_doc(카테고리, 문서 파일명, 문서, 요약) 호출
+
+        SINGLE_PASS_DOCS이면 응답의 요약 구분자 이후를 요약으로 분리한다 (없으면 요약은 None).
+        """
+        if STREAM_DOCS:
+            # 생성되는 토큰을 바로 저장소 문서로 기록
+            name, response = await self._stream_doc(
+                session, prompt, category, filename, content, store)
+            doc, summary = split_doc_summary(response) if response else (response, None)
+        else:
+            response = await self.api_client.generate_text(session, prompt, content)
+            doc, summary = split_doc_summary(response) if response else (response, None)
+            name = await self._save_docs_async(category, filename, doc, store)
+        if doc and on_doc is not None:
+            on_doc(category, os.path.basename(name), remove_markdown_blocks(doc), summary)
+        return doc
+
+    async def generate_docs(self, directory_path: dict[str, list], output_directory: str, korean: bool,
+                            repo_dir: Optional[str] = None,
+                            on_doc: Optional[Callable[[str, str, str, Optional[str]], None]] = None,
+                            store: Optional[ArtifactStore] = None):
+        """문서만 생성
+
+        생산자가 (카테고리, 파일)을 큐에 넣고 고정 수의 워커가 꺼내어 처리한다.
+        코드 내용은 워커가 처리 직전에 읽고 결과는 완료되는 즉시 저장하므로
+        느린 파일 하나가 다른 파일의 처리를 막지 않는다.
+        on_doc은 각 문서가 생성되는 즉시 (카테고리, 문서 파일명, 문서, 요약)으로 호출된다.
+        store를 주면 문서는 저장소에만 두고, 주지 않으면 끝난 뒤 output_directory에 기록한다.
+        """
+        owns_store = store is None
+        if owns_store:
+            store = ArtifactStore(output_directory, ARTIFACT_STORE_MAX_BYTES)
         try:
-            io_pool = ThreadPoolExecutor(
-                max_workers=multiprocessing.cpu_count() * 2)
             # 한국어/영어에 따른 프롬프트 정의
             prompts = {
                 'Controller': NEW_PROMPT_ARCHITECTURE_DOC_KOREAN if korean else NEW_PROMPT_ARCHITECTURE_DOC,
                 'Test': NEW_PROMPT_TEST_DOC_KOREAN if korean else NEW_PROMPT_TEST_DOC
             }
-            all_tasks = []
-            for category, files in directory_path.items():
-                # Controller와 Test 카테고리만 처리
-                if category not in prompts:
-                    continue
-
-                code_contents = self._get_code_contents(files)
-                all_tasks.extend([
-                    (category, filename, content)
-                    for filename, content in zip(files, code_contents)
-                ])
-
-            chunk_size = 50
-            async with aiohttp.ClientSession() as session:
-                for i in range(0, len(all_tasks), chunk_size):
-                    chunk = all_tasks[i:i + chunk_size]
-
-                    tasks = [
-                        self.api_client.generate_text(
-                            session, prompts[category], content)
-                        for category, _, content in chunk
-                    ]
-                    summaries = await asyncio.gather(*tasks)
+            if SINGLE_PASS_DOCS:
+                # 문서 뒤에 구분자와 요약을 함께 생성
+                prompts = {category: single_pass_doc_prompt(prompt, korean)
+                           for category, prompt in prompts.items()}
+            # Controller와 Test 카테고리만 처리
+            doc_items = [(category, file) for category, files in directory_path.items()
+                         if category in prompts for file in files]
+            if not doc_items:
+                return output_directory
+
+            # 워커 간에 공유하는 저장소 심볼 인덱스 (파일 내용 캐시 포함)
+            symbol_index = await asyncio.to_thread(
+                self._build_symbol_index, [file for _, file in doc_items], repo_dir)
+
+            # 실제 동시 요청 수는 api_client의 적응형 동시성 제어기가 조절
+            session = http_pool.get_session("openai")
+            worker_count = min(DOC_PIPELINE_WORKERS, len(doc_items))
+            queue = asyncio.Queue(maxsize=worker_count * 2)
+
+            async def produce():
+                for item in doc_items:
+                    await queue.put(item)
+                for _ in range(worker_count):
+                    await queue.put(None)
+
+            async def work():
+                while (item := await queue.get()) is not None:
+                    category, filename = item
+                    try:
+                        content = await asyncio.to_thread(self._get_code_content, filename, symbol_index)
+                        await self._generate_doc(session, prompts[category], category, filename,
+                                                 content, store, on_doc)
+                    except TokenBudgetExceeded:
+                        raise
+                    except Exception as e:
+                        # 파일 하나의 실패는 기록만 하고 다음 파일 계속 처리
+                        logger.error(f"문서 생성 실패 ({filename}): {str(e)}")
 
-                    save_tasks = [
-                        self._save_docs_async(
-                            category, filename, summary, output_directory, io_pool)
-                        for (category, filename, _), summary in zip(chunk, summaries)
-                    ]
-                    await asyncio.gather(*save_tasks)
+            # 토큰 예산 초과 시에만 나머지 워커와 생산자도 취소하고 README 경로와 같이 예외 전달
+            try:
+                async with asyncio.TaskGroup() as group:
+                    group.create_task(produce())
+                    for _ in range(worker_count):
+                        group.create_task(work())
+            except* TokenBudgetExceeded as group_error:
+                raise group_error.exceptions[0]
 
             return output_directory
 
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"문서 생성 실패: {str(e)}")
             return None
         finally:
-            io_pool.shutdown()
-
-    def categorize_files(self, directory):
-        """각 카테고리 폴더(Service, Controller, Test) 내의 파일들을 분류"""
-        categories = {
-            "Controller": [],  # Controller와 RestController를 함께 처리,
-            "Test": []
-        }
-
-        # 각 카테고리 폴더 확인
-        for category in ["Service", "Controller", "Test"]:
-            category_path = os.path.join(directory, category)
-            if os.path.exists(category_path):
-                for filename in os.listdir(category_path):
-                    if filename.endswith(".md"):
-                        categories[category].append(filename)
-
-        return categories
-
-    async def summarize_docs_async(self, directory, korean: bool):
-        category_files = self.categorize_files(directory)
-        summaries = {"Controller": {}}
-
-        with ThreadPoolExecutor() as executor:
-            loop = asyncio.get_event_loop()
-            tasks = [
-                loop.run_in_executor(
-                    executor,
-                    self.summarize_category,
-                    files, category, directory, korean
-                )
-                for category, files in category_files.items()
-            ]
+            if owns_store:
+                await store.flush()
+
+    async def generate_and_summarize_docs(self, directory_path: dict[str, list], output_directory: str,
+                                          korean: bool, repo_dir: Optional[str] = None,
+                                          archive: Optional[S3ZipStreamWriter] = None,
+                                          store: Optional[ArtifactStore] = None) -> Optional[str]:
+        """문서 생성과 요약을 하나의 이벤트 루프에서 수행
+
+        SINGLE_PASS_DOCS이면 문서와 함께 생성된 요약을 그대로 사용하고,
+        요약이 없는 문서만 생성되는 즉시 메모리의 문서로 요약 태스크를 시작한다.
+        archive가 주어지면 문서와 요약 파일을 생성되는 즉시 압축 항목으로 추가한다.
+        store를 주면 문서와 요약은 저장소에만 두고, 주지 않으면 output_directory에 기록한다.
+        """
+        owns_store = store is None
+        if owns_store:
+            store = ArtifactStore(output_directory, ARTIFACT_STORE_MAX_BYTES)
+        session = http_pool.get_session("openai")
+        summary_tasks: Dict[str, Dict[str, asyncio.Future]] = {}
+
+        def on_doc(category: str, doc_name: str, doc: str, summary: Optional[str]):
+            if archive is not None:
+                archive.add(f"{category}/{doc_name}", doc)
+            if summary:
+                task = asyncio.get_running_loop().create_future()
+                task.set_result(summary)
+            else:
+                task = asyncio.create_task(
+                    usage_tracker.run_stage("summary", self._summarize_doc(session, doc, korean)))
+            summary_tasks.setdefault(category, {})[doc_name] = task
 
-            results = await asyncio.gather(*tasks)
+        try:
+            result = await self.generate_docs(directory_path, output_directory, korean, repo_dir, on_doc, store)
+        except BaseException:
+            # 예산 초과 등으로 중단되면 진행 중인 요약 호출도 취소
+            for tasks in summary_tasks.values():
+                for task in tasks.values():
+                    task.cancel()
+            raise
+        summaries = {}
+        for category, tasks in summary_tasks.items():
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            summaries[category] = {
+                doc_name: summary for doc_name, summary in zip(tasks.keys(), results)
+                if isinstance(summary, str)
+            }
+        if result is not None:
+            await self._write_summaries(store, summaries, archive)
+        if owns_store:
+            await store.flush()
+        return result
 
-            # 결과를 summaries에 저장
-            for category, result in zip(category_files.keys(), results):
-                if result:  # 빈 결과는 건너뛰기
-                    summaries[category] = result
+    async def _summarize_doc(self, session, doc: str, korean: bool) -> Optional[str]:
+        """문서 1건 요약"""
+        return await self.generate_text_async(
+            session, SUMMARY_PROMPT_KOREAN if korean else SUMMARY_PROMPT, doc)
 
-        # 요약이 있는 카테고리만 파일 생성
+    async def _write_summaries(self, store: ArtifactStore, summaries: Dict[str, Dict[str, str]],
+                               archive: Optional[S3ZipStreamWriter] = None):
+        """요약이 있는 카테고리만 {카테고리}_summary.md 생성"""
         for category, summary_dict in summaries.items():
             if not summary_dict:  # 빈 딕셔너리 건너뛰기
                 continue
 
-            output_path = os.path.join(directory, f"{category}_summary.md")
-
-            async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
-                await f.write(f"# {category} Files Summary\n\n")
-                for filename, summary in summary_dict.items():
-                    if summary is not None:
-                        await f.write(f"## {filename}\n{remove_markdown_blocks(summary)}\n\n")
-
-            print(f"{output_path} file created successfully.")
+            name = f"{category}_summary.md"
+            content = f"# {category} Files Summary\n\n" + "".join(
+                f"## {filename}\n{remove_markdown_blocks(summary)}\n\n"
+                for filename, summary in sorted(summary_dict.items()) if summary is not None)
 
-        return None
+            await store.put(name, content)
+            if archive is not None:
+                archive.add(name, content)
 
-    def summarize_category(self, files, category, directory, korean: bool):
-        # 각 프로세스에서 별도의 aiohttp.ClientSession 생성
-        async def run():
-            async with aiohttp.ClientSession() as session:
-                return await self.summarize_docs(files, os.path.join(directory, category), session, korean)
-
-        return asyncio.run(run())
-
-    async def summarize_docs(self, files, directory, session, korean: bool):
-        if not files:  # 빈 리스트 체크
-            print(f"No {directory} provided to process")
-            return {}
-        tasks = []
-
-        for filename in files:
-            # 전체 파일 경로 구성
-            file_path = os.path.join(directory, filename)
-
-            try:
-                # 파일이 실제로 존재하고 디렉토리가 아닌지 확인
-                if not os.path.isfile(file_path):
-                    print(
-                        f"Skipping directory or non-existent file: {file_path}")
-                    continue
-
-                async with aiofiles.open(file_path, "r", encoding="utf-8") as file:
-                    text = await file.read()
-                    tasks.append((filename, self.generate_text_async(
-                        session, SUMMARY_PROMPT_KOREAN if korean else SUMMARY_PROMPT, text)))
-            except Exception as e:
-                print(f"Error reading file {file_path}: {e}")
-                continue
-
-        if not tasks:
-            print(f"No valid files found in directory: {directory}")
-            return {}
-
-        try:
-            # Run tasks and gather results
-            results = await asyncio.gather(*[task[1] for task in tasks])
-            # Build summaries dictionary for the category
-            summaries = {tasks[i][0]: results[i]
-                         for i in range(len(tasks)) if results[i] is not None}
-            return summaries
-        except Exception as e:
-            print(f"Error processing tasks: {e}")
-            return {}
-
-    def read_file_content(self, file_path):
-        with open(file_path, 'r') as file:
-            return file.read()
-
-    def extract_imported_classes(self, content):
-        # Regex to find import statements
-        import_pattern = r'import\s+([\w\.]+);'
-        matches = re.findall(import_pattern, content)
-        return matches
-
-    def get_path(self, file_path):
-        index = file_path.find("/main/java/") + len("/main/java/")
-        result = file_path[:index]
-
-        return result
+            print(f"{name} 요약 저장 완료")
@@ -1,4 +1,5 @@
 from ktb_settings import *
+from ktb_prompts import SUMMARY_MARKER
 
 import re
 import os
@@ -85,15 +86,6 @@ def extract_zip(file_path, extract_to):
         zip_ref.extractall(extract_to)
 
 
-def create_zip(directory, zip_path):
-    """디렉토리의 모든 파일을 ZIP으로 압축"""
-    with zipfile.ZipFile(zip_path, 'w') as zip_ref:
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zip_ref.write(file_path, os.path.relpath(file_path, directory))
-
-
 async def async_cleanup(repo_zip: str, clone_dir: str, doc_zip: str):
     """임시 파일 및 디렉토리 정리"""
     try:
@@ -132,7 +124,22 @@ async def upload_to_s3(bucket: str, file_path: str, key: str):
         raise Exception(f"S3 업로드 실패: {str(e)}")
 
 
+# 생성 문서에서 제거할 코드 블록 표기 (순서대로 적용)
+MARKDOWN_BLOCK_REPLACEMENTS = [
+    ("```markdown", ""),
+    ("```\n```", "```"),
+]
+
+
 def remove_markdown_blocks(content):
-    content = content.replace("```markdown", "")
-    content = content.replace(f"```\n```", "```")
+    for old, new in MARKDOWN_BLOCK_REPLACEMENTS:
+        content = content.replace(old, new)
     return content
+
+
+def split_doc_summary(content, marker=SUMMARY_MARKER):
+    """한 번에 생성한 응답을 (문서, 요약)으로 분리 (구분자가 없으면 요약은 None)"""
+    doc, found, summary = content.partition(marker)
+    if not found:
+        return content, None
+    return doc.rstrip(), summary.strip() or None
@@ -0,0 +1,87 @@
+"""HTTP 커넥션 풀 관련 코드"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+import httpx
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPPool:
+    """프로바이더별 프로세스 공용 커넥션 풀
+
+    aiohttp 세션과 OpenAI 클라이언트를 프로바이더 단위로 재사용하여
+    호출마다 발생하던 TCP/TLS 핸드셰이크와 DNS 조회를 없앤다.
+    aiohttp 세션은 이벤트 루프에 묶이므로 (프로바이더, 루프) 단위로 관리한다.
+    """
+
+    def __init__(self, pool_size: int = 100, keepalive_timeout: float = 60,
+                 dns_cache_ttl: int = 300, request_timeout: float = 600):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
+        self._sessions: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._openai_clients: Dict[Tuple[str, Optional[str], Optional[str]], OpenAI] = {}
+
+    def get_session(self, provider: str = "openai") -> aiohttp.ClientSession:
+        """현재 이벤트 루프에서 사용할 프로바이더 전용 aiohttp 세션"""
+        loop = asyncio.get_running_loop()
+        key = (provider, id(loop))
+        entry = self._sessions.get(key)
+        if entry and entry[0] is loop and not entry[1].closed:
+            return entry[1]
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        )
+        self._sessions[key] = (loop, session)
+        return session
+
+    def get_openai_client(self, api_key: Optional[str], base_url: Optional[str] = None,
+                          provider: str = "openai") -> OpenAI:
+        """keep-alive 커넥션 풀을 공유하는 OpenAI 클라이언트"""
+        key = (provider, api_key, base_url)
+        client = self._openai_clients.get(key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_timeout,
+                ),
+                timeout=self.request_timeout,
+            )
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            self._openai_clients[key] = client
+        return client
+
+    async def close_loop_sessions(self):
+        """현재 이벤트 루프에 속한 aiohttp 세션 종료"""
+        loop = asyncio.get_running_loop()
+        for key, (owner, session) in list(self._sessions.items()):
+            if owner is loop:
+                del self._sessions[key]
+                if not session.closed:
+                    await session.close()
+
+    async def close(self):
+        """모든 커넥션 정리 (앱 종료 시 호출)"""
+        await self.close_loop_sessions()
+        # 이미 종료된 다른 루프의 세션은 await할 수 없으므로 참조만 정리
+        self._sessions.clear()
+        for client in self._openai_clients.values():
+            client.close()
+        self._openai_clients.clear()
+        logger.info("HTTP 커넥션 풀 종료")
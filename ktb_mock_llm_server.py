@@ -0,0 +1,369 @@
+"""OpenAI 호환 LLM/임베딩 대체 서버 (벤치마크 및 부하 테스트용)
+
+실제 토큰을 쓰지 않고 /generate, /chat 경로 전체를 실행하기 위한 로컬 서버.
+지연 분포, 분당 요청 한도(429), 서버 오류율을 설정할 수 있고
+임베딩은 입력 텍스트로 시드한 결정적 벡터를 반환한다.
+
+모드:
+    mock    합성 응답 생성
+    record  실제 API로 전달하고 응답을 기록 (클라이언트의 Authorization 헤더 사용)
+    replay  기록된 응답 재생 (기록이 없으면 합성 응답)
+
+사용 예시:
+    python ktb_mock_llm_server.py --port 8900 --latency lognormal --latency-mean 1.5 --rpm 500
+    python ktb_mock_llm_server.py --mode record --record-dir mock_recordings
+    python ktb_mock_llm_server.py --mode replay --record-dir mock_recordings
+
+파이프라인 설정 (.env):
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    GEMINI_OPENAI_BASE_URL=http://127.0.0.1:8900/v1beta/openai
+    GEMINI_NATIVE_SDK=false     # Gemini SDK 대신 OpenAI 호환 경로 사용
+    S3_ENDPOINT_URL=...         # S3 호환 로컬 스토리지 (MinIO 등)
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import aiohttp
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ktb_prompts import SUMMARY_MARKER
+
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = {
+    "openai": "https://api.openai.com/v1",
+    "gemini": "https://generativelanguage.googleapis.com/v1beta/openai",
+}
+MOCK_WORDS = (
+    "repository service controller module request response data client server "
+    "configuration document function class method interface handler process "
+    "pipeline cache token model query result error update create delete user"
+).split()
+
+
+@dataclass
+class LatencyModel:
+    """응답 지연 분포 (초)"""
+    distribution: str = "fixed"  # fixed, normal, lognormal, uniform
+    mean: float = 0.5
+    stddev: float = 0.2
+    minimum: float = 0.0
+
+    def sample(self) -> float:
+        if self.distribution == "normal":
+            value = random.gauss(self.mean, self.stddev)
+        elif self.distribution == "lognormal":
+            # 평균/표준편차가 주어진 값이 되도록 모수 변환
+            variance = np.log(1 + (self.stddev / self.mean) ** 2) if self.mean > 0 else 0.0
+            value = random.lognormvariate(np.log(max(self.mean, 1e-9)) - variance / 2, np.sqrt(variance))
+        elif self.distribution == "uniform":
+            value = random.uniform(self.mean - self.stddev, self.mean + self.stddev)
+        else:
+            value = self.mean
+        return max(self.minimum, value)
+
+
+@dataclass
+class MockConfig:
+    """대체 서버 설정"""
+    mode: str = "mock"
+    record_dir: str = "mock_recordings"
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    token_interval: float = 0.005       # 스트리밍 토큰 간 간격 (초)
+    completion_words: int = 400          # 합성 응답 단어 수
+    rpm: int = 0                         # 분당 요청 한도 (0이면 무제한)
+    error_rate: float = 0.0              # 503 응답 비율
+    embedding_dimensions: int = 1536
+
+
+class SlidingWindowLimit:
+    """최근 60초 요청 수 기준 한도"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._requests = deque()
+
+    def check(self) -> Optional[float]:
+        """허용되면 None, 초과면 재시도까지 남은 시간"""
+        if self.per_minute <= 0:
+            return None
+        now = time.monotonic()
+        while self._requests and now - self._requests[0] >= 60:
+            self._requests.popleft()
+        if len(self._requests) >= self.per_minute:
+            return 60 - (now - self._requests[0])
+        self._requests.append(now)
+        return None
+
+    def remaining(self) -> int:
+        return max(self.per_minute - len(self._requests), 0)
+
+
+class RecordingStore:
+    """요청 해시 단위 응답 기록 저장소"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def key(kind: str, body: dict) -> str:
+        # 스트리밍 여부와 무관하게 같은 요청은 같은 기록을 사용
+        relevant = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        canonical = json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+        return f"{kind}-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    def load(self, key: str) -> Optional[dict]:
+        path = os.path.join(self.directory, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, key: str, data: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{key}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def _count_words(text: str) -> int:
+    return max(len(text.split()), 1)
+
+
+def _seeded_random(text: str) -> random.Random:
+    return random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def fake_completion(body: dict, words: int) -> dict:
+    """요청으로 시드한 결정적 마크다운 응답"""
+    prompt = json.dumps(body.get("messages", []), ensure_ascii=False)
+    rng = _seeded_random(prompt)
+    lines = ["# Mock Document", ""]
+    for section in range(max(words // 80, 1)):
+        lines.append(f"## Section {section + 1}")
+        lines.append(" ".join(rng.choice(MOCK_WORDS) for _ in range(80)) + ".")
+        lines.append("")
+    if SUMMARY_MARKER in prompt:
+        # 문서+요약 단일 호출 형식 요청이면 구분자 뒤에 요약 추가
+        lines.append(SUMMARY_MARKER)
+        lines.extend(f"- {' '.join(rng.choice(MOCK_WORDS) for _ in range(12))}" for _ in range(3))
+    content = "\n".join(lines)
+    prompt_tokens = _count_words(prompt)
+    completion_tokens = _count_words(content)
+    return {
+        "content": content,
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """입력 텍스트로 시드한 정규화 벡터 (같은 입력은 항상 같은 벡터)"""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI()
+    limiter = SlidingWindowLimit(config.rpm)
+    store = RecordingStore(config.record_dir)
+    upstream_session: Dict[str, aiohttp.ClientSession] = {}
+
+    def rate_limit_headers() -> dict:
+        if config.rpm <= 0:
+            return {}
+        return {
+            "x-ratelimit-limit-requests": str(config.rpm),
+            "x-ratelimit-remaining-requests": str(limiter.remaining()),
+        }
+
+    def reject() -> Optional[JSONResponse]:
+        """한도 초과/오류 주입 응답"""
+        retry_after = limiter.check()
+        if retry_after is not None:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (mock)", "type": "requests"}},
+                headers={
+                    "retry-after": f"{retry_after:.0f}",
+                    "retry-after-ms": f"{retry_after * 1000:.0f}",
+                    "x-ratelimit-limit-requests": str(config.rpm),
+                    "x-ratelimit-remaining-requests": "0",
+                    "x-ratelimit-reset-requests": f"{retry_after:.3f}s",
+                })
+        if config.error_rate and random.random() < config.error_rate:
+            return JSONResponse(status_code=503, content={"error": {"message": "Service unavailable (mock)"}})
+        return None
+
+    async def forward(provider: str, path: str, request: Request, body: dict) -> dict:
+        """record 모드: 실제 API 호출 (스트리밍 요청도 일반 요청으로 받아서 기록)"""
+        if provider not in upstream_session or upstream_session[provider].closed:
+            upstream_session[provider] = aiohttp.ClientSession()
+        upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        async with upstream_session[provider].post(
+            f"{UPSTREAMS[provider]}/{path}",
+            json=upstream_body,
+            headers={"Authorization": request.headers.get("authorization", "")}
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def resolve_completion(provider: str, request: Request, body: dict) -> dict:
+        key = RecordingStore.key("chat", body)
+        if config.mode == "replay":
+            recorded = store.load(key)
+            if recorded is not None:
+                return recorded
+            logger.warning(f"기록 없음, 합성 응답 사용: {key}")
+        elif config.mode == "record":
+            result = await forward(provider, "chat/completions", request, body)
+            recorded = {
+                "content": result["choices"][0]["message"]["content"],
+                "usage": result.get("usage"),
+            }
+            store.save(key, recorded)
+            return recorded
+        return fake_completion(body, config.completion_words)
+
+    async def stream_completion(model: str, result: dict):
+        await asyncio.sleep(config.latency.sample())
+        content = result["content"]
+        # 단어 단위로 잘라 토큰 스트림 흉내
+        pieces = content.split(" ")
+        for i, piece in enumerate(pieces):
+            delta = piece if i == len(pieces) - 1 else piece + " "
+            event = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if config.token_interval:
+                await asyncio.sleep(config.token_interval)
+        yield f"data: {json.dumps({'choices': [], 'usage': result['usage']})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    async def chat_completions(provider: str, request: Request):
+        rejected = reject()
+        if rejected is not None:
+            return rejected
+        body = await request.json()
+        model = body.get("model", "mock")
+        result = await resolve_completion(provider, request, body)
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_completion(model, result),
+                media_type="text/event-stream",
+                headers=rate_limit_headers())
+
+        if config.mode != "record":
+            await asyncio.sleep(config.latency.sample())
+        return JSONResponse(
+            content={
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": result["content"]}}],
+                "usage": result["usage"],
+            },
+            headers=rate_limit_headers())
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        return await chat_completions("openai", request)
+
+    @app.post("/v1beta/openai/chat/completions")
+    async def gemini_chat_completions(request: Request):
+        return await chat_completions("gemini", request)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        rejected = reject()
+        if rejected is not None:
+            return rejected
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        key = RecordingStore.key("embeddings", body)
+        vectors = None
+        if config.mode == "replay":
+            recorded = store.load(key)
+            vectors = recorded["embeddings"] if recorded else None
+        elif config.mode == "record":
+            result = await forward("openai", "embeddings", request, {**body, "encoding_format": "float"})
+            vectors = [item["embedding"] for item in result["data"]]
+            store.save(key, {"embeddings": vectors})
+        if vectors is None:
+            dimensions = body.get("dimensions") or config.embedding_dimensions
+            vectors = [fake_embedding(str(text), dimensions) for text in inputs]
+
+        if body.get("encoding_format") == "base64":
+            data = [base64.b64encode(np.asarray(v, dtype=np.float32).tobytes()).decode("ascii") for v in vectors]
+        else:
+            data = vectors
+        prompt_tokens = sum(_count_words(str(text)) for text in inputs)
+        return JSONResponse(
+            content={
+                "object": "list",
+                "model": body.get("model", "mock"),
+                "data": [{"object": "embedding", "index": i, "embedding": e} for i, e in enumerate(data)],
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            },
+            headers=rate_limit_headers())
+
+    @app.on_event("shutdown")
+    async def close_upstream():
+        for session in upstream_session.values():
+            await session.close()
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="OpenAI 호환 LLM/임베딩 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_LLM_PORT", 8900)))
+    parser.add_argument("--mode", choices=["mock", "record", "replay"], default="mock")
+    parser.add_argument("--record-dir", default="mock_recordings", help="응답 기록 디렉토리")
+    parser.add_argument("--latency", choices=["fixed", "normal", "lognormal", "uniform"], default="fixed",
+                        help="첫 토큰까지의 지연 분포")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="평균 지연 (초)")
+    parser.add_argument("--latency-stddev", type=float, default=0.2, help="지연 표준편차/범위 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.005, help="스트리밍 토큰 간격 (초)")
+    parser.add_argument("--completion-words", type=int, default=400, help="합성 응답 단어 수")
+    parser.add_argument("--rpm", type=int, default=0, help="분당 요청 한도 (초과 시 429)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 응답 비율 (0~1)")
+    parser.add_argument("--embedding-dimensions", type=int, default=1536)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        mode=args.mode,
+        record_dir=args.record_dir,
+        latency=LatencyModel(args.latency, args.latency_mean, args.latency_stddev),
+        token_interval=args.token_interval,
+        completion_words=args.completion_words,
+        rpm=args.rpm,
+        error_rate=args.error_rate,
+        embedding_dimensions=args.embedding_dimensions,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
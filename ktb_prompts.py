@@ -132,6 +132,16 @@ For Tests:
 MUST reponse in Korean.
 """
 
+# 문서와 요약을 한 번의 호출로 생성할 때 문서 뒤에 붙이는 구분자
+SUMMARY_MARKER = "<!-- DODODOCS:SUMMARY -->"
+
+SINGLE_PASS_SUMMARY_INSTRUCTION = f"""
+
+After the complete document, output a line containing exactly {SUMMARY_MARKER}
+and then a concise summary of the document you just wrote, following these instructions:
+
+"""
+
 NEW_PROMPT_TEST_DOC = '''
 Analyze the following test file and generate a test document in Markdown format:
 
@@ -469,6 +479,16 @@ Please follow these steps to generate the optimized query:
 Output structure (purely for format, not content):  core keywords: specific technical problem description
 """
 
+README_MERGE_PROMPT = """You are merging partial analyses of different parts of the same software repository.
+Each user message is one partial analysis. Combine them into a single analysis that will later be used to write the README.
+
+- Keep every concrete fact: project purpose, features, modules and their roles, tech stack, build/run commands, configuration, APIs
+- Merge duplicated information and resolve overlaps instead of repeating them
+- Do not invent anything that is not in the partial analyses
+- Keep the Markdown section structure of the inputs
+- Be as concise as possible without losing facts
+"""
+
 # Modular README Blocks
 OVERVIEW_BLOCK = """
 ## 📝 Overview
@@ -603,6 +623,22 @@ README_BLOCKS = {
     "PERFORMANCE_BLOCK": PERFORMANCE_BLOCK,
 }
 
+# README 섹션 캐시 버전 (블록 템플릿/섹션 프롬프트/컨텍스트 구성을 바꾸면 올림)
+README_PROMPT_VERSION = "2"
+
+# 섹션별 생성 시 각 블록에 넣을 컨텍스트 (source: 소스 코드, tree: 디렉토리 구조, build: 빌드/설정 파일)
+README_SECTION_CONTEXTS = {
+    "OVERVIEW_BLOCK": ("source", "build"),
+    "STRUCTURE_BLOCK": ("tree",),
+    "START_BLOCK": ("build", "tree"),
+    "MOTIVATION_BLOCK": ("source",),
+    "DEMO_BLOCK": ("tree",),
+    "DEPLOYMENT_BLOCK": ("build", "tree"),
+    "CONTRIBUTORS_BLOCK": ("build", "tree"),
+    "FAQ_BLOCK": ("source", "build"),
+    "PERFORMANCE_BLOCK": ("source",),
+}
+
 
 def generate_ordered_readme_template(ordered_blocks):
     """
@@ -663,5 +699,55 @@ Below is the README.md template to fill out:
     return template
 
 
+def readme_section_heading(block_name):
+    """블록 템플릿의 섹션 제목 줄 (예: '## 📝 Overview')"""
+    return README_BLOCKS[block_name].split("\n")[1].strip()
+
+
+def generate_readme_section_prompt(block_name, korean=False):
+    language = "Korean" if korean else "English"
+    heading = readme_section_heading(block_name)
+
+    template = f"""Analyze the provided repository information and write **only one section** of the README.md, strictly following the section template below.
+
+### Instructions:
+1. **Start with the heading**: The first line must be exactly `{heading}`.
+2. **Do not change the format**: Retain the provided structure and fill in the required content.
+3. **Write in {language}**: All text must be written in {language}, except for names and code snippets.
+4. **Write only this section**: Do not add a project title, table of contents or any other section.
+
+Below is the section template to fill out:
+
+---
+{README_BLOCKS[block_name]}
+"""
+    return template
+
+
+def assemble_readme(project_name, ordered_blocks, sections):
+    """섹션별로 생성한 내용을 요청한 블록 순서와 목차에 맞춰 조립
+
+    Parameters:
+    - project_name (str): README 제목
+    - ordered_blocks (list): 블록 이름 목록 (sections에 있는 블록만)
+    - sections (dict): 블록 이름 -> 생성된 섹션 내용
+
+    Returns:
+    - str: 조립된 README
+    """
+    readme = generate_ordered_readme_template(ordered_blocks)
+    readme = readme.replace("# Project Name\n", f"# {project_name}\n", 1)
+    for block_name in ordered_blocks:
+        readme = readme.replace(
+            README_BLOCKS[block_name], "\n" + sections[block_name].strip() + "\n", 1)
+    return readme
+
+
 # print(generate_readme_prompt(['OVERVIEW_BLOCK', 'STRUCTURE_BLOCK', 'START_BLOCK', 'MOTIVATION_BLOCK',
 #       'DEMO_BLOCK', 'DEPLOYMENT_BLOCK', 'CONTRIBUTORS_BLOCK', 'FAQ_BLOCK', 'PERFORMANCE_BLOCK'], korean=True))
+
+
+def single_pass_doc_prompt(doc_prompt, korean=False):
+    """문서 프롬프트에 요약 구분자와 요약 지침 추가"""
+    summary_prompt = SUMMARY_PROMPT_KOREAN if korean else SUMMARY_PROMPT
+    return doc_prompt + SINGLE_PASS_SUMMARY_INSTRUCTION + summary_prompt
@@ -0,0 +1,176 @@
+"""LLM 엔드포인트 부하 분산 관련 코드"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ktb_concurrency import AdaptiveConcurrencyLimiter
+from ktb_rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+PROBE_POLL_INTERVAL = 1.0  # 시험 요청 진행 중인 엔드포인트의 판정을 기다리며 다시 확인할 간격 (초)
+
+
+@dataclass
+class ProviderEndpoint:
+    """API 키와 OpenAI 호환 URL 단위의 LLM 엔드포인트"""
+    name: str
+    provider: str                      # 커넥션 풀 구분용 (openai, gemini 등)
+    api_key: str
+    base_url: str
+    models: Tuple[str, ...]
+    rate_limiter: RateLimiter
+    concurrency: AdaptiveConcurrencyLimiter
+    latency_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    open_until: float = 0.0            # 서킷 차단 해제 시각
+    cooldown: float = 0.0
+    probing: bool = False              # half-open 상태에서 시험 요청 진행 중
+    stats: Dict[str, int] = field(default_factory=lambda: {"success": 0, "failure": 0, "trips": 0})
+
+    @property
+    def chat_completions_url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/chat/completions"
+
+    def is_open(self, now: float) -> bool:
+        return self.open_until > now
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "provider": self.provider,
+            "models": list(self.models),
+            "circuit": "open" if self.is_open(now) else ("half-open" if self.cooldown else "closed"),
+            "headroom": round(self.rate_limiter.headroom(), 3),
+            "latency_ewma": self.latency_ewma,
+            "window": self.concurrency.window,
+            "in_flight": self.concurrency.in_flight,
+            **self.stats,
+        }
+
+
+class ProviderPool:
+    """여러 키/엔드포인트에 LLM 요청을 분산하는 풀
+
+    남은 한도 비율, 관측 지연, 현재 부하로 엔드포인트를 고르고
+    연속 실패한 엔드포인트는 서킷을 열어 일정 시간 제외한다.
+    요청 모델을 제공하는 엔드포인트가 모두 사용 불가하면 동등 모델로 전환하고,
+    동등 모델도 없으면 선택하지 않는다(호출자는 wait_time만큼 기다린 뒤 다시 선택).
+    """
+
+    def __init__(self, endpoints: Iterable[ProviderEndpoint],
+                 equivalents: Optional[Dict[str, List[str]]] = None,
+                 failure_threshold: int = 3, base_cooldown: float = 30.0, max_cooldown: float = 600.0):
+        self.endpoints = list(endpoints)
+        self.equivalents = equivalents or {}
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    def _score(self, endpoint: ProviderEndpoint) -> float:
+        load = endpoint.concurrency.in_flight / max(endpoint.concurrency.window, 1)
+        # 아직 측정되지 않은 엔드포인트는 우선 시도하여 지연을 관측
+        latency = max(endpoint.latency_ewma or 0.0, 0.001)
+        return endpoint.rate_limiter.headroom() * max(1.0 - load, 0.05) / latency
+
+    def _available(self, model: str, exclude: Iterable[str], now: float) -> List[ProviderEndpoint]:
+        return [
+            endpoint for endpoint in self.endpoints
+            if model in endpoint.models
+            and endpoint.name not in exclude
+            and not endpoint.is_open(now)
+            and not endpoint.probing
+        ]
+
+    def select(self, model: str, exclude: Iterable[str] = ()) -> Optional[Tuple[ProviderEndpoint, str]]:
+        """요청 모델(또는 동등 모델)에 사용할 엔드포인트 선택"""
+        exclude = set(exclude)
+        with self._lock:
+            now = time.monotonic()
+            for candidate_model in [model] + self.equivalents.get(model, []):
+                candidates = self._available(candidate_model, exclude, now)
+                if candidates:
+                    endpoint = max(candidates, key=self._score)
+                    if endpoint.cooldown:
+                        endpoint.probing = True  # half-open: 시험 요청 하나만 허용
+                    if candidate_model != model:
+                        logger.info(f"모델 전환: {model} -> {candidate_model} ({endpoint.name})")
+                    return endpoint, candidate_model
+
+            return None
+
+    def _candidates(self, model: str, exclude: Iterable[str]) -> List[ProviderEndpoint]:
+        return [
+            endpoint
+            for candidate_model in [model] + self.equivalents.get(model, [])
+            for endpoint in self.endpoints
+            if candidate_model in endpoint.models and endpoint.name not in exclude
+        ]
+
+    def has_available(self, model: str, exclude: Iterable[str] = ()) -> bool:
+        """지금 선택 가능한 엔드포인트가 있는지 확인 (시험 요청 상태를 바꾸지 않음)"""
+        exclude = set(exclude)
+        with self._lock:
+            now = time.monotonic()
+            return any(self._available(candidate_model, exclude, now)
+                       for candidate_model in [model] + self.equivalents.get(model, []))
+
+    def wait_time(self, model: str, exclude: Iterable[str] = ()) -> Optional[float]:
+        """선택 가능한 엔드포인트가 없을 때 다시 선택할 때까지 기다릴 시간 (후보가 없으면 None)
+
+        차단된 엔드포인트는 차단 해제 시각까지, 시험 요청 중인 엔드포인트는
+        PROBE_POLL_INTERVAL만큼 기다린다. 해제 후에는 select가 시험 요청 하나만 허용한다.
+        """
+        exclude = set(exclude)
+        with self._lock:
+            now = time.monotonic()
+            waits = [
+                PROBE_POLL_INTERVAL if endpoint.probing else max(endpoint.open_until - now, 0.0)
+                for endpoint in self._candidates(model, exclude)
+            ]
+        return min(waits) if waits else None
+
+    def record_success(self, endpoint: ProviderEndpoint, latency: float):
+        with self._lock:
+            endpoint.stats["success"] += 1
+            endpoint.latency_ewma = latency if endpoint.latency_ewma is None else 0.8 * endpoint.latency_ewma + 0.2 * latency
+            endpoint.consecutive_failures = 0
+            endpoint.cooldown = 0.0
+            endpoint.open_until = 0.0
+            endpoint.probing = False
+
+    def record_failure(self, endpoint: ProviderEndpoint):
+        """서버 오류/인증 오류/연결 실패 기록 (임계치 도달 시 서킷 차단)"""
+        with self._lock:
+            endpoint.stats["failure"] += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.probing or endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.cooldown = min(
+                    endpoint.cooldown * 2 if endpoint.cooldown else self.base_cooldown, self.max_cooldown)
+                endpoint.open_until = time.monotonic() + endpoint.cooldown
+                endpoint.stats["trips"] += 1
+                logger.error(f"엔드포인트 차단: {endpoint.name} ({endpoint.cooldown:.0f}초)")
+            endpoint.probing = False
+
+    def release_probe(self, endpoint: ProviderEndpoint):
+        """성공/실패로 판정되지 않은 시험 요청(429 등) 종료"""
+        with self._lock:
+            endpoint.probing = False
+
+    def snapshot(self) -> List[dict]:
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+def split_keys(*values: Optional[str]) -> List[str]:
+    """콤마로 구분된 키 목록을 중복 없이 병합"""
+    keys = []
+    for value in values:
+        for key in (value or "").split(","):
+            key = key.strip()
+            if key and key not in keys:
+                keys.append(key)
+    return keys
@@ -0,0 +1,164 @@
+"""LLM 호출 속도 제한 관련 코드"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """OpenAI 리셋 헤더 형식('1s', '6m0s', '20ms')을 초 단위로 변환"""
+    if not value:
+        return None
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Retry-After / retry-after-ms 헤더를 초 단위로 변환"""
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class TokenBucket:
+    """분당 한도를 초당 충전량으로 환산한 토큰 버킷"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_rate)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount 만큼 사용 가능해질 때까지 남은 시간"""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # 한도보다 큰 요청도 가득 찼을 때는 통과
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_rate
+
+    def consume(self, amount: float):
+        self.available -= amount
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], now: float):
+        """응답 헤더의 한도/잔여량으로 상태 보정"""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            # 진행 중인 요청이 헤더에 반영되지 않았을 수 있으므로 더 보수적인 값 사용
+            self.available = min(self.available, float(remaining))
+
+
+class RateLimiter:
+    """요청 수(RPM)와 토큰 수(TPM)를 함께 고려하는 공유 속도 제한기
+
+    스레드 락으로 상태만 보호하고 대기는 호출한 이벤트 루프에서 수행하므로
+    여러 루프/스레드에서 동시에 사용할 수 있다.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        now = time.monotonic()
+        wait = max(
+            self._blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+        if wait <= 0:
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+        return wait
+
+    async def acquire(self, tokens: int = 0):
+        """요청 1건과 예상 토큰 수만큼 한도 확보 (필요한 만큼만 대기)"""
+        while True:
+            with self._lock:
+                wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """예상 토큰 수와 실제 사용량의 차이 반영"""
+        with self._lock:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """x-ratelimit-* 응답 헤더로 한도 정보 갱신"""
+        def to_int(name: str) -> Optional[int]:
+            value = headers.get(name)
+            try:
+                return int(value) if value is not None else None
+            except ValueError:
+                return None
+
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+                remaining = to_int(f'x-ratelimit-remaining-{kind}')
+                bucket.sync(to_int(f'x-ratelimit-limit-{kind}'), remaining, now)
+                if remaining == 0:
+                    reset = parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+                    if reset:
+                        self._blocked_until = max(self._blocked_until, now + reset)
+
+    def headroom(self) -> float:
+        """남은 한도 비율 (0~1, 보류 중이면 0)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                return 0.0
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return max(0.0, min(
+                self.requests.available / self.requests.capacity,
+                self.tokens.available / self.tokens.capacity,
+            ))
+
+    def block_for(self, seconds: float):
+        """429 응답 등으로 지정된 시간 동안 모든 요청 보류"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        logger.info(f"Rate limit 도달: {seconds:.1f}초 대기")
@@ -0,0 +1,136 @@
+"""README 섹션 캐시 관련 코드"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReadmeSectionCache:
+    """(저장소 내용 해시, 블록, 언어, 프롬프트 버전) 단위 README 섹션 디스크 캐시
+
+    같은 저장소에 블록 목록이나 순서만 바꿔 다시 요청하면 캐시에 없는
+    섹션만 생성하고 나머지는 재사용한다. 클론 디렉토리는 작업 후 삭제되므로
+    캐시는 별도 디렉토리에 키별 JSON 파일로 저장한다.
+    """
+
+    def __init__(self, directory: str, ttl: float = 0.0, prune_interval: float = 3600.0):
+        self.directory = directory
+        self.ttl = ttl  # 초 단위 유효 기간 (0이면 만료 없음)
+        self.prune_interval = prune_interval  # 만료 항목 정리 최소 간격 (초)
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    @staticmethod
+    def repo_hash(root: str, exclude_dirs: Iterable[str] = (), extra: str = "") -> str:
+        """저장소 파일 경로와 내용으로 계산한 해시 (제외 디렉토리 생략)"""
+        exclude_dirs = set(exclude_dirs)
+        digest = hashlib.sha256(extra.encode("utf-8"))
+        for current, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if d not in exclude_dirs)
+            for file in sorted(files):
+                path = os.path.join(current, file)
+                digest.update(b"\x00" + os.path.relpath(path, root).encode("utf-8") + b"\x00")
+                try:
+                    with open(path, "rb") as f:
+                        for block in iter(lambda: f.read(1 << 20), b""):
+                            digest.update(block)
+                except OSError as e:
+                    logger.error(f"파일 해시 오류 ({path}): {str(e)}")
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(repo_hash: str, block: str, language: str, prompt_version: str) -> str:
+        return hashlib.sha256(
+            "\x00".join((repo_hash, block, language, prompt_version)).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, repo_hash: str, block: str, language: str, prompt_version: str) -> Optional[str]:
+        path = self._path(self.key(repo_hash, block, language, prompt_version))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"README 캐시 읽기 오류 ({path}): {str(e)}")
+            self.stats["misses"] += 1
+            return None
+        if self._expired(entry.get("created_at", 0)):
+            self.stats["misses"] += 1
+            self._remove(path)
+            return None
+        self.stats["hits"] += 1
+        return entry.get("content")
+
+    def _expired(self, created_at: float, now: Optional[float] = None) -> bool:
+        return bool(self.ttl) and (now or time.time()) - created_at > self.ttl
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            self.stats["evicted"] += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"README 캐시 삭제 오류 ({path}): {str(e)}")
+
+    def prune(self) -> int:
+        """만료된 항목과 남은 임시 파일 삭제 (파일 수정 시각 기준, 삭제한 파일 수 반환)"""
+        if not self.ttl or not self._prune_lock.acquire(blocking=False):
+            return 0
+        removed = 0
+        try:
+            now = time.time()
+            self._last_prune = now
+            for current, _, files in os.walk(self.directory):
+                for file in files:
+                    path = os.path.join(current, file)
+                    try:
+                        expired = self._expired(os.path.getmtime(path), now)
+                    except OSError:
+                        continue
+                    if expired:
+                        self._remove(path)
+                        removed += 1
+        finally:
+            self._prune_lock.release()
+        if removed:
+            logger.info(f"README 캐시 만료 항목 {removed}개 삭제")
+        return removed
+
+    def put(self, repo_hash: str, block: str, language: str, prompt_version: str, content: str):
+        """섹션 저장 (임시 파일에 쓴 뒤 교체하여 동시 요청이 깨진 파일을 읽지 않도록 함)"""
+        path = self._path(self.key(repo_hash, block, language, prompt_version))
+        entry = {
+            "repo_hash": repo_hash,
+            "block": block,
+            "language": language,
+            "prompt_version": prompt_version,
+            "created_at": time.time(),
+            "content": content,
+        }
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.stats["writes"] += 1
+        except OSError as e:
+            logger.error(f"README 캐시 저장 오류 ({path}): {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        # 다시 읽히지 않는 항목도 쌓이지 않도록 주기적으로 정리
+        if self.ttl and time.time() - self._last_prune > self.prune_interval:
+            self.prune()
@@ -4,17 +4,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import logging
+from contextlib import asynccontextmanager
 import time
 import asyncio
+import json
 from typing import Optional, List, Dict, Any, Tuple, Union
 import os
 
 from ktb_document_processor import DocumentProcessor
 from ktb_api_client import APIClient
+from ktb_archive import S3ZipStreamWriter
+from ktb_artifact_store import ArtifactStore
 from ktb_utils import FileUtils, ImageProcessor
 from ktb_settings import *
 from ktb_chatbot import *
 from ktb_func import *
+from ktb_usage import JobUsage
 
 
 origins = [
@@ -26,7 +31,21 @@ origins = [
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.ERROR)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 수명 주기 동안 공용 커넥션 풀 유지"""
+    # 토큰 추정기는 모든 작업이 공유하므로 요청 처리 중이 아니라 시작 시 한 번만 캘리브레이션
+    if TOKEN_CALIBRATION_DIR:
+        try:
+            await asyncio.to_thread(
+                token_estimator.calibrate_from_directory, TOKEN_CALIBRATION_DIR, EXCLUDE_DIRS)
+        except Exception as e:
+            logger.error(f"토큰 추정기 캘리브레이션 실패: {str(e)}")
+    yield
+    await http_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +67,7 @@ class DocRequest(BaseModel):
     s3_path: str
     include_test: bool = False
     korean: bool = False
+    token_budget: Optional[int] = None  # 작업당 토큰 예산 (미지정 시 JOB_TOKEN_BUDGET)
     blocks: List[str] = [
         "OVERVIEW_BLOCK",
         "STRUCTURE_BLOCK",
@@ -122,18 +142,22 @@ async def prepare_repository(repo_url: str, s3_path: str) -> Tuple[str, str, str
         )
 
 
-async def process_docs(directory_path: dict[str, list], output_directory: str, user_name: str, repo_name: str, korean: bool) -> bool:
+async def process_docs(directory_path: dict[str, list], output_directory: str, user_name: str, repo_name: str, korean: bool,
+                       repo_dir: Optional[str] = None, store: Optional[ArtifactStore] = None) -> bool:
     """문서 생성 및 요약 처리"""
     try:
         start_time = time.perf_counter()
-        await doc_processor.generate_docs(directory_path, output_directory, korean)
+        # 요약은 각 문서가 생성되는 즉시 시작 (요약 호출은 summary 단계로 집계)
+        # 문서는 생성되는 즉시 압축하여 S3로 스트리밍 업로드 (임시 ZIP 파일 없음)
+        async with S3ZipStreamWriter(
+                s3, BUCKET_NAME, f"{user_name}_{repo_name}_DOCS.zip",
+                compresslevel=DOCS_ZIP_COMPRESSION_LEVEL, part_size=DOCS_UPLOAD_PART_SIZE,
+                max_concurrency=DOCS_UPLOAD_CONCURRENCY) as archive:
+            await usage_tracker.run_stage(
+                "docs", doc_processor.generate_and_summarize_docs(
+                    directory_path, output_directory, korean, repo_dir, archive, store))
         end_time = time.perf_counter()
-        print(f"문서 생성 완료 처리 시간: {end_time - start_time} 초")
-        await doc_processor.summarize_docs_async(output_directory, korean)
-        end_time = time.perf_counter()
-        print(f"문서 요약 완료 처리 시간: {end_time - start_time} 초")
-        create_zip(output_directory, "Docs.zip")
-        await upload_to_s3(BUCKET_NAME, "Docs.zip", f"{user_name}_{repo_name}_DOCS.zip")
+        print(f"문서 생성 및 요약 완료 처리 시간: {end_time - start_time} 초")
         return True  # 성공적으로 완료되면 True 반환
     except Exception as doc_error:
         logger.error(f"문서 생성 중 오류 발생: {str(doc_error)}")
@@ -156,9 +180,11 @@ async def perform_full_generation(repo_url, clone_dir, repo_name, user_name, inc
         tasks.append(readme_task)
         # java_categories가 있는 경우 문서 생성 태스크 추가
         doc_dir = os.path.join(clone_dir, "dododocs")
+        # 생성 문서는 메모리에 두고 압축/임베딩에 그대로 사용 (한도를 넘으면 doc_dir로 내보냄)
+        doc_store = ArtifactStore(doc_dir, ARTIFACT_STORE_MAX_BYTES)
         if java_categories:
             docs_task = asyncio.create_task(process_docs(
-                java_categories, doc_dir, user_name, repo_name, korean))
+                java_categories, doc_dir, user_name, repo_name, korean, clone_dir, doc_store))
             tasks.append(docs_task)
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -169,7 +195,7 @@ async def perform_full_generation(repo_url, clone_dir, repo_name, user_name, inc
             logger.error("문서 또는 README 생성 실패")
             raise Exception("문서 또는 README 생성 실패")
 
-        await add_data_to_db(f"{repo_name}_generated", clone_dir, [".md"])
+        await add_data_to_db(f"{repo_name}_generated", clone_dir, [".md"], doc_store.resident())
 
         end_time = time.perf_counter()
         print(f"문서 및 README 생성 시간: {end_time - start_time} 초")
@@ -198,9 +224,29 @@ async def perform_readme_only_generation(repo_url, clone_dir, repo_name, user_na
         logger.error(f"README 생성 오류")
 
 
-async def perform_tasks_and_cleanup(tasks, cleanup_args, db_name, clone_dir):
+async def save_job_usage(job: JobUsage, s3_key: str):
+    """작업 사용량 집계를 S3에 저장"""
+    summary = usage_tracker.finish_job(job)
+    try:
+        await asyncio.to_thread(
+            s3.put_object,
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=json.dumps(summary, ensure_ascii=False, indent=2).encode("utf-8"),
+            ContentType="application/json"
+        )
+    except Exception as e:
+        logger.error(f"사용량 업로드 실패: {str(e)}")
+
+
+async def perform_tasks_and_cleanup(tasks, cleanup_args, db_name, clone_dir,
+                                    job: Optional[JobUsage] = None, usage_s3_key: Optional[str] = None):
     """백그라운드 작업을 수행하고 완료되면 cleanup 실행"""
-    await asyncio.gather(*tasks)  # 모든 백그라운드 작업이 완료될 때까지 대기
+    try:
+        await asyncio.gather(*tasks)  # 모든 백그라운드 작업이 완료될 때까지 대기
+    finally:
+        if job is not None:
+            await save_job_usage(job, usage_s3_key)
     # generated_files_dir = os.path.join(clone_dir, "dododocs")  # 생성된 파일이 저장된 디렉토리
     # await add_data_to_db(db_name, clone_dir, [".md"])  # 생성된 파일 저장
     print(f"add_data_to_db 완료: {db_name}, {clone_dir}")
@@ -218,6 +264,9 @@ async def generate(request: DocRequest, background_tasks: BackgroundTasks):
                 request.repo_url,
                 request.s3_path
             )
+            # 이후 생성되는 태스크의 LLM 호출이 이 작업으로 집계됨
+            job = usage_tracker.start_job(
+                "generate", repo=request.repo_url, token_budget=request.token_budget)
             # Java 파일 존재 여부 확인
             java_files_path = file_utils.find_files(clone_dir, (".java",))
             has_java_files = len(java_files_path) > 0
@@ -225,6 +274,7 @@ async def generate(request: DocRequest, background_tasks: BackgroundTasks):
             # S3 키 생성
             readme_s3_key = f"{user_name}_{repo_name}_README.md"
             docs_s3_key = f"{user_name}_{repo_name}_DOCS.zip"
+            usage_s3_key = f"{user_name}_{repo_name}_USAGE.json"
 
             # 백그라운드 작업 생성
             tasks = []
@@ -234,14 +284,16 @@ async def generate(request: DocRequest, background_tasks: BackgroundTasks):
                         request.repo_url, clone_dir, repo_name, user_name, request.include_test, request.korean, request.blocks)
                 ))
                 response = {"readme_s3_key": readme_s3_key,
-                            "docs_s3_key": docs_s3_key}
+                            "docs_s3_key": docs_s3_key,
+                            "job_id": job.job_id}
             else:
                 tasks.append(asyncio.create_task(
                     perform_readme_only_generation(
                         request.repo_url, clone_dir, repo_name, user_name, request.korean, request.blocks)
                 ))
                 response = {"readme_s3_key": readme_s3_key,
-                            "docs_s3_key": None}
+                            "docs_s3_key": None,
+                            "job_id": job.job_id}
 
             # 소스 파일들을 DB에 저장하는 작업 추가 (비동기)
             # BUILD_FILE_NAMES와 SRC_FILE_NAMES를 합치고 '.md'를 제외한 리스트 생성
@@ -255,7 +307,8 @@ async def generate(request: DocRequest, background_tasks: BackgroundTasks):
 
             # 백그라운드에서 작업과 cleanup 실행
             background_tasks.add_task(perform_tasks_and_cleanup, tasks, (
-                repo_dir, clone_dir, "Docs.zip"), f"{repo_name}_generated", clone_dir)
+                repo_dir, clone_dir, None), f"{repo_name}_generated", clone_dir,
+                job, usage_s3_key)
 
             return response
 
@@ -285,6 +338,9 @@ async def generate_develop(request: DocRequest, background_tasks: BackgroundTask
                 request.repo_url,
                 request.s3_path
             )
+            # 이후 생성되는 태스크의 LLM 호출이 이 작업으로 집계됨
+            job = usage_tracker.start_job(
+                "generate", repo=request.repo_url, token_budget=request.token_budget)
             # Java 파일 존재 여부 확인
             java_files_path = file_utils.find_files(clone_dir, (".java",))
             has_java_files = len(java_files_path) > 0
@@ -292,6 +348,7 @@ async def generate_develop(request: DocRequest, background_tasks: BackgroundTask
             # S3 키 생성
             readme_s3_key = f"{user_name}_{repo_name}_README.md"
             docs_s3_key = f"{user_name}_{repo_name}_DOCS.zip"
+            usage_s3_key = f"{user_name}_{repo_name}_USAGE.json"
 
             # 백그라운드 작업 생성
             tasks = []
@@ -300,11 +357,13 @@ async def generate_develop(request: DocRequest, background_tasks: BackgroundTask
                     request.repo_url, clone_dir, repo_name, user_name, request.korean, request.blocks)
             ))
             response = {"readme_s3_key": readme_s3_key,
-                        "docs_s3_key": None}
+                        "docs_s3_key": None,
+                        "job_id": job.job_id}
 
             # 백그라운드에서 작업과 cleanup 실행
             background_tasks.add_task(perform_tasks_and_cleanup, tasks, (
-                repo_dir, clone_dir, "Docs.zip"), f"{repo_name}_generated", clone_dir)
+                repo_dir, clone_dir, None), f"{repo_name}_generated", clone_dir,
+                job, usage_s3_key)
 
             return response
 
@@ -323,6 +382,14 @@ async def generate_develop(request: DocRequest, background_tasks: BackgroundTask
     )
 
 
+def _finish_job_after(stream, job: JobUsage):
+    """스트리밍 응답이 끝나거나(연결 종료 포함) 중단되면 작업 사용량 기록 마감"""
+    try:
+        yield from stream
+    finally:
+        usage_tracker.finish_job(job)
+
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """채팅 엔드포인트"""
@@ -333,6 +400,8 @@ async def chat(request: ChatRequest):
                 detail="Query cannot be empty"
             )
 
+        job = usage_tracker.start_job("chat", repo=request.repo_url)
+
         # chat_history가 딕셔너리로 주어졌을 때 변환
         if request.chat_history:
             chat_history = []
@@ -357,11 +426,13 @@ async def chat(request: ChatRequest):
 
         if request.stream:
             return StreamingResponse(
-                response,
-                media_type="text/plain"
+                _finish_job_after(response, job),
+                media_type="text/plain",
+                headers={"X-Job-Id": job.job_id}
             )
         else:
-            return {"answer": response}
+            usage_tracker.finish_job(job)
+            return {"answer": response, "job_id": job.job_id}
 
     except Exception as error:
         logger.error(f"채팅 오류: {str(error)}", exc_info=True)
@@ -422,6 +493,33 @@ async def tttest():
         )
 
 
+@app.get("/stats/concurrency")
+async def concurrency_stats():
+    """LLM 동시 요청 수 제어기 상태 조회"""
+    return {
+        "openai": concurrency_controller.snapshot(),
+        "gemini": gemini_concurrency_controller.snapshot()
+    }
+
+
+@app.get("/stats/providers")
+async def provider_stats():
+    """LLM 엔드포인트별 상태(서킷, 남은 한도, 지연) 조회"""
+    return provider_pool.snapshot()
+
+
+@app.get("/usage/{job_id}")
+async def job_usage(job_id: str):
+    """작업별 토큰/호출 수/지연/비용 집계 조회"""
+    job = usage_tracker.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown job: {job_id}"
+        )
+    return job.to_dict()
+
+
 @app.get("/ping")
 async def ping():
     try:
@@ -4,9 +4,19 @@ from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
 import boto3
 import os
 from dotenv import load_dotenv
+import json
 import google.generativeai as genai
 from autotiktokenizer import AutoTikTokenizer
 from token_chunker import TokenChunker
+from ktb_token_estimator import TokenEstimator
+from ktb_rate_limiter import RateLimiter
+from ktb_http_pool import HTTPPool
+from ktb_concurrency import AdaptiveConcurrencyLimiter
+from ktb_provider_pool import ProviderEndpoint, ProviderPool, split_keys
+from ktb_usage import UsageTracker
+from ktb_readme_cache import ReadmeSectionCache
+from ktb_source_analyzer import SourceAnalyzer
+from ktb_dedup import DuplicateDetector
 # .env 파일 로드
 load_dotenv()
 
@@ -34,6 +44,7 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 # 모델 설정
 MODEL = 'gemini-1.5-flash'
 GPT_MODEL = 'gpt-4o-mini'
+USAGE_MODEL = 'gpt-4o'  # 빌드 파일 기반 Usage 생성 모델
 TEMPERATURE = 0.17
 SEED = 213
 TOP_LOGPROBS = 5  # logprob token 개수
@@ -56,6 +67,12 @@ embedding_chunker = TokenChunker(
     chunk_size=8191,  # maximum tokens per chunk
     chunk_overlap=2000  # overlap between chunks
 )
+# 토큰 예산 판단용 추정기 (한도 근처에서만 정확히 계산)
+token_estimator = TokenEstimator(default_model=GPT_MODEL)
+# 캘리브레이션용 샘플 디렉토리 (서버 시작 시 한 번만 캘리브레이션, 비어 있으면 기본 비율 사용)
+TOKEN_CALIBRATION_DIR = os.getenv('TOKEN_CALIBRATION_DIR', '')
+# 소스 구조 분석기 (파일 내용 해시 기준 캐시)
+source_analyzer = SourceAnalyzer()
 embedding_model_name = os.getenv(
     'EMBEDDING_MODEL_NAME', 'text-embedding-3-small')
 # 임베딩 모델과 차원 설정
@@ -113,18 +130,39 @@ FILE_EXTENSIONS = [
     'Dockerfile'
 ]
 
+# 문서 생성 시 포함할 import 클래스 범위 (깊이 1 = 직접 import만, 예산 0 = 무제한)
+IMPORT_RESOLUTION_DEPTH = int(os.getenv('IMPORT_RESOLUTION_DEPTH', 1))
+IMPORT_TOKEN_BUDGET = int(os.getenv('IMPORT_TOKEN_BUDGET', 0))
+
+# 소스 컨텍스트 압축 단계 범위 (none, comments, whitespace, boilerplate, skeleton, outline)
+# 최소 단계는 항상 적용하고, 컨텍스트가 한도를 넘으면 최대 단계까지 차례로 높인다
+CONTEXT_COMPRESSION_MIN_LEVEL = os.getenv('CONTEXT_COMPRESSION_MIN_LEVEL', 'none')
+CONTEXT_COMPRESSION_MAX_LEVEL = os.getenv('CONTEXT_COMPRESSION_MAX_LEVEL', 'outline')
+# 손실 압축(skeleton/outline)이 필요하면 import 그래프 중요도가 높은 파일부터 원문을 남김
+CONTEXT_RANKING = os.getenv('CONTEXT_RANKING', 'true').lower() == 'true'
+
+# 컨텍스트 구성/임베딩 전 동일·유사 파일 제거 (유사도는 MinHash 추정 Jaccard 기준)
+DEDUP_FILES = os.getenv('DEDUP_FILES', 'true').lower() == 'true'
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv('DEDUP_SIMILARITY_THRESHOLD', 0.9))
+duplicate_detector = DuplicateDetector(threshold=DEDUP_SIMILARITY_THRESHOLD)
+
+# README 청크 요약 계층 병합 (한 번에 병합할 요약 수, 병합 노드/최종 호출 입력 토큰 상한)
+README_REDUCE_FAN_IN = int(os.getenv('README_REDUCE_FAN_IN', 4))
+README_REDUCE_TOKEN_BUDGET = int(os.getenv('README_REDUCE_TOKEN_BUDGET', 60000))
+
 EXCLUDE_DIRS = ['.git', 'node_modules', 'venv', '__pycache__', 'dist', 'tests',
                 'test', 'examples', 'example', '.DS_Store', 'gradle-wrapper', '__MACOSX']
 
+# 빌드/설정 파일 이름 패턴 (fnmatch, 파일명 전체와 비교)
 BUILD_FILE_NAMES = [
-    'Makefile', 'CMakeLists.txt', 'setup.py', 'main.py', 'pyproject.toml',
-    'config.js', 'go.mod', 'Cargo.toml', 'Gemfile', 'pom.xml', 'package.json',
-    '.env', 'Dockerfile', 'requirements.txt', 'build',
-    'setup.cfg', 'requirements-dev.txt', 'tox.ini', 'configure.ac', 'config.h.in',
-    '.csproj', '.sln', 'tsconfig.json', 'webpack.config.js', 'gulpfile.js',
-    'rollup.config.js', 'build.gradle', 'settings.gradle', 'Jenkinsfile',
-    'Vagrantfile', 'Procfile', 'Brewfile', '.md', 'Dockerfile', 'docker-compose.yml', 'Makefile',
-    'CMakeLists.txt', '.env', 'main.py', 'poetry.lock'
+    'Makefile', 'makefile', 'GNUmakefile', 'CMakeLists.txt', 'configure.ac', 'config.h.in',
+    'setup.py', 'setup.cfg', 'pyproject.toml', 'requirements*.txt', 'tox.ini', 'Pipfile',
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts',
+    'application*.properties', 'application*.yml', 'application*.yaml',
+    'package.json', 'tsconfig.json', 'config.js', 'webpack.config.js', 'gulpfile.js', 'rollup.config.js',
+    'go.mod', 'Cargo.toml', 'Gemfile', '*.csproj', '*.sln',
+    'Dockerfile', 'Dockerfile.*', 'docker-compose*.yml', 'docker-compose*.yaml', 'compose.yml', 'compose.yaml',
+    '.env', '.env.example', 'Jenkinsfile', 'Vagrantfile', 'Procfile', 'Brewfile',
 ]
 
 SRC_FILE_NAMES = ['.py', '.js', '.ts', '.java', '.cpp',
@@ -133,10 +171,122 @@ SRC_FILE_NAMES = ['.py', '.js', '.ts', '.java', '.cpp',
 MAX_RETRIES = 2  # 최대 재시도 횟수
 RETRY_DELAY = 3  # 재시도 간격 (초)
 INCLUDE_TEST = False
+STREAM_DOCS = True  # 문서 생성 시 토큰을 받는 즉시 파일에 기록
+SINGLE_PASS_DOCS = True  # 문서와 요약을 한 번의 호출로 생성 (요약 구분자가 없으면 별도 요약 호출)
+PARALLEL_README_SECTIONS = True  # README 블록별로 필요한 컨텍스트만 넣어 동시에 생성한 뒤 요청 순서대로 조립
+DOC_PIPELINE_WORKERS = int(os.getenv('DOC_PIPELINE_WORKERS', 64))  # 문서 생성 워커 수 (동시에 준비하는 파일 수 상한)
+
+# 문서 ZIP 스트리밍 업로드 (압축 수준 0이면 무압축, 파트 크기는 S3 최소 5MB 이상)
+DOCS_ZIP_COMPRESSION_LEVEL = int(os.getenv('DOCS_ZIP_COMPRESSION_LEVEL', 6))
+DOCS_UPLOAD_PART_SIZE = int(os.getenv('DOCS_UPLOAD_PART_SIZE', 8 * 1024 * 1024))
+DOCS_UPLOAD_CONCURRENCY = int(os.getenv('DOCS_UPLOAD_CONCURRENCY', 4))
+# 생성 문서를 메모리에 보관할 최대 바이트 (넘으면 오래된 문서부터 디스크로 내보냄)
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv('ARTIFACT_STORE_MAX_BYTES', 64 * 1024 * 1024))
+
+# LLM 호출 속도 제한 (계정 한도에 맞게 환경 변수로 조정)
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', 500))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', 200000))
+EXPECTED_COMPLETION_TOKENS = 2000  # 한도 예약 시 사용할 응답 토큰 예상치
+MAX_RATE_LIMIT_RETRIES = 6  # 429 응답 시 최대 재시도 횟수
+rate_limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM)
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', 2000))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', 4000000))
+gemini_rate_limiter = RateLimiter(GEMINI_RPM, GEMINI_TPM)
+
+# LLM 동시 요청 수 (AIMD로 자동 조절, 시작값과 상한만 설정)
+LLM_INITIAL_CONCURRENCY = 8
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 100))
+concurrency_controller = AdaptiveConcurrencyLimiter(
+    initial=LLM_INITIAL_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY, name="openai")
+gemini_concurrency_controller = AdaptiveConcurrencyLimiter(
+    initial=LLM_INITIAL_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY, name="gemini")
+
+# LLM 엔드포인트 풀 (OPENAI_API_KEYS / GEMINI_API_KEYS에 콤마로 여러 키 지정 가능)
+# 로컬 대체 서버(ktb_mock_llm_server.py) 사용 시 환경 변수로 주소 변경
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', "https://api.openai.com/v1")
+GEMINI_OPENAI_BASE_URL = os.getenv(
+    'GEMINI_OPENAI_BASE_URL', "https://generativelanguage.googleapis.com/v1beta/openai")
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', "https://generativelanguage.googleapis.com/v1beta/")
+# false면 Gemini SDK 대신 OpenAI 호환 엔드포인트만 사용 (오프라인 벤치마크 등)
+GEMINI_NATIVE_SDK = os.getenv('GEMINI_NATIVE_SDK', 'true').lower() == 'true'
+OPENAI_MODELS = ('gpt-4o-mini', 'gpt-4o')
+GEMINI_MODELS = ('gemini-1.5-flash', 'gemini-1.5-pro')
+# 엔드포인트가 모두 사용 불가할 때 전환할 동등 모델
+MODEL_EQUIVALENTS = {
+    'gpt-4o-mini': ['gemini-1.5-flash'],
+    'gpt-4o': ['gemini-1.5-pro'],
+    'gemini-1.5-flash': ['gpt-4o-mini'],
+    'gemini-1.5-pro': ['gpt-4o'],
+}
+
+
+def _build_endpoints():
+    """환경 변수로부터 엔드포인트 목록 구성 (첫 키는 기본 limiter/controller 공유)"""
+    endpoints = []
+    providers = [
+        ("openai", split_keys(os.getenv('OPENAI_API_KEYS'), os.getenv('OPENAI_API_KEY')),
+         OPENAI_BASE_URL, OPENAI_MODELS, OPENAI_RPM, OPENAI_TPM,
+         rate_limiter, concurrency_controller),
+        ("gemini", split_keys(os.getenv('GEMINI_API_KEYS'), os.getenv('GEMINI_API_KEY')),
+         GEMINI_OPENAI_BASE_URL, GEMINI_MODELS, GEMINI_RPM, GEMINI_TPM,
+         gemini_rate_limiter, gemini_concurrency_controller),
+    ]
+    for provider, keys, base_url, models, rpm, tpm, limiter, controller in providers:
+        for i, key in enumerate(keys):
+            endpoints.append(ProviderEndpoint(
+                name=f"{provider}-{i}",
+                provider=provider,
+                api_key=key,
+                base_url=base_url,
+                models=models,
+                rate_limiter=limiter if i == 0 else RateLimiter(rpm, tpm),
+                concurrency=controller if i == 0 else AdaptiveConcurrencyLimiter(
+                    initial=LLM_INITIAL_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY, name=f"{provider}-{i}")
+            ))
+
+    # 추가 OpenAI 호환 엔드포인트 (JSON 목록: name, provider, api_key, base_url, models, rpm, tpm)
+    for extra in json.loads(os.getenv('LLM_ENDPOINTS', '[]')):
+        endpoints.append(ProviderEndpoint(
+            name=extra['name'],
+            provider=extra.get('provider', extra['name']),
+            api_key=extra['api_key'],
+            base_url=extra['base_url'],
+            models=tuple(extra['models']),
+            rate_limiter=RateLimiter(extra.get('rpm', OPENAI_RPM), extra.get('tpm', OPENAI_TPM)),
+            concurrency=AdaptiveConcurrencyLimiter(
+                initial=LLM_INITIAL_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY, name=extra['name'])
+        ))
+    return endpoints
+
+
+provider_pool = ProviderPool(_build_endpoints(), equivalents=MODEL_EQUIVALENTS)
+
+
+# 작업별 토큰/비용 집계
+# 모델별 (입력, 출력) 100만 토큰당 가격 (USD)
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00),
+}
+JOB_TOKEN_BUDGET = int(os.getenv('JOB_TOKEN_BUDGET', 0))  # 작업당 토큰 예산 (0이면 무제한)
+usage_tracker = UsageTracker(prices=MODEL_PRICES, default_budget=JOB_TOKEN_BUDGET)
+
+
+# 프로바이더별 공용 커넥션 풀
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 100))  # 프로바이더당 최대 커넥션 수
+HTTP_KEEPALIVE_TIMEOUT = 60  # 유휴 커넥션 유지 시간 (초)
+HTTP_DNS_CACHE_TTL = 300     # DNS 캐시 유지 시간 (초)
+http_pool = HTTPPool(
+    pool_size=HTTP_POOL_SIZE,
+    keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=HTTP_DNS_CACHE_TTL
+)
 
 
 def get_openai_client():
-    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return http_pool.get_openai_client(os.getenv('OPENAI_API_KEY'), base_url=OPENAI_BASE_URL)
 
 
 def get_gemini_client(prompt: str):
@@ -147,9 +297,10 @@ def get_gemini_client(prompt: str):
     )
 
 
-client_gemini = OpenAI(
-    api_key=os.getenv('GEMINI_API_KEY'),
-    base_url="https://generativelanguage.googleapis.com/v1beta/"
+client_gemini = http_pool.get_openai_client(
+    os.getenv('GEMINI_API_KEY'),
+    base_url=GEMINI_BASE_URL,
+    provider="gemini"
 )
 # 환경 변수로 실행 환경 확인
 IS_DOCKER = os.getenv('IS_DOCKER', 'false').lower() == 'true'
@@ -159,17 +310,22 @@ if IS_DOCKER:
     CHROMA_PATH = "/app/chroma_data"  # Docker 환경
 else:
     CHROMA_PATH = "./chroma_data"     # 로컬 환경
+README_CACHE_PATH = os.getenv(
+    'README_CACHE_PATH', "/app/readme_cache" if IS_DOCKER else "./readme_cache")
+README_CACHE_TTL = int(os.getenv('README_CACHE_TTL', 7 * 24 * 3600))  # 초 단위 (0이면 만료 없음)
+readme_cache = ReadmeSectionCache(README_CACHE_PATH, ttl=README_CACHE_TTL)
 
 # ChromaDB 클라이언트 초기화
 chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 embedding_function = OpenAIEmbeddingFunction(
-    api_key=os.getenv('OPENAI_API_KEY'), model_name=EMBEDDING_MODEL)
+    api_key=os.getenv('OPENAI_API_KEY'), model_name=EMBEDDING_MODEL, api_base=OPENAI_BASE_URL)
 
 # S3 클라이언트 생성
 s3 = boto3.client(
     's3',
     aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
     aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+    endpoint_url=os.getenv('S3_ENDPOINT_URL'),
 )
 
 BUCKET_NAME = 'haon-dododocs'
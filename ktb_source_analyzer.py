@@ -0,0 +1,476 @@
+"""소스 코드 구조 분석 관련 코드"""
+import ast
+import bisect
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Optional, Tuple
+
+from ktb_context_compressor import C_LIKE_TYPES, split_segments
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+(?:::\w+)*|::|=>|->|\S')
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_$~][\w$]*(?:::~?\w+)*$')
+TYPE_KEYWORDS = {
+    'java': {'class', 'interface', 'enum', 'record'},
+    'cs': {'class', 'interface', 'enum', 'struct', 'record', 'namespace'},
+    'cpp': {'class', 'struct', 'union', 'namespace'},
+    'c': {'struct', 'union'},
+    'js': {'class'},
+    'ts': {'class', 'interface', 'enum', 'namespace'},
+}
+CONTROL_KEYWORDS = {'if', 'for', 'foreach', 'while', 'switch', 'catch', 'using', 'lock', 'synchronized',
+                    'return', 'new', 'else', 'do', 'try', 'finally', 'await', 'typeof', 'sizeof', 'throw'}
+TRAILING_MODIFIERS = {'const', 'noexcept', 'override', 'final', 'async', 'volatile', '&', '&&'}
+PREPROCESSOR_TYPES = {'cpp', 'c', 'cs'}
+MAX_SIGNATURE_LENGTH = 200
+
+
+class Token(NamedTuple):
+    value: str
+    kind: str     # code, string
+    start: int
+    end: int
+    line: int
+    doc: str      # 바로 앞 문서 주석의 첫 문장
+
+
+@dataclass
+class Symbol:
+    """클래스/함수 등 선언 하나"""
+    kind: str
+    name: str
+    signature: str
+    start_line: int
+    end_line: int
+    depth: int = 0
+    doc: str = ""
+
+
+@dataclass
+class SourceOutline:
+    """파일 하나의 구조 요약 (패키지, import, 심볼과 줄 범위)"""
+    file_type: str
+    package: Optional[str] = None
+    imports: List[str] = field(default_factory=list)   # 정규화된 import 문
+    modules: List[str] = field(default_factory=list)   # import 대상 (모듈/클래스/경로)
+    symbols: List[Symbol] = field(default_factory=list)
+
+    def add_import(self, statement: str, module: Optional[str] = None):
+        if statement not in self.imports:
+            self.imports.append(statement)
+        if module and module not in self.modules:
+            self.modules.append(module)
+
+    def primary_symbol(self, path: Optional[str] = None) -> str:
+        """대표 심볼 이름 (파일명과 같은 최상위 타입 > 첫 최상위 타입 > 첫 최상위 함수)"""
+        top_level = [symbol for symbol in self.symbols if symbol.depth == 0 and symbol.kind != 'namespace']
+        if not top_level:
+            top_level = [symbol for symbol in self.symbols if symbol.kind != 'namespace']
+        if path:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            for symbol in top_level:
+                if symbol.name == stem:
+                    return symbol.name
+        for symbol in top_level:
+            if symbol.kind not in ('function', 'method'):
+                return symbol.name
+        return top_level[0].name if top_level else ""
+
+    def render(self) -> str:
+        """심볼 시그니처와 줄 범위만 남긴 압축 표현"""
+        lines = []
+        for symbol in self.symbols:
+            line = f"{'  ' * symbol.depth}{symbol.signature}  [L{symbol.start_line}-{symbol.end_line}]"
+            if symbol.doc:
+                line += f" {symbol.doc}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def _first_sentence(text: str, limit: int = 120) -> str:
+    """문서 주석/docstring의 첫 줄 첫 문장"""
+    text = re.sub(r'^\s*(?:/\*\*|///|\*/?|"""|\'\'\')\s?', '', text, flags=re.MULTILINE)
+    text = re.sub(r'</?\w+[^>]*>', '', text.replace('*/', ''))
+    text = next((line.strip() for line in text.splitlines() if line.strip()), "")
+    match = re.match(r'(.+?[.!?。])(?:\s|$)', text)
+    sentence = match.group(1) if match else text
+    return sentence[:limit]
+
+
+def _collapse(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_SIGNATURE_LENGTH else text[:MAX_SIGNATURE_LENGTH - 3] + "..."
+
+
+def _analyze_python(content: str) -> SourceOutline:
+    outline = SourceOutline(file_type='py')
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        logger.debug(f"Python 구문 오류로 줄 단위 분석: {str(e)}")
+        return _analyze_python_lines(content)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                outline.add_import(ast.unparse(node), alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            statement = ast.unparse(node)
+            base = '.' * node.level + (node.module or '')
+            for alias in node.names:
+                module = base if alias.name == '*' else (
+                    f"{base}{alias.name}" if base.endswith('.') else f"{base}.{alias.name}")
+                outline.add_import(statement, module)
+
+    def visit(body, depth: int):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(keyword) for keyword in node.keywords]
+                signature = f"class {node.name}" + (f"({', '.join(bases)})" if bases else "")
+                outline.symbols.append(Symbol(
+                    'class', node.name, _collapse(signature), node.lineno, node.end_lineno, depth,
+                    _first_sentence(ast.get_docstring(node) or "")))
+                visit(node.body, depth + 1)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+                if node.returns is not None:
+                    signature += f" -> {ast.unparse(node.returns)}"
+                outline.symbols.append(Symbol(
+                    'method' if depth else 'function', node.name, _collapse(signature),
+                    node.lineno, node.end_lineno, depth,
+                    _first_sentence(ast.get_docstring(node) or "")))
+
+    visit(tree.body, 0)
+    return outline
+
+
+def _analyze_python_lines(content: str) -> SourceOutline:
+    """구문 오류가 있는 Python 파일의 줄 단위 분석"""
+    outline = SourceOutline(file_type='py')
+    for number, line in enumerate(content.splitlines(), 1):
+        stripped = line.strip()
+        if re.match(r'(?:from\s+[\w.]+\s+)?import\s', stripped) and line == line.lstrip():
+            outline.add_import(stripped)
+        match = re.match(r'(\s*)((?:async\s+)?def|class)\s+(\w+)', line)
+        if match:
+            depth = len(match.group(1).expandtabs()) // 4
+            kind = 'class' if match.group(2) == 'class' else ('method' if depth else 'function')
+            outline.symbols.append(Symbol(kind, match.group(3), _collapse(stripped.rstrip(':')), number, number, depth))
+    return outline
+
+
+class _CLikeAnalyzer:
+    """C 계열 언어(Java, JS/TS, C++, C#)의 토큰 기반 구조 분석
+
+    문자열/주석을 구분하는 렉서 결과를 한 번 훑으면서 ; { } 단위 선언부를
+    분류한다. 함수 본문은 짝이 맞는 중괄호까지 건너뛰므로 지역 변수나
+    제어문은 심볼로 잡지 않는다.
+    """
+
+    def __init__(self, content: str, file_type: str):
+        self.content = content
+        self.file_type = file_type
+        self.type_keywords = TYPE_KEYWORDS.get(file_type, {'class', 'struct', 'interface', 'enum'})
+        self.outline = SourceOutline(file_type=file_type)
+        self.tokens = self._tokenize()
+        self.stack: List[Optional[Symbol]] = []
+
+    def _tokenize(self) -> List[Token]:
+        newlines = [match.start() for match in re.finditer('\n', self.content)]
+        tokens = []
+        offset = 0
+        doc = ""
+        for kind, value in split_segments(self.content, self.file_type):
+            if kind == 'code':
+                for match in TOKEN_PATTERN.finditer(value):
+                    start = offset + match.start()
+                    tokens.append(Token(match.group(), 'code', start, offset + match.end(),
+                                        bisect.bisect_left(newlines, start) + 1, doc))
+                    doc = ""
+            elif kind == 'string':
+                tokens.append(Token(value, 'string', offset, offset + len(value),
+                                    bisect.bisect_left(newlines, offset) + 1, doc))
+                doc = ""
+            elif kind == 'doc':
+                doc = _first_sentence(value)
+            offset += len(value)
+        return tokens
+
+    def _text(self, tokens: List[Token]) -> str:
+        return self.content[tokens[0].start:tokens[-1].end] if tokens else ""
+
+    def _depth(self) -> int:
+        """들여쓰기 깊이 (네임스페이스는 제외)"""
+        return sum(1 for symbol in self.stack if symbol is not None and symbol.kind != 'namespace')
+
+    @staticmethod
+    def _open_parens(header: List[Token]) -> int:
+        depth = 0
+        for token in header:
+            if token.kind == 'code':
+                if token.value in '([':
+                    depth += 1
+                elif token.value in ')]':
+                    depth -= 1
+        return depth
+
+    @staticmethod
+    def _assigns(values: List[str]) -> bool:
+        """괄호 밖의 대입이 있는 선언부 (필드 초기화, 객체 리터럴 등)"""
+        depth = 0
+        for value in values:
+            if value in '([':
+                depth += 1
+            elif value in ')]':
+                depth -= 1
+            elif value == '=' and depth == 0:
+                return True
+        return False
+
+    def _trim_header(self, header: List[Token]) -> List[Token]:
+        """C++ 접근 지정자(public: 등)와 순수 가상/기본 함수 표기(= 0) 제거"""
+        if (self.file_type in ('cpp', 'c') and len(header) > 1
+                and header[0].value in ('public', 'private', 'protected') and header[1].value == ':'):
+            header = header[2:]
+        if len(header) > 2 and header[-2].value == '=' and header[-1].value in ('0', 'default', 'delete'):
+            header = header[:-2]
+        return header
+
+    def _container(self) -> Optional[Symbol]:
+        for symbol in reversed(self.stack):
+            if symbol is not None:
+                return symbol
+        return None
+
+    def _match_brace(self, index: int) -> int:
+        depth = 0
+        for position in range(index, len(self.tokens)):
+            token = self.tokens[position]
+            if token.kind != 'code':
+                continue
+            if token.value == '{':
+                depth += 1
+            elif token.value == '}':
+                depth -= 1
+                if not depth:
+                    return position
+        return len(self.tokens) - 1
+
+    def _type_symbol(self, header: List[Token]) -> Optional[Symbol]:
+        values = [token.value for token in header]
+        for index, value in enumerate(values):
+            if value not in self.type_keywords or header[index].kind != 'code':
+                continue
+            if index and values[index - 1] in ('.', 'new'):
+                continue
+            kind = 'annotation' if index and values[index - 1] == '@' and value == 'interface' else value
+            rest = [v for v in values[index + 1:] if v not in self.type_keywords]
+            if kind == 'namespace':
+                name = "".join(rest)
+            else:
+                name = rest[0] if rest and IDENTIFIER_PATTERN.match(rest[0]) and rest[0] not in (
+                    'extends', 'implements') else "<anonymous>"
+            return Symbol(kind, name, _collapse(self._text(header)), header[0].line, header[-1].line,
+                          self._depth(), header[0].doc)
+        return None
+
+    def _function_name(self, header: List[Token]) -> Optional[str]:
+        """함수 선언부이면 함수 이름 (익명 함수는 <anonymous>), 아니면 None"""
+        values = [token.value if token.kind == 'code' else '"' for token in header]
+        if not values:
+            return None
+        if values[-1] in ('=>', '->'):
+            for index, value in enumerate(values):
+                if value in ('=', ':') and index and IDENTIFIER_PATTERN.match(values[index - 1]):
+                    return values[index - 1]
+            return "<anonymous>"
+
+        # 반환 타입(TS), 생성자 초기화 목록(C++), base 호출(C#), throws 절 제거
+        depth = 0
+        end = len(values)
+        for index, value in enumerate(values):
+            if value == '(':
+                depth += 1
+            elif value == ')':
+                depth -= 1
+            elif depth == 0 and index and (value == 'throws' or (value == ':' and values[index - 1] == ')')):
+                end = index
+                break
+        while end and values[end - 1] in TRAILING_MODIFIERS:
+            end -= 1
+        if not end or values[end - 1] != ')':
+            return None
+
+        depth = 0
+        for index in range(end - 1, -1, -1):
+            if values[index] == ')':
+                depth += 1
+            elif values[index] == '(':
+                depth -= 1
+                if not depth:
+                    break
+        else:
+            return None
+        if index == 0:
+            return None
+        name = values[index - 1]
+        if name == 'function':
+            return "<anonymous>"
+        if not IDENTIFIER_PATTERN.match(name) or name in CONTROL_KEYWORDS:
+            return None
+        if index >= 2 and values[index - 2] == 'new':
+            return None
+        return name
+
+    def _function_symbol(self, header: List[Token], name: str, end_line: int) -> Symbol:
+        container = self._container()
+        kind = 'method' if container is not None and container.kind != 'namespace' else 'function'
+        return Symbol(kind, name, _collapse(self._text(header)), header[0].line, end_line,
+                      self._depth(), header[0].doc)
+
+    def _statement(self, header: List[Token]):
+        """; 로 끝나는 선언 (package/import/using, 본문 없는 메서드 선언)"""
+        values = [token.value for token in header]
+        if not values:
+            return
+        text = _collapse(self._text(header))
+        first = values[0]
+        if self.file_type == 'java' and first == 'package':
+            self.outline.package = "".join(values[1:])
+        elif self.file_type == 'java' and first == 'import':
+            is_static = len(values) > 1 and values[1] == 'static'
+            target = "".join(values[2 if is_static else 1:])
+            self.outline.add_import(
+                f"import {'static ' if is_static else ''}{target};",
+                target[:-2] if target.endswith('.*') else target)
+        elif self.file_type == 'cs' and first == 'namespace' and not self.stack:
+            self.outline.package = "".join(values[1:])
+        elif self.file_type == 'cs' and first == 'using' and len(values) > 1 and values[1] != '(':
+            target = values[values.index('=') + 1:] if '=' in values else [v for v in values[1:] if v != 'static']
+            self.outline.add_import(f"{text};", "".join(target))
+        elif self.file_type in ('js', 'ts') and first in ('import', 'export') and header[-1].kind == 'string':
+            self.outline.add_import(text, header[-1].value[1:-1])
+        elif self.file_type in ('js', 'ts'):
+            for index, token in enumerate(header[:-3]):
+                if token.value == 'require' and values[index + 1] == '(' and header[index + 2].kind == 'string':
+                    self.outline.add_import(text, header[index + 2].value[1:-1])
+        if first in ('package', 'import', 'using', 'export') or self._assigns(values):
+            return
+
+        container = self._container()
+        declares = container is not None and container.kind != 'namespace'
+        if self.file_type in ('cpp', 'c') and not declares:
+            declares = len(values) > 2  # 헤더 파일의 함수 원형 (반환 타입 포함)
+        if declares:
+            name = self._function_name(header)
+            if name and name != "<anonymous>":
+                self.outline.symbols.append(self._function_symbol(header, name, header[-1].line))
+
+    def analyze(self) -> SourceOutline:
+        tokens = self.tokens
+        header_start = 0
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            if (token.value == '#' and token.kind == 'code' and self.file_type in PREPROCESSOR_TYPES
+                    and (index == 0 or tokens[index - 1].line != token.line)):
+                end = index
+                while end < len(tokens) and tokens[end].line == token.line:
+                    end += 1
+                directive = tokens[index + 1:end]
+                if len(directive) > 1 and directive[0].value == 'include':
+                    target = self._text(directive[1:])
+                    self.outline.add_import(f"#include {target}", target.strip('<>"'))
+                index = header_start = end
+                continue
+            if token.kind != 'code' or token.value not in '{;}':
+                index += 1
+                continue
+
+            header = self._trim_header(tokens[header_start:index])
+            if token.value == ';':
+                self._statement(header)
+            elif token.value == '}':
+                symbol = self.stack.pop() if self.stack else None
+                if symbol is not None:
+                    symbol.end_line = token.line
+            else:
+                symbol = self._type_symbol(header) if header else None
+                if symbol is not None:
+                    self.outline.symbols.append(symbol)
+                    if symbol.kind == 'namespace' and not self.outline.package:
+                        self.outline.package = symbol.name
+                    self.stack.append(symbol)
+                else:
+                    name = self._function_name(header) if header else None
+                    if name is not None:
+                        end = self._match_brace(index)
+                        self.outline.symbols.append(self._function_symbol(header, name, tokens[end].line))
+                        index = header_start = end + 1
+                        continue
+                    if header and (self._open_parens(header) > 0 or header[0].value in ('import', 'export')
+                                   and self.file_type in ('js', 'ts') and header[-1].value != 'default'):
+                        # 인자/import 목록 안의 중괄호는 선언부의 일부
+                        index = self._match_brace(index) + 1
+                        continue
+                    if header and self._assigns([t.value for t in header]):
+                        # 필드 초기화/객체 리터럴 본문은 건너뜀
+                        index = header_start = self._match_brace(index) + 1
+                        continue
+                    self.stack.append(None)
+            index += 1
+            header_start = index
+        return self.outline
+
+
+class SourceAnalyzer:
+    """파일 내용 해시 기준으로 캐시하는 구조 분석기
+
+    Python은 ast, Java/JS/TS/C++/C#은 문자열과 주석을 구분하는 렉서로
+    분석하여 여러 줄 import, 중첩 클래스, 메서드 시그니처와 줄 범위를 얻는다.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SourceOutline]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"analyzed": 0, "cache_hits": 0}
+
+    def clear(self):
+        """캐시 비우기"""
+        with self._lock:
+            self._cache.clear()
+
+    def analyze(self, content: str, file_type: str) -> SourceOutline:
+        key = hashlib.sha256(f"{file_type}\x00{content}".encode("utf-8", "surrogatepass")).hexdigest()
+        with self._lock:
+            outline = self._cache.get(key)
+            if outline is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return outline
+
+        try:
+            if file_type == 'py':
+                outline = _analyze_python(content)
+            elif file_type in C_LIKE_TYPES:
+                outline = _CLikeAnalyzer(content, file_type).analyze()
+            else:
+                outline = SourceOutline(file_type=file_type)
+        except Exception as e:
+            logger.error(f"소스 분석 오류 ({file_type}): {str(e)}")
+            outline = SourceOutline(file_type=file_type)
+
+        with self._lock:
+            self.stats["analyzed"] += 1
+            self._cache[key] = outline
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return outline
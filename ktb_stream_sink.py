@@ -0,0 +1,198 @@
+"""스트리밍 응답 출력 대상 관련 코드"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+S3_MIN_PART_SIZE = 5 * 1024 * 1024  # 마지막 파트를 제외한 S3 멀티파트 최소 크기
+
+
+class StreamSink(ABC):
+    """스트리밍 토큰을 받아 기록하는 대상의 기본 클래스"""
+
+    @abstractmethod
+    async def write(self, text: str):
+        """토큰 기록"""
+
+    async def close(self):
+        pass
+
+    async def abort(self):
+        """실패 시 부분 결과 정리"""
+        pass
+
+
+class S3MultipartSink(StreamSink):
+    """받은 데이터를 파트 단위로 모아 S3 멀티파트 업로드로 전송
+
+    part_size만큼 모이면 파트 업로드를 시작하며, 파트 업로드는 최대
+    max_concurrency개까지 동시에 진행한다. 그 이상이면 write가 슬롯이 날
+    때까지 기다려 메모리 사용량을 제한한다. 전체 크기가 한 파트보다 작으면
+    멀티파트 대신 put_object 한 번으로 올린다.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: int = S3_MIN_PART_SIZE,
+                 max_concurrency: int = 4, content_type: Optional[str] = None):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self._extra = {"ContentType": content_type} if content_type else {}
+        self._buffer = bytearray()
+        self._slots = asyncio.Semaphore(max(max_concurrency, 1))
+        self._uploads: List[asyncio.Task] = []
+        self._upload_id: Optional[str] = None
+        self._parts: List[dict] = []
+        self._part_number = 0
+        self.stats = {"bytes": 0, "parts": 0}
+
+    async def write(self, text: str):
+        await self.write_bytes(text.encode("utf-8"))
+
+    async def write_bytes(self, data: bytes):
+        self._buffer.extend(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._start_part(part)
+
+    async def _start_part(self, data: bytes):
+        if self._upload_id is None:
+            response = await asyncio.to_thread(
+                self.s3.create_multipart_upload, Bucket=self.bucket, Key=self.key, **self._extra)
+            self._upload_id = response["UploadId"]
+        self._part_number += 1
+        await self._slots.acquire()  # 동시 업로드 수 초과 시 대기
+        self._uploads.append(asyncio.create_task(self._upload_part(self._part_number, data)))
+
+    async def _upload_part(self, part_number: int, data: bytes):
+        try:
+            response = await asyncio.to_thread(
+                self.s3.upload_part,
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                PartNumber=part_number, Body=data)
+            self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            self.stats["parts"] += 1
+            self.stats["bytes"] += len(data)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """남은 데이터를 올리고 업로드 완료 (실패 시 업로드 취소)"""
+        remainder, self._buffer = bytes(self._buffer), bytearray()
+        try:
+            if self._upload_id is None:
+                await asyncio.to_thread(
+                    self.s3.put_object, Bucket=self.bucket, Key=self.key, Body=remainder, **self._extra)
+                self.stats["bytes"] += len(remainder)
+                return
+            if remainder:
+                await self._start_part(remainder)
+            await asyncio.gather(*self._uploads)
+            await asyncio.to_thread(
+                self.s3.complete_multipart_upload,
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": sorted(self._parts, key=lambda part: part["PartNumber"])})
+        except BaseException:
+            await self.abort()
+            raise
+
+    async def abort(self):
+        """진행 중인 파트 업로드를 중단하고 멀티파트 업로드 정리"""
+        self._buffer = bytearray()
+        for task in self._uploads:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._uploads, return_exceptions=True)
+        if self._upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    self.s3.abort_multipart_upload,
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.error(f"멀티파트 업로드 취소 실패 ({self.key}): {str(e)}")
+            self._upload_id = None
+
+
+class ReplaceFilterSink(StreamSink):
+    """스트림에 문자열 치환을 적용하는 래퍼 (remove_markdown_blocks의 스트리밍 버전)
+
+    치환 대상이 토큰 경계에 걸칠 수 있으므로 가장 긴 패턴 길이만큼 꼬리를 보류한다.
+    """
+
+    def __init__(self, sink: StreamSink, replacements: List[tuple]):
+        self.sink = sink
+        self.replacements = replacements
+        self._hold = max(len(old) for old, _ in replacements) - 1
+        self._pending = ""
+
+    def _apply(self, text: str) -> str:
+        for old, new in self.replacements:
+            text = text.replace(old, new)
+        return text
+
+    async def write(self, text: str):
+        self._pending = self._apply(self._pending + text)
+        if self._hold == 0:
+            ready, self._pending = self._pending, ""
+            await self.sink.write(ready)
+        elif len(self._pending) > self._hold:
+            ready, self._pending = self._pending[:-self._hold], self._pending[-self._hold:]
+            await self.sink.write(ready)
+
+    async def close(self):
+        if self._pending:
+            await self.sink.write(self._pending)
+            self._pending = ""
+        await self.sink.close()
+
+    async def abort(self):
+        self._pending = ""
+        await self.sink.abort()
+
+
+class MarkerSplitSink(StreamSink):
+    """구분자 이전 내용만 하위 sink로 전달하고 이후 내용은 tail에 보관
+
+    문서와 요약을 한 번에 생성할 때 문서 파일에는 요약 부분이 기록되지 않도록 한다.
+    """
+
+    def __init__(self, sink: StreamSink, marker: str):
+        self.sink = sink
+        self.marker = marker
+        self.found = False
+        self._pending = ""
+        self._tail: List[str] = []
+
+    @property
+    def tail(self) -> str:
+        return "".join(self._tail)
+
+    async def write(self, text: str):
+        if self.found:
+            self._tail.append(text)
+            return
+        self._pending += text
+        index = self._pending.find(self.marker)
+        if index >= 0:
+            self.found = True
+            self._tail.append(self._pending[index + len(self.marker):])
+            ready, self._pending = self._pending[:index].rstrip(), ""
+        else:
+            # 구분자가 토큰 경계에 걸칠 수 있으므로 구분자 길이만큼 꼬리를 보류
+            hold = len(self.marker) - 1
+            ready, self._pending = self._pending[:-hold], self._pending[-hold:]
+        if ready:
+            await self.sink.write(ready)
+
+    async def close(self):
+        if self._pending:
+            await self.sink.write(self._pending)
+            self._pending = ""
+        await self.sink.close()
+
+    async def abort(self):
+        self._pending = ""
+        await self.sink.abort()
@@ -0,0 +1,141 @@
+"""Java 심볼 인덱스 (import 해석) 관련 코드"""
+import logging
+import os
+import re
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+IMPORT_PATTERN = re.compile(r'^\s*import\s+(static\s+)?([\w.]+)(\.\*)?\s*;', re.MULTILINE)
+# 빌드 산출물 등 소스가 아닌 디렉토리 (테스트 소스는 Test 문서 생성에 필요하므로 포함)
+DEFAULT_EXCLUDE_DIRS = {'.git', '.gradle', '.idea', 'build', 'target', 'out', 'bin',
+                        'node_modules', '__MACOSX'}
+
+
+class JavaSymbolIndex:
+    """저장소 전체의 정규화된 클래스 이름(FQCN) -> 파일 경로 인덱스
+
+    package 선언으로 FQCN을 구성하므로 src/main/java 위치와 무관하게
+    Gradle/Maven 멀티 모듈 구조를 모두 처리한다. 같은 FQCN이 여러 모듈에
+    존재하면 import하는 파일과 경로가 가장 많이 겹치는 파일을 선택한다.
+    읽은 파일 내용은 캐시하여 여러 파일이 공유하는 DTO 등을 한 번만 읽는다.
+    """
+
+    def __init__(self, token_counter: Optional[Callable[[str], int]] = None):
+        self.token_counter = token_counter or (lambda text: len(text) // 4)
+        self.classes: Dict[str, List[str]] = {}
+        self.packages: Dict[str, Set[str]] = {}
+        self._contents: Dict[str, str] = {}
+
+    @classmethod
+    def build(cls, root: str, exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS,
+              token_counter: Optional[Callable[[str], int]] = None) -> "JavaSymbolIndex":
+        """root 아래의 모든 .java 파일 색인"""
+        index = cls(token_counter)
+        exclude_dirs = set(exclude_dirs)
+        for current, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            for file in files:
+                if file.endswith('.java'):
+                    index.add(os.path.join(current, file))
+        for paths in index.classes.values():
+            paths.sort()  # 중복 FQCN 선택 결과가 탐색 순서에 따라 달라지지 않도록 정렬
+        print(f"Java 심볼 인덱스: 클래스 {len(index.classes)}개, 패키지 {len(index.packages)}개")
+        return index
+
+    def add(self, path: str):
+        content = self.read(path)
+        if content is None:
+            return
+        match = PACKAGE_PATTERN.search(content)
+        package = match.group(1) if match else ''
+        class_name = os.path.splitext(os.path.basename(path))[0]
+        fqcn = f"{package}.{class_name}" if package else class_name
+        self.classes.setdefault(fqcn, []).append(path)
+        self.packages.setdefault(package, set()).add(fqcn)
+
+    def read(self, path: str) -> Optional[str]:
+        """파일 내용 (캐시)"""
+        content = self._contents.get(path)
+        if content is None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except Exception as e:
+                logger.error(f"파일 읽기 오류 ({path}): {str(e)}")
+                return None
+            self._contents[path] = content
+        return content
+
+    def lookup(self, fqcn: str, importer: Optional[str] = None) -> Optional[str]:
+        """FQCN에 해당하는 파일 (중첩 클래스는 바깥 클래스 파일)"""
+        name = fqcn
+        while name:
+            paths = self.classes.get(name)
+            if paths:
+                if len(paths) == 1 or importer is None:
+                    return paths[0]
+                return max(paths, key=lambda path: len(os.path.commonpath([path, importer])))
+            if '.' not in name:
+                break
+            name = name.rsplit('.', 1)[0]
+        return None
+
+    def resolve_imports(self, path: str, content: Optional[str] = None) -> List[Tuple[str, str]]:
+        """파일의 import문을 (FQCN, 경로) 목록으로 해석 (저장소 밖 라이브러리는 제외)"""
+        content = self.read(path) if content is None else content
+        if not content:
+            return []
+        resolved = []
+        seen = set()
+        for is_static, name, wildcard in IMPORT_PATTERN.findall(content):
+            if wildcard and not is_static and name in self.packages:
+                targets = sorted(self.packages[name])
+            elif is_static:
+                targets = [name if wildcard else name.rsplit('.', 1)[0]]
+            else:
+                targets = [name]
+            for target in targets:
+                target_path = self.lookup(target, path)
+                if target_path and target_path != path and target_path not in seen:
+                    seen.add(target_path)
+                    resolved.append((target, target_path))
+        return resolved
+
+    def collect_dependencies(self, path: str, max_depth: int = 1,
+                             token_budget: int = 0) -> List[Tuple[str, str]]:
+        """import한 클래스 내용을 너비 우선으로 수집
+
+        Args:
+            path: 기준 파일
+            max_depth: import를 따라갈 깊이 (1이면 직접 import만)
+            token_budget: 수집할 내용의 최대 토큰 수 (0이면 무제한)
+
+        Returns:
+            (FQCN, 내용) 목록
+        """
+        collected = []
+        used_tokens = 0
+        visited = {path}
+        queue = deque([(path, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for fqcn, dependency in self.resolve_imports(current):
+                if dependency in visited:
+                    continue
+                visited.add(dependency)
+                content = self.read(dependency)
+                if content is None:
+                    continue
+                tokens = self.token_counter(content)
+                if token_budget and used_tokens + tokens > token_budget:
+                    logger.info(f"import 토큰 예산 초과로 제외: {fqcn}")
+                    continue
+                used_tokens += tokens
+                collected.append((fqcn, content))
+                queue.append((dependency, depth + 1))
+        return collected
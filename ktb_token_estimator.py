@@ -0,0 +1,183 @@
+"""토큰 수 추정 관련 코드"""
+import hashlib
+import logging
+import math
+import os
+import random
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# 파일 타입별 기본 문자/토큰 비율 (캘리브레이션 전 사용)
+DEFAULT_CHARS_PER_TOKEN = {
+    'java': 3.6,
+    'py': 3.5,
+    'js': 3.3,
+    'ts': 3.3,
+    'cpp': 3.2,
+    'cs': 3.6,
+    'md': 4.0,
+    'json': 2.8,
+    'xml': 3.0,
+    'text': 4.0,
+}
+# 한글 등 비ASCII 문자는 문자당 1토큰 안팎이므로 보수적으로 1.0 사용
+NON_ASCII_CHARS_PER_TOKEN = 1.0
+# 비ASCII 문자가 섞인 자연어는 비율 편차가 커서 추정 대신 정확히 계산
+EXACT_FILE_TYPES = ('text', 'md')
+MAX_CALIBRATION_NON_ASCII = 0.01  # 비ASCII 비율이 이보다 높은 샘플은 캘리브레이션에서 제외
+DEFAULT_MARGIN = 0.25   # 캘리브레이션 전 허용 상대 오차
+MIN_MARGIN = 0.05
+MAX_MARGIN = 0.5
+MIN_CALIBRATION_CHARS = 200  # 너무 짧은 샘플은 비율이 튀므로 제외
+MIN_CALIBRATION_SAMPLES = 3  # 오차 범위 산정에 필요한 최소 샘플 수
+
+
+class TokenEstimator:
+    """빠른 토큰 수 추정 및 정확한 토큰 계산 캐시
+
+    예산 판단은 문자 수 기반 추정치로 먼저 수행하고, 추정치가 한도에
+    가까울 때만 tiktoken으로 정확히 계산한다. 정확한 계산 결과는
+    내용 해시 기준으로 메모이제이션한다.
+    """
+
+    def __init__(self, default_model: str, cache_size: int = 4096, margin: float = DEFAULT_MARGIN):
+        self.default_model = default_model
+        self.default_margin = margin
+        self._ratios: Dict[str, Dict[str, float]] = {}   # model -> file_type -> 비율
+        self._margins: Dict[str, Dict[str, float]] = {}  # model -> file_type -> 오차
+        self._encodings = {}
+        self._cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._cache_size = cache_size
+        self.stats = {"estimates": 0, "exact": 0, "cache_hits": 0}
+
+    @staticmethod
+    def file_type_of(path: str) -> str:
+        """파일 경로에서 파일 타입 추출"""
+        ext = os.path.splitext(path)[1].lower().lstrip('.')
+        return ext or 'text'
+
+    def _get_encoding(self, model: str):
+        """모델별 인코더 캐시"""
+        if model not in self._encodings:
+            try:
+                self._encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return self._encodings[model]
+
+    def _ratio(self, file_type: Optional[str], model: str) -> float:
+        file_type = file_type or 'text'
+        calibrated = self._ratios.get(model, {})
+        return calibrated.get(file_type) or DEFAULT_CHARS_PER_TOKEN.get(file_type) or DEFAULT_CHARS_PER_TOKEN['text']
+
+    def _margin(self, file_type: Optional[str], model: str) -> float:
+        return self._margins.get(model, {}).get(file_type or 'text', self.default_margin)
+
+    @staticmethod
+    def non_ascii_chars(text: str) -> int:
+        """비ASCII 문자 수"""
+        if text.isascii():
+            return 0
+        return len(text) - len(text.encode('ascii', 'ignore'))
+
+    def estimate(self, text: str, file_type: Optional[str] = None, model: Optional[str] = None) -> int:
+        """문자 수 기반 토큰 수 추정 (ASCII와 비ASCII 문자를 다른 비율로 계산)"""
+        self.stats["estimates"] += 1
+        model = model or self.default_model
+        non_ascii = self.non_ascii_chars(text)
+        return math.ceil((len(text) - non_ascii) / self._ratio(file_type, model)
+                         + non_ascii / NON_ASCII_CHARS_PER_TOKEN)
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """정확한 토큰 수 계산 (내용 해시 기준 캐시)"""
+        model = model or self.default_model
+        key = (model, hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        self.stats["exact"] += 1
+        token_count = len(self._get_encoding(model).encode(text, disallowed_special=()))
+        self._cache[key] = token_count
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return token_count
+
+    def fits(self, text: str, limit: int, file_type: Optional[str] = None, model: Optional[str] = None) -> bool:
+        """토큰 수가 limit 이하인지 판단
+
+        추정치가 오차 범위 밖에서 명확히 판단되면 인코딩 없이 반환하고,
+        한도 근처일 때만 정확히 계산한다. 비ASCII 문자가 섞인 text/md는
+        비율 편차가 커서 항상 정확히 계산한다.
+        """
+        model = model or self.default_model
+        if (file_type or 'text') in EXACT_FILE_TYPES and not text.isascii():
+            return self.count(text, model) <= limit
+        estimated = self.estimate(text, file_type, model)
+        margin = self._margin(file_type, model)
+        # margin은 실제 토큰 수 대비 상대 오차이므로 실제 값은 estimated / (1 ± margin) 범위
+        if estimated <= limit * (1 - margin):
+            return True
+        if estimated > limit * (1 + margin):
+            return False
+        return self.count(text, model) <= limit
+
+    def calibrate(self, samples: Iterable[Tuple[str, str]], model: Optional[str] = None) -> Dict[str, float]:
+        """(file_type, text) 샘플로 파일 타입별 비율과 오차 범위 캘리브레이션
+
+        비율은 모델별로 보관되며 ASCII 문자 기준이므로 비ASCII 문자가 많은
+        샘플은 제외한다. 공용 추정기의 비율을 바꾸므로 요청 처리 중이 아니라
+        프로세스 시작 시 한 번만 호출한다.
+        """
+        model = model or self.default_model
+        grouped: Dict[str, List[Tuple[int, int]]] = {}
+        for file_type, text in samples:
+            if len(text) < MIN_CALIBRATION_CHARS:
+                continue
+            if self.non_ascii_chars(text) > len(text) * MAX_CALIBRATION_NON_ASCII:
+                continue
+            tokens = self.count(text, model)
+            if tokens:
+                grouped.setdefault(file_type, []).append((len(text), tokens))
+
+        ratios = self._ratios.setdefault(model, {})
+        margins = self._margins.setdefault(model, {})
+        for file_type, pairs in grouped.items():
+            ratio = sum(c for c, _ in pairs) / sum(t for _, t in pairs)
+            ratios[file_type] = ratio
+            if len(pairs) >= MIN_CALIBRATION_SAMPLES:
+                worst = max(abs(c / ratio - t) / t for c, t in pairs)
+                margins[file_type] = min(max(worst, MIN_MARGIN), MAX_MARGIN)
+
+        rounded = {k: round(v, 2) for k, v in ratios.items()}
+        logger.info(f"토큰 추정기 캘리브레이션 완료 ({model}): {rounded}")
+        return dict(ratios)
+
+    def calibrate_from_directory(self, directory: str, exclude_dirs: Iterable[str] = (),
+                                 max_files: int = 64, max_chars: int = 8000,
+                                 model: Optional[str] = None) -> Dict[str, float]:
+        """디렉토리에서 샘플 파일을 뽑아 캘리브레이션"""
+        candidates = []
+        for root, _, files in os.walk(directory):
+            if any(excl in root for excl in exclude_dirs):
+                continue
+            for file in files:
+                file_type = self.file_type_of(file)
+                if file_type in DEFAULT_CHARS_PER_TOKEN:
+                    candidates.append((file_type, os.path.join(root, file)))
+
+        random.Random(0).shuffle(candidates)
+        samples = []
+        for file_type, path in candidates[:max_files]:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    samples.append((file_type, f.read(max_chars)))
+            except Exception as e:
+                logger.error(f"캘리브레이션 샘플 읽기 오류 ({path}): {str(e)}")
+        return self.calibrate(samples, model)
@@ -0,0 +1,113 @@
+"""요약 계층 병합(tree-reduce) 관련 코드"""
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TreeReducer:
+    """부분 요약을 레벨 단위로 병렬 병합하는 엔진
+
+    한 레벨에서 인접한 항목을 최대 fan_in개, node_budget 토큰 이하로 묶어
+    동시에 병합하고, 전체가 target_budget 이하가 될 때까지 반복한다.
+    레벨 수는 항목 수에 대해 로그 규모로 늘어나므로 청크가 많아도
+    마지막 호출의 입력이 모델 컨텍스트를 넘지 않는다.
+    중간 노드는 (프롬프트, 입력) 해시로 캐시하여 같은 저장소를 다시
+    생성할 때 변경되지 않은 부분의 병합 호출을 생략한다.
+    """
+
+    def __init__(self, merge: Callable[[List[str]], Awaitable[Optional[str]]],
+                 token_counter: Optional[Callable[[str], int]] = None,
+                 fan_in: int = 4, node_budget: int = 60000,
+                 cache_size: int = 1024):
+        if fan_in < 2:
+            raise ValueError("fan_in은 2 이상이어야 합니다.")
+        self.merge = merge
+        self.token_counter = token_counter or (lambda text: len(text) // 4)
+        self.fan_in = fan_in
+        self.node_budget = node_budget
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"merges": 0, "cache_hits": 0, "levels": 0}
+
+    @staticmethod
+    def _key(namespace: str, items: List[str]) -> str:
+        digest = hashlib.sha256(namespace.encode("utf-8"))
+        for item in items:
+            digest.update(b"\x00")
+            digest.update(item.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _group(self, items: List[str], tokens: List[int]) -> List[List[int]]:
+        """인접 항목을 fan_in개, node_budget 토큰 이하로 묶은 인덱스 목록"""
+        groups: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for index, count in enumerate(tokens):
+            if current and (len(current) >= self.fan_in or used + count > self.node_budget):
+                groups.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += count
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _merge_node(self, namespace: str, items: List[str]) -> str:
+        key = self._key(namespace, items)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return cached
+
+        merged = await self.merge(items)
+        self.stats["merges"] += 1
+        if not merged:
+            # 병합 실패 시 입력을 그대로 이어 붙여 다음 레벨로 전달 (캐시하지 않음)
+            logger.error(f"요약 병합 실패: 입력 {len(items)}개를 이어 붙여 사용")
+            return "\n\n".join(items)
+
+        with self._lock:
+            self._cache[key] = merged
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return merged
+
+    async def reduce(self, items: List[str], target_budget: int, namespace: str = "") -> List[str]:
+        """items의 토큰 합계가 target_budget 이하가 될 때까지 병합
+
+        Args:
+            items: 부분 요약 목록 (순서 유지)
+            target_budget: 최종 호출에 넣을 요약의 최대 토큰 수
+            namespace: 캐시 키에 포함할 값 (병합 프롬프트 등)
+
+        Returns:
+            병합된 요약 목록
+        """
+        items = [item for item in items if item]
+        level = 0
+        while len(items) > 1:
+            tokens = [self.token_counter(item) for item in items]
+            if sum(tokens) <= target_budget and len(items) <= self.fan_in:
+                break
+            groups = self._group(items, tokens)
+            if len(groups) == len(items):
+                # 항목 하나하나가 노드 예산에 가까워 더 묶을 수 없음
+                logger.warning(f"요약 병합 중단: 항목 {len(items)}개가 노드 예산({self.node_budget})을 초과")
+                break
+            level += 1
+            items = await asyncio.gather(*[
+                self._merge_node(namespace, [items[index] for index in group])
+                if len(group) > 1 else asyncio.sleep(0, items[group[0]])
+                for group in groups
+            ])
+            print(f"요약 병합 레벨 {level}: {len(tokens)}개 -> {len(items)}개")
+        self.stats["levels"] += level
+        return list(items)
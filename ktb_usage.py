@@ -0,0 +1,192 @@
+"""작업 단위 토큰/비용 집계 관련 코드"""
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBudgetExceeded(Exception):
+    """작업의 토큰 예산 초과"""
+
+    def __init__(self, job_id: str, used: int, requested: int, budget: int):
+        super().__init__(
+            f"토큰 예산 초과 ({job_id}): 사용 {used} + 요청 {requested} > 예산 {budget}")
+        self.job_id = job_id
+        self.used = used
+        self.requested = requested
+        self.budget = budget
+
+
+@dataclass
+class UsageRecord:
+    """(단계, 모델) 단위 누적 사용량"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "latency": round(self.latency, 3),
+            "cost": round(self.cost, 6),
+        }
+
+
+@dataclass
+class JobUsage:
+    """/generate, /chat 요청 하나의 사용량 기록"""
+    job_id: str
+    kind: str
+    repo: Optional[str] = None
+    token_budget: int = 0  # 0이면 무제한
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    records: Dict[Tuple[str, str], UsageRecord] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return sum(record.total_tokens for record in self.records.values())
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            records = list(self.records.items())
+        stages: Dict[str, dict] = {}
+        models: Dict[str, UsageRecord] = {}
+        total = UsageRecord()
+        for (stage, model), record in records:
+            stages.setdefault(stage, {})[model] = record.to_dict()
+            for target in (models.setdefault(model, UsageRecord()), total):
+                target.calls += record.calls
+                target.prompt_tokens += record.prompt_tokens
+                target.completion_tokens += record.completion_tokens
+                target.latency += record.latency
+                target.cost += record.cost
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "repo": self.repo,
+            "token_budget": self.token_budget or None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stages": stages,
+            "models": {model: record.to_dict() for model, record in models.items()},
+            "total": total.to_dict(),
+        }
+
+
+class UsageTracker:
+    """작업/단계/모델/저장소별 토큰, 호출 수, 지연, 비용 집계
+
+    현재 작업과 단계는 contextvars로 전달되므로 asyncio 태스크와
+    asyncio.to_thread로 실행한 코드에도 그대로 이어진다.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default_budget: int = 0, history: int = 1000):
+        self.prices = prices or {}  # 모델별 (입력, 출력) 100만 토큰당 USD
+        self.default_budget = default_budget
+        self.history = history
+        self.jobs: "OrderedDict[str, JobUsage]" = OrderedDict()
+        self._current_job = contextvars.ContextVar("usage_job", default=None)
+        self._current_stage = contextvars.ContextVar("usage_stage", default="default")
+        self._lock = threading.Lock()
+
+    def start_job(self, kind: str, repo: Optional[str] = None,
+                  token_budget: Optional[int] = None, job_id: Optional[str] = None) -> JobUsage:
+        """작업 기록 생성 후 현재 컨텍스트의 작업으로 지정"""
+        job = JobUsage(
+            job_id=job_id or f"{kind}-{uuid.uuid4().hex[:12]}",
+            kind=kind,
+            repo=repo,
+            token_budget=self.default_budget if token_budget is None else token_budget,
+        )
+        with self._lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+        self._current_job.set(job)
+        return job
+
+    def finish_job(self, job: JobUsage) -> dict:
+        job.finished_at = time.time()
+        summary = job.to_dict()
+        total = summary["total"]
+        print(f"[usage] {job.job_id}: {total['total_tokens']} tokens, "
+              f"{total['calls']} calls, ${total['cost']:.4f}")
+        return summary
+
+    def get(self, job_id: str) -> Optional[JobUsage]:
+        return self.jobs.get(job_id)
+
+    def current_job(self) -> Optional[JobUsage]:
+        return self._current_job.get()
+
+    @contextmanager
+    def stage(self, name: str):
+        """구간 내 호출을 지정한 단계로 집계"""
+        token = self._current_stage.set(name)
+        try:
+            yield
+        finally:
+            self._current_stage.reset(token)
+
+    async def run_stage(self, name: str, awaitable: Awaitable[T]) -> T:
+        """코루틴 전체를 지정한 단계로 집계 (태스크 생성 시 사용)"""
+        with self.stage(name):
+            return await awaitable
+
+    def check_budget(self, estimated_tokens: int, job: Optional[JobUsage] = None):
+        """호출 전 예산 확인 (초과 예상 시 TokenBudgetExceeded)"""
+        job = job or self.current_job()
+        if job is None or not job.token_budget:
+            return
+        used = job.total_tokens
+        if used + estimated_tokens > job.token_budget:
+            raise TokenBudgetExceeded(job.job_id, used, estimated_tokens, job.token_budget)
+
+    def cost_of(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int,
+               latency: float = 0.0, job: Optional[JobUsage] = None, stage: Optional[str] = None):
+        """호출 1건의 사용량 기록 (진행 중인 작업이 없으면 무시)"""
+        job = job or self.current_job()
+        if job is None:
+            return
+        key = (stage or self._current_stage.get(), model)
+        with job._lock:
+            record = job.records.setdefault(key, UsageRecord())
+            record.calls += 1
+            record.prompt_tokens += prompt_tokens or 0
+            record.completion_tokens += completion_tokens or 0
+            record.latency += latency
+            record.cost += self.cost_of(model, prompt_tokens or 0, completion_tokens or 0)
+
+    def record_openai_usage(self, model: str, usage, latency: float = 0.0,
+                            job: Optional[JobUsage] = None, stage: Optional[str] = None):
+        """OpenAI SDK 응답의 usage 객체 기록"""
+        if usage is None:
+            self.record(model, 0, 0, latency, job, stage)
+            return
+        self.record(model, usage.prompt_tokens, usage.completion_tokens, latency, job, stage)
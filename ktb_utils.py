@@ -4,7 +4,6 @@ import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import multiprocessing
-import tiktoken
 import aiofiles
 from token_chunker import *
 from ktb_settings import *
@@ -43,12 +42,25 @@ class TextProcessor:
     @staticmethod
     def count_tokens(text: str) -> int:
         try:
-            encoding = tiktoken.encoding_for_model(GPT_MODEL)
-            return len(encoding.encode(text, disallowed_special=()))
+            return token_estimator.count(text, GPT_MODEL)
         except Exception as e:
             logger.error(f"토큰 계산 오류: {str(e)}")
             return len(text) // 4
 
+    @staticmethod
+    def estimate_tokens(text: str, file_type: Optional[str] = None) -> int:
+        """인코딩 없이 토큰 수 추정"""
+        return token_estimator.estimate(text, file_type, GPT_MODEL)
+
+    @staticmethod
+    def fits_in(text: str, max_tokens: int, file_type: Optional[str] = None) -> bool:
+        """토큰 수가 max_tokens 이하인지 판단 (한도 근처에서만 정확히 계산)"""
+        try:
+            return token_estimator.fits(text, max_tokens, file_type, GPT_MODEL)
+        except Exception as e:
+            logger.error(f"토큰 계산 오류: {str(e)}")
+            return len(text) // 4 <= max_tokens
+
     @staticmethod
     def split_text(text: str, max_tokens: int = GPT_MAX_TOKENS) -> List[str]:
         return chunker.chunk(text)